@@ -8,8 +8,10 @@ from app.agent.nodes.gate import gate
 from app.agent.nodes.collect_evidence import collect_evidence
 from app.agent.nodes.sufficiency_judge import sufficiency_judge
 from app.agent.nodes.respond import respond
+from app.config import settings
 from langsmith import traceable
 import inspect
+import time
 
 # 定义白名单字段，用于上报到 LangSmith
 TRACE_WHITELIST = {
@@ -19,28 +21,93 @@ TRACE_WHITELIST = {
 }
 
 
+# 与 rewrite_query 并行执行的分诊节点
+PARALLEL_TRIAGE_NODES = ("vision_triage", "intent_classifier")
+
+
+def _with_latency(name: str, state: AgentState, update: dict, started: float) -> dict:
+    """在节点返回的增量中追加一条耗时记录（start_offset_ms 相对整图开始时间）。"""
+    finished = time.perf_counter()
+    origin = state.get("started_at") or started
+
+    update = dict(update or {})
+    if not state.get("started_at"):
+        update["started_at"] = started
+
+    update["decision_trace"] = list(update.get("decision_trace") or []) + [{
+        "node": "node_latency",
+        "name": name,
+        "start_offset_ms": int((started - origin) * 1000),
+        "latency_ms": int((finished - started) * 1000),
+    }]
+    return update
+
+
 def trace_node(name: str):
-    """节点监控包装器：使用 LangSmith 的 @traceable 装饰器。"""
+    """节点监控包装器：使用 LangSmith 的 @traceable 装饰器，并记录节点耗时。"""
 
     def decorator(func):
         if inspect.iscoroutinefunction(func):
             @traceable(name=name, run_type="chain")
             async def async_wrapper(state: AgentState):
-                return await func(state)
+                started = time.perf_counter()
+                return _with_latency(name, state, await func(state), started)
 
             return async_wrapper
 
         @traceable(name=name, run_type="chain")
         def sync_wrapper(state: AgentState):
-            return func(state)
+            started = time.perf_counter()
+            return _with_latency(name, state, func(state), started)
 
         return sync_wrapper
 
     return decorator
 
 
-def build_graph():
-    """LangGraph 工作流定义。"""
+def _parse_triage_nodes(value: str | None, setting_name: str) -> set[str]:
+    """解析逗号分隔的分诊节点名列表，并校验节点名合法"""
+    names = {n.strip() for n in (value or "").split(",") if n.strip()}
+    unknown = names - set(PARALLEL_TRIAGE_NODES)
+    if unknown:
+        raise ValueError(f"{setting_name} 包含未知节点: {sorted(unknown)}")
+    return names
+
+
+def _rewrite_dependents() -> set[str]:
+    """读取始终需要等待 rewrite_query 结果的分诊节点（settings.REWRITE_DEPENDENT_NODES，逗号分隔）。"""
+    return _parse_triage_nodes(settings.REWRITE_DEPENDENT_NODES, "REWRITE_DEPENDENT_NODES")
+
+
+def _history_rewrite_dependents() -> set[str]:
+    """读取有历史对话时需要等待 rewrite_query 的分诊节点（settings.REWRITE_DEPENDENT_NODES_WITH_HISTORY）。"""
+    return _parse_triage_nodes(
+        settings.REWRITE_DEPENDENT_NODES_WITH_HISTORY, "REWRITE_DEPENDENT_NODES_WITH_HISTORY"
+    )
+
+
+def _has_history(state: AgentState) -> bool:
+    return bool(state.get("chat_history"))
+
+
+def build_graph(
+        rewrite_dependents: set[str] | None = None,
+        history_rewrite_dependents: set[str] | None = None,
+):
+    """
+    LangGraph 工作流定义。
+
+    normalize_input 之后 rewrite_query / vision_triage / intent_classifier 并行 fan-out，
+    三者的增量通过 AgentState 的 reducer 合并，全部完成后汇聚到 gate。
+    rewrite_dependents 中的节点改为挂在 rewrite_query 之后，以使用重写后的 query；
+    history_rewrite_dependents 中的节点只在有历史对话时挂在 rewrite_query 之后
+    （追问如 "那它现在呢？" 需要补全指代后再分类），无历史时照常并行。
+    """
+    if rewrite_dependents is None:
+        rewrite_dependents = _rewrite_dependents()
+    if history_rewrite_dependents is None:
+        history_rewrite_dependents = _history_rewrite_dependents()
+    history_rewrite_dependents = history_rewrite_dependents - rewrite_dependents
 
     workflow = StateGraph(AgentState)
 
@@ -57,9 +124,31 @@ def build_graph():
     workflow.set_entry_point("normalize_input_node")
 
     workflow.add_edge("normalize_input_node", "rewrite_query_node")
-    workflow.add_edge("rewrite_query_node", "vision_triage_node")
-    workflow.add_edge("vision_triage_node", "intent_classifier_node")
-    workflow.add_edge("intent_classifier_node", "gate_node")
+    for name in PARALLEL_TRIAGE_NODES:
+        if name in history_rewrite_dependents:
+            continue
+        upstream = "rewrite_query_node" if name in rewrite_dependents else "normalize_input_node"
+        workflow.add_edge(upstream, f"{name}_node")
+
+    # 按是否有历史对话二选一：无历史时与 rewrite_query 并行，有历史时等待 rewrite_query
+    history_nodes = [f"{name}_node" for name in PARALLEL_TRIAGE_NODES if name in history_rewrite_dependents]
+    if history_nodes:
+        workflow.add_conditional_edges(
+            "normalize_input_node",
+            lambda state: [] if _has_history(state) else history_nodes,
+            history_nodes,
+        )
+        workflow.add_conditional_edges(
+            "rewrite_query_node",
+            lambda state: history_nodes if _has_history(state) else [],
+            history_nodes,
+        )
+
+    # fan-in：等待所有分支完成后再进入 gate
+    workflow.add_edge(
+        ["rewrite_query_node", *[f"{name}_node" for name in PARALLEL_TRIAGE_NODES]],
+        "gate_node",
+    )
     workflow.add_edge("gate_node", "collect_evidence_node")
     workflow.add_edge("collect_evidence_node", "sufficiency_judge_node")
     workflow.add_edge("sufficiency_judge_node", "respond_node")
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import time
 from typing import Any, Optional
 
@@ -9,8 +10,8 @@ from loguru import logger
 
 from app.agent.state import AgentState
 from app.config import settings
-from app.agent.nodes.retrieve import retrieve_documents
-from app.agent.nodes.rerank import rerank_documents
+from app.agent.nodes.retrieve import retrieve_documents, retrieve_candidates
+from app.agent.nodes.rerank import rerank_documents, rerank_params, score_documents, select_reranked
 from app.agent.nodes.web_search import web_search_node
 from app.mcp.map.mcp import MapMCP
 from app.utils.common import clean_text
@@ -31,29 +32,217 @@ def _get_map_params(state: AgentState) -> dict:
     return params if isinstance(params, dict) else {}
 
 
-def collect_evidence(state: AgentState) -> AgentState:
+_map_mcp: Optional[MapMCP] = None
+
+
+def _get_map_mcp() -> MapMCP:
+    """复用全局 MapMCP（及其 HTTP 连接池），未配置 AMAP_API_KEY 时抛出异常"""
+    global _map_mcp
+    if _map_mcp is None:
+        _map_mcp = MapMCP()
+    return _map_mcp
+
+
+def _branch_timeouts(mode: str) -> dict[str, float]:
+    """
+    各工具分支的超时预算（秒）。
+    emergency 模式下所有分支再受 EVIDENCE_EMERGENCY_BUDGET_SEC 约束，保证证据收集耗时有上界。
     """
-    collect_evidence_node：根据 gate.tools 执行工具调用（KB/Web/Map）并写回 state。
+    timeouts = {
+        "kb": settings.EVIDENCE_KB_TIMEOUT_SEC,
+        "web": settings.EVIDENCE_WEB_TIMEOUT_SEC,
+        "map": settings.EVIDENCE_MAP_TIMEOUT_SEC,
+    }
+    if mode == "emergency":
+        budget = settings.EVIDENCE_EMERGENCY_BUDGET_SEC
+        timeouts = {k: min(v, budget) for k, v in timeouts.items()}
+    return timeouts
+
 
-    重点：本地 KB 检索支持 retry 扩大召回：
-    - MAX_RETRY = 3
-    - STEP = 5
-    - 每轮 top_k = settings.RETRIEVAL_TOP_K + attempt*STEP
-    - 用 rerank 后保留文档数量是否 >= settings.MIN_DOCS_REQUIRED 判断“是否够用”
+async def _run_branch(name: str, coro, timeout_sec: float) -> tuple[Any, dict]:
+    """
+    带超时执行单个工具分支，超时后取消该分支。
+    返回 (结果, 分支元信息)；超时或异常时结果为 None，不影响其他分支。
     """
+    started = time.perf_counter()
+    result = None
+    timed_out = False
+    error: Optional[str] = None
 
-    start = time.time()
+    try:
+        result = await asyncio.wait_for(coro, timeout=timeout_sec)
+    except asyncio.TimeoutError:
+        timed_out = True
+        logger.warning(f"collect_evidence_node: {name} 分支超时 ({timeout_sec}s)，已取消")
+    except Exception as e:
+        error = str(e)
+        logger.exception(f"collect_evidence_node: {name} 分支失败")
+
+    return result, {
+        "latency_ms": int((time.perf_counter() - started) * 1000),
+        "timeout_sec": timeout_sec,
+        "timed_out": timed_out,
+        "error": error,
+    }
 
-    tools = _get_gate_tools(state)
-    map_params = _get_map_params(state)
 
-    use_kb = bool(tools.get("kb", True))
-    use_web = bool(tools.get("web", False))
-    use_map = bool(tools.get("map", False))
+async def _collect_kb_single_pass(state: AgentState, query: str, kb_partial: dict) -> None:
+    """
+    KB：单次超量召回 + 单次打分，重试只在缓存的打分结果上放宽阈值。
+
+    - 按最后一轮的 top_k 一次性召回候选池（一次 embedding + 一次 Qdrant 查询）
+    - 每个候选只做一次 CrossEncoder 打分
+    - 第 attempt 轮只看召回顺序前 top_k 个候选，按 rerank_params(attempt) 的阈值/Top_N 筛选
+
+    注意：这只是逐轮重新检索（_collect_kb）的近似。Hybrid 检索的 RRF 融合排名依赖 dense / sparse
+    各自的 prefetch 数量，对召回上限不具备前缀稳定性：以 pool_top_k 召回的前 top_k 个，
+    与直接以 top_k 召回的结果可能不同。需要与旧路径逐条一致时关闭 KB_SINGLE_PASS_RETRIEVAL。
+    """
+    base_top_k = settings.RETRIEVAL_TOP_K
+    step = 5
+    max_retry = settings.MAX_RETRY
+    pool_top_k = base_top_k + (max_retry - 1) * step
+
+    species = (state.get("vision_facts") or {}).get("species")
+    urgency = state.get("urgency")
+
+    try:
+        candidates = await retrieve_candidates(query, pool_top_k, species=species, urgency=urgency)
+        # 与 rerank_documents 一致：候选过少时跳过 rerank 直接透传
+        scored = await score_documents(query, candidates) if len(candidates) > 3 else None
+    except Exception as e:
+        kb_partial["error"] = str(e)
+        kb_partial["attempts"].append({
+            "attempt": 1,
+            "top_k": pool_top_k,
+            "error": str(e),
+            "enough": False,
+        })
+        logger.exception("collect_evidence_node: KB 检索失败")
+        return
+
+    recall_rank = {id(doc): i for i, doc in enumerate(candidates)}
+
+    for attempt in range(max_retry):
+        top_k = base_top_k + attempt * step
+
+        if scored is None:
+            current_kb_docs = candidates[:top_k]
+            threshold = None
+        else:
+            threshold, top_n = rerank_params(attempt + 1)
+            window = [(doc, score) for doc, score in scored if recall_rank[id(doc)] < top_k]
+            current_kb_docs = select_reranked(window, threshold, top_n)
+
+        enough = len(current_kb_docs) >= settings.MIN_DOCS_REQUIRED
+
+        kb_partial["kb_docs"] = current_kb_docs
+        kb_partial["attempts"].append({
+            "attempt": attempt + 1,
+            "top_k": top_k,
+            "threshold": threshold,
+            "kept": len(current_kb_docs),
+            "enough": enough,
+            "cached": attempt > 0,
+        })
+
+        if enough:
+            break
+
+
+async def _collect_kb(state: AgentState, query: str, kb_partial: dict) -> None:
+    """
+    KB：retrieve + rerank + retry 扩大召回（每轮重新检索与打分）。
+    每轮结果实时写入 kb_partial，分支超时被取消时已完成轮次的结果仍可使用。
+    """
+    base_top_k = settings.RETRIEVAL_TOP_K
+    step = 5
+    max_retry = settings.MAX_RETRY
+
+    mutable_state = dict(state)
+
+    for attempt in range(max_retry):
+        top_k = base_top_k + attempt * step
+        try:
+            mutable_state["query"] = query
+            mutable_state["force_top_k"] = top_k
+
+            retrieved_state = await retrieve_documents(mutable_state)
+            reranked_state = await rerank_documents({**mutable_state, **retrieved_state})
+
+            mutable_state.update(reranked_state)
+
+            current_kb_docs = mutable_state.get("kb_docs", [])
+            enough = len(current_kb_docs) >= settings.MIN_DOCS_REQUIRED
+
+            kb_partial["kb_docs"] = current_kb_docs
+            kb_partial["attempts"].append({
+                "attempt": attempt + 1,
+                "top_k": top_k,
+                "kept": len(current_kb_docs),
+                "enough": enough,
+            })
+
+            if enough:
+                break
+
+        except Exception as e:
+            kb_partial["error"] = str(e)
+            kb_partial["attempts"].append({
+                "attempt": attempt + 1,
+                "top_k": top_k,
+                "error": str(e),
+                "enough": False,
+            })
+            logger.exception("collect_evidence_node: KB 检索失败")
+
 
+async def _collect_web(state: AgentState, query: str) -> list:
+    web_state = await web_search_node({**state, "query": query})
+    return web_state.get("web_facts", [])
+
+
+async def _collect_map(state: AgentState, map_params: dict):
+    location = clean_text(state.get("location"))
+    if not location:
+        raise ValueError("location 为空，无法调用 map")
+
+    radius_raw = map_params.get("radius_km") or state.get("radius_km") or 5
+    try:
+        radius_km = int(radius_raw)
+    except Exception:
+        radius_km = 5
+    radius_km = max(1, min(20, radius_km))
+
+    # 兼容旧的单类型参数 resource_type
+    resource_types = map_params.get("resource_types") or [map_params.get("resource_type") or "hospital"]
+    if isinstance(resource_types, str):
+        resource_types = [resource_types]
+
+    # 一次地理编码，多类型 POI 并发搜索，合并去重后按距离排序
+    result = await _get_map_mcp().ainvoke_many(
+        address=location,
+        resource_types=resource_types,
+        radius_km=radius_km,
+        max_results=int(map_params.get("max_results") or 3),
+        max_per_type=map_params.get("max_per_type"),
+    )
+
+    return result.get("resources", result)
+
+
+def _kb_query(state: AgentState) -> str:
+    """
+    KB 检索 / rerank 使用的 query：与 retrieve_documents / rerank_documents 的取值一致，
+    两种 KB 模式（逐轮 / 单次超量召回）只在召回与打分轮数上不同，embedding 与 rerank 缓存 key 也一致
+    """
+    return state.get("rewrite_query") or state.get("normalized_query") or state.get("query") or ""
+
+
+def _build_query(state: AgentState) -> str:
+    """基于图片信息的 query 增强（enriched_query），供 Web 搜索使用"""
     base_query = clean_text(state.get("rewrite_query") or state.get("normalized_query") or state.get("query"))
 
-    # ===== 基于图片信息的 query 增强（enriched_query） =====
     vf = state.get("vision_facts") or {}
     if not isinstance(vf, dict):
         vf = {}
@@ -101,117 +290,68 @@ def collect_evidence(state: AgentState) -> AgentState:
 
     vision_hint = " | ".join(vision_hint_parts)
 
-    query = base_query
     if should_enrich and vision_hint:
-        query = f"{base_query}\n{vision_hint}"
+        return f"{base_query}\n{vision_hint}"
+    return base_query
 
-    decision_trace = state.get("decision_trace") or []
-    if not isinstance(decision_trace, list):
-        decision_trace = []
 
-    kb_docs = []
-    web_facts = []
-    map_result = None
+async def collect_evidence(state: AgentState) -> AgentState:
+    """
+    collect_evidence_node：根据 gate.tools 并发执行工具调用（KB/Web/Map）并写回 state。
 
-    kb_attempts = []
-    kb_error: Optional[str] = None
-    web_error: Optional[str] = None
-    map_error: Optional[str] = None
+    - 三个分支互相独立，并发执行，总耗时取决于最慢的分支而不是三者之和
+    - 每个分支有独立的超时预算（emergency 模式更短），超时即取消，其余分支结果照常合并
+    - KB 分支支持 retry 扩大召回：每轮 top_k = settings.RETRIEVAL_TOP_K + attempt*5，
+      用 rerank 后保留文档数量是否 >= settings.MIN_DOCS_REQUIRED 判断“是否够用”；
+      KB_SINGLE_PASS_RETRIEVAL 开启时只召回、打分一次，后续轮次复用打分结果
+    """
 
-    mutable_state = dict(state)
+    start = time.time()
 
-    # ===== 1) KB：retrieve + rerank + retry 扩大召回 =====
-    if use_kb:
-        base_top_k = settings.RETRIEVAL_TOP_K
-        step = 5
-        max_retry = settings.MAX_RETRY
-
-        for attempt in range(max_retry):
-            top_k = base_top_k + attempt * step
-            try:
-                mutable_state["query"] = query
-                mutable_state["force_top_k"] = top_k
-
-                retrieved_state = retrieve_documents(mutable_state)
-                reranked_state = rerank_documents(retrieved_state)
-
-                mutable_state.update(reranked_state)
-
-                current_kb_docs = mutable_state.get("kb_docs", [])
-                enough = len(current_kb_docs) >= settings.MIN_DOCS_REQUIRED
-
-                kb_attempts.append({
-                    "attempt": attempt + 1,
-                    "top_k": top_k,
-                    "kept": len(current_kb_docs),
-                    "enough": enough,
-                })
-
-                if enough:
-                    break
-
-            except Exception as e:
-                kb_error = str(e)
-                kb_attempts.append({
-                    "attempt": attempt + 1,
-                    "top_k": top_k,
-                    "error": kb_error,
-                    "enough": False,
-                })
-                logger.exception("collect_evidence_node: KB 检索失败")
-
-        kb_docs = mutable_state.get("kb_docs", [])
-        final_retry_count = len(kb_attempts)
-        mutable_state["retry_count"] = final_retry_count
-
-    # ===== 2) WebSearch =====
-    if use_web:
-        try:
-            web_state = web_search_node({**mutable_state, "query": query})
-            mutable_state.update(web_state)
-            web_facts = mutable_state.get("web_facts", [])
-        except Exception as e:
-            web_error = str(e)
-            logger.exception("collect_evidence_node: WebSearch 失败")
+    tools = _get_gate_tools(state)
+    map_params = _get_map_params(state)
+    mode = clean_text(_get_gate(state).get("mode")) or "normal"
 
-    # ===== 3) MapSearch =====
-    if use_map:
-        try:
-            location = clean_text(mutable_state.get("location"))
-            if not location:
-                raise ValueError("location 为空，无法调用 map")
+    use_kb = bool(tools.get("kb", True))
+    use_web = bool(tools.get("web", False))
+    use_map = bool(tools.get("map", False))
 
-            radius_raw = map_params.get("radius_km") or mutable_state.get("radius_km") or 5
-            try:
-                radius_km = int(radius_raw)
-            except Exception:
-                radius_km = 5
-            radius_km = max(1, min(20, radius_km))
+    query = _build_query(state)
+    timeouts = _branch_timeouts(mode)
 
-            resource_type = map_params.get("resource_type") or "hospital"
+    kb_partial: dict = {"kb_docs": [], "attempts": [], "error": None}
 
-            map_mcp = MapMCP()
-            result = map_mcp.invoke(
-                address=location,
-                resource_type=resource_type,
-                radius_km=radius_km,
-                max_results=3,
-            )
+    branches: dict[str, Any] = {}
+    if use_kb:
+        collect_kb = _collect_kb_single_pass if settings.KB_SINGLE_PASS_RETRIEVAL else _collect_kb
+        branches["kb"] = collect_kb(state, _kb_query(state), kb_partial)
+    if use_web:
+        branches["web"] = _collect_web(state, query)
+    if use_map:
+        branches["map"] = _collect_map(state, map_params)
 
-            map_result = result.get("resources", result)
+    outcomes = await asyncio.gather(*[
+        _run_branch(name, coro, timeouts[name]) for name, coro in branches.items()
+    ])
+    results = {name: result for name, (result, _) in zip(branches, outcomes)}
+    branch_meta = {name: meta for name, (_, meta) in zip(branches, outcomes)}
 
-        except Exception as e:
-            map_error = str(e)
-            logger.exception("collect_evidence_node: Map 调用失败")
+    def _branch_error(name: str) -> Optional[str]:
+        meta = branch_meta.get(name) or {}
+        if meta.get("timed_out"):
+            return "timeout"
+        return meta.get("error")
 
-    elapsed_ms = int((time.time() - start) * 1000)
+    kb_docs = kb_partial["kb_docs"]
+    kb_attempts = kb_partial["attempts"]
+    web_facts = results.get("web") or []
+    map_result = results.get("map")
 
-    decision_trace = mutable_state.get("decision_trace") or []
-    if not isinstance(decision_trace, list):
-        decision_trace = []
+    elapsed_ms = int((time.time() - start) * 1000)
 
-    decision_trace.append({
+    trace_entry = {
         "node": "collect_evidence_node",
+        "mode": mode,
         "use_kb": use_kb,
         "use_web": use_web,
         "use_map": use_map,
@@ -219,22 +359,27 @@ def collect_evidence(state: AgentState) -> AgentState:
         "kb_docs_len": len(kb_docs),
         "web_facts_len": len(web_facts),
         "map_has_result": bool(map_result),
-        "kb_error": kb_error,
-        "web_error": web_error,
-        "map_error": map_error,
+        "kb_error": _branch_error("kb") or kb_partial["error"],
+        "web_error": _branch_error("web"),
+        "map_error": _branch_error("map"),
+        "branches": branch_meta,
         "latency_ms": elapsed_ms,
-    })
+    }
 
     logger.info(
         f"collect_evidence_node: kb={use_kb} web={use_web} map={use_map} "
         f"kb_docs={len(kb_docs)} web_facts={len(web_facts)} map={'yes' if map_result else 'no'} "
-        f"latency_ms={elapsed_ms}"
+        f"latency_ms={elapsed_ms} branches="
+        + ", ".join(f"{k}:{v['latency_ms']}ms{'(timeout)' if v['timed_out'] else ''}" for k, v in branch_meta.items())
     )
 
-    return {
-        **mutable_state,
+    result_state = {
+        **state,
         "kb_docs": kb_docs,
         "web_facts": web_facts,
         "map_result": map_result,
-        "decision_trace": decision_trace,
+        "decision_trace": [trace_entry],
     }
+    if use_kb:
+        result_state["retry_count"] = len(kb_attempts)
+    return result_state
@@ -27,9 +27,9 @@ def _urgency_rank(level: str) -> int:
     return order.get(level, 1)
 
 
-def _llm_need_map(query: str, history_str: str) -> tuple[bool, str]:
+async def _llm_need_map(query: str, history_str: str) -> tuple[bool, str]:
     """判定用户是否在寻找线下资源"""
-    llm = get_llm().llm
+    llm = get_llm()
     prompt = f"""
     你是一个工具路由判定器。请判断用户是否在询问“附近线下资源”，例如：附近宠物医院/救助站/联系方式/地址/导航等。
     只输出严格 JSON。
@@ -38,8 +38,7 @@ def _llm_need_map(query: str, history_str: str) -> tuple[bool, str]:
     最近对话: {history_str}
     """.strip()
     try:
-        resp = llm.invoke([HumanMessage(content=prompt)])
-        raw = resp.content or ""
+        raw = await llm.ainvoke([HumanMessage(content=prompt)]) or ""
         js = extract_first_json_object(raw)
         if not js: return False, "no_json"
         obj = json.loads(js)
@@ -48,7 +47,7 @@ def _llm_need_map(query: str, history_str: str) -> tuple[bool, str]:
         return False, f"error:{str(e)}"
 
 
-def gate(state: AgentState) -> AgentState:
+async def gate(state: AgentState) -> AgentState:
     """
     gate_node：根据意图和分诊结果决定模式与工具准入
     """
@@ -102,7 +101,7 @@ def gate(state: AgentState) -> AgentState:
 
     if enable_map and bool(location) and mode != "emergency" and query_for_map:
         history_str = str(state.get("chat_history", [])[-3:])
-        need_map, need_map_reason = _llm_need_map(query_for_map, history_str)
+        need_map, need_map_reason = await _llm_need_map(query_for_map, history_str)
         reasons.append(f"llm_map_check:{need_map_reason}")
 
     # 工具开关矩阵
@@ -118,25 +117,23 @@ def gate(state: AgentState) -> AgentState:
         "tools": tools,
         "map_params": {
             "radius_km": 10, # 默认 10 km
-            "resource_type": "hospital",
+            "resource_types": ["hospital", "shelter"],  # 一次调用并发查询，合并后按距离排序
+            "max_results": 5,
+            "max_per_type": 3,
         },
         "reasons": reasons,
     }
 
-    # 记录追踪
-    decision_trace = list(state.get("decision_trace") or [])
-    decision_trace.append({
-        "node": "gate_node",
-        "mode": mode,
-        "urgency_snapshot": urgency,
-        "intent_snapshot": intent,
-        "tools_allowed": [t for t, v in tools.items() if v]
-    })
-
     logger.info(f"Gate Decision: Mode={mode}, Tools={tools}, Reasons={reasons}")
 
     return {
         **state,
         "gate": gate_obj,
-        "decision_trace": decision_trace,
+        "decision_trace": [{
+            "node": "gate_node",
+            "mode": mode,
+            "urgency_snapshot": urgency,
+            "intent_snapshot": intent,
+            "tools_allowed": [t for t, v in tools.items() if v]
+        }],
     }
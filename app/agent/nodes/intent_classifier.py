@@ -32,15 +32,16 @@ def _format_chat_history(chat_history: list, limit: int = 5) -> str:
     return "\n".join(lines)
 
 
-def intent_classifier(state: AgentState) -> dict:
+async def intent_classifier(state: AgentState) -> dict:
     """
     意图分类 Node：全部委托给 LLM 处理。
     使用 common.utils 统一文本清洗逻辑。
+    无历史对话时与 rewrite_query 并行执行，回退到 normalized_query；
+    有历史对话时默认等待 rewrite_query（REWRITE_DEPENDENT_NODES_WITH_HISTORY），使用补全指代后的 query。
     """
     # 优先获取重写后的 Query
-    query = clean_text(state.get("rewrite_query") or state.get("query") or "")
+    query = clean_text(state.get("rewrite_query") or state.get("normalized_query") or state.get("query") or "")
     chat_history = state.get("chat_history") or []
-    decision_trace = list(state.get("decision_trace") or [])
 
     if not query:
         return {"user_intent": "unclear"}
@@ -73,7 +74,7 @@ def intent_classifier(state: AgentState) -> dict:
 
 请分析语义，直接返回 JSON 格式结果。"""
 
-        response: IntentResponse = structured_llm.invoke([HumanMessage(content=prompt)])
+        response: IntentResponse = await structured_llm.ainvoke([HumanMessage(content=prompt)])
         intent = response.intent
         reason = response.reason
         status = "llm_success"
@@ -85,14 +86,13 @@ def intent_classifier(state: AgentState) -> dict:
         status = "llm_fallback"
 
     logger.info(f"Intent: {intent} | Reason: {reason}")
-    decision_trace.append({
-        "node": "intent_classifier",
-        "status": status,
-        "intent": intent,
-        "reason": reason,
-    })
 
     return {
         "user_intent": intent,
-        "decision_trace": decision_trace
+        "decision_trace": [{
+            "node": "intent_classifier",
+            "status": status,
+            "intent": intent,
+            "reason": reason,
+        }]
     }
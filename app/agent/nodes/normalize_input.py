@@ -108,7 +108,7 @@ def _to_bool(v: Any, default: bool = False) -> bool:
     return default
 
 
-def normalize_input(state: AgentState) -> AgentState:
+async def normalize_input(state: AgentState) -> AgentState:
     """
     normalize_input_node：Agent 入口防呆层/适配层
     """
@@ -129,11 +129,7 @@ def normalize_input(state: AgentState) -> AgentState:
     location = clean_text(state.get("location")) or None
     radius_km = _normalize_radius_km(state.get("radius_km"), default=5)
 
-    decision_trace = state.get("decision_trace") or []
-    if not isinstance(decision_trace, list):
-        decision_trace = []
-
-    decision_trace.append({
+    trace_entry = {
         "node": "normalize_input_node",
         "raw_query_empty": not bool(raw_query),
         "normalized_query": normalized_query,
@@ -143,7 +139,7 @@ def normalize_input(state: AgentState) -> AgentState:
         "enable_map": enable_map,
         "has_location": bool(location),
         "radius_km": radius_km,
-    })
+    }
 
     logger.info(
         "normalize_input_node: "
@@ -164,5 +160,5 @@ def normalize_input(state: AgentState) -> AgentState:
         "enable_map": enable_map,
         "location": location,
         "radius_km": radius_km,
-        "decision_trace": decision_trace,
+        "decision_trace": [trace_entry],
     }
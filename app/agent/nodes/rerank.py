@@ -1,19 +1,81 @@
-from typing import List
+from typing import List, Tuple
 from loguru import logger
 from langchain_core.documents import Document
 from app.agent.state import AgentState
 from app.config import settings
 from app.knowledge_base.reranker import get_reranker
+from app.utils.concurrency import run_blocking
 
 
-def rerank_documents(state: AgentState) -> AgentState:
+def rerank_params(retry_count: int) -> Tuple[float, int]:
+    """
+    第 retry_count 轮（从 1 开始）的 rerank 阈值与 Top_N：
+    每重试一次阈值下降 0.1（最低 0.3），Top_N 扩大 5
+    """
+    threshold = max(settings.MIN_RERANK_SCORE - ((retry_count - 1) * 0.1), 0.3)
+    top_n = settings.RERANK_TOP_K + 5 * retry_count
+    return threshold, top_n
+
+
+def select_reranked(
+        scored: List[Tuple[Document, float]],
+        threshold: float,
+        top_n: int,
+) -> List[Document]:
+    """
+    从已打分（按分数降序）的候选中取 Top_N 并按阈值过滤。
+    返回新的 Document（写入 rerank_score / confidence），不修改输入，便于同一份打分结果多轮复用。
+    """
+    filtered_docs = []
+    for doc, score in scored[:top_n]:
+        # 记录日志方便 Debug
+        logger.info(f"文档 {doc.metadata.get('source', 'ID:' + str(doc.id))} 分数: {score:.3f}")
+
+        if score >= threshold:
+            filtered_docs.append(Document(
+                id=doc.id,
+                page_content=doc.page_content,
+                metadata={**doc.metadata, "rerank_score": score,
+                          "confidence": round(min(max(score, 0.0), 1.0), 3)},
+            ))
+
+    # 【关键】保底机制：如果过滤后一个都不剩，强制保留排序的前 2 条
+    # 防止 sufficiency_judge 再次触发循环
+    if not filtered_docs and scored:
+        logger.warning(f"⚠️ 所有文档均低于阈值 {threshold}，触发保底机制保留 Top-2")
+        filtered_docs = [
+            Document(
+                id=doc.id,
+                page_content=doc.page_content,
+                metadata={**doc.metadata, "rerank_score": score, "confidence": 0.3},  # 给一个较低的默认置信度
+            )
+            for doc, score in scored[:2]
+        ]
+
+    return filtered_docs
+
+
+async def score_documents(query: str, docs: List[Document]) -> List[Tuple[Document, float]]:
+    """对候选文档各做一次 CrossEncoder 打分，返回按分数降序的 (Document, score)"""
+    valid_docs = [d for d in docs if isinstance(d.page_content, str) and d.page_content.strip()]
+    if not query or not valid_docs:
+        return []
+
+    # CrossEncoder 推理为 CPU 密集调用，放到推理线程池执行
+    scores = await run_blocking(lambda: get_reranker().score(query, valid_docs))
+
+    scored = list(zip(valid_docs, scores))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored
+
+
+async def rerank_documents(state: AgentState) -> AgentState:
     query: str = state.get("rewrite_query") or state.get("query")
     docs: List[Document] = state.get("kb_docs", [])
     retry_count: int = state.get("retry_count", 0)
 
     # 1. 增加重试时的衰减系数 (核心：让重试有意义)
-    # 比如每重试一次，阈值下降 0.1，最低不低于 0.3
-    current_threshold = max(settings.MIN_RERANK_SCORE - ((retry_count - 1) * 0.1), 0.3)
+    current_threshold, top_n = rerank_params(retry_count)
 
     if not query or not docs:
         return state
@@ -25,33 +87,14 @@ def rerank_documents(state: AgentState) -> AgentState:
 
     logger.info(f"🔁 开始 Rerank (重试轮次: {retry_count}, 当前阈值: {current_threshold:.2f})")
 
-    # 根据重试次数动态扩大 Top_N
-    top_n = settings.RERANK_TOP_K + 5 * retry_count
-    reranker = get_reranker(top_n=top_n)
-
-    reranked_docs = reranker.rerank(query=query, documents=docs)
+    # 根据重试次数动态扩大 Top_N（每次调用传入，不依赖 reranker 实例状态）
+    # CrossEncoder 推理为 CPU 密集调用，放到推理线程池执行
+    scored = await run_blocking(
+        lambda: get_reranker().rerank_with_scores(query=query, documents=docs, top_n=top_n)
+    )
 
     # 3. 过滤并增加保底逻辑
-    filtered_docs = []
-    for doc in reranked_docs:
-        score = float(doc.metadata.get("rerank_score", 0.0))
-        doc.metadata["rerank_score"] = score
-
-        # 记录日志方便 Debug
-        logger.info(f"文档 {doc.metadata.get('source', 'ID:' + str(doc.id))} 分数: {score:.3f}")
-
-        if score >= current_threshold:
-            # 顺便更新置信度
-            doc.metadata["confidence"] = round(min(max(score, 0.0), 1.0), 3)
-            filtered_docs.append(doc)
-
-    # 4. 【关键】保底机制：如果过滤后一个都不剩，强制保留原始排序的前 2 条
-    # 防止 sufficiency_judge 再次触发循环
-    if not filtered_docs and reranked_docs:
-        logger.warning(f"⚠️ 所有文档均低于阈值 {current_threshold}，触发保底机制保留 Top-2")
-        filtered_docs = reranked_docs[:2]
-        for d in filtered_docs:
-            d.metadata["confidence"] = 0.3  # 给一个较低的默认置信度
+    filtered_docs = select_reranked(scored, current_threshold, top_n)
 
     logger.info(f"✅ Rerank 完成，保留文档数: {len(filtered_docs)}")
 
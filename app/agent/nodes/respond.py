@@ -171,16 +171,13 @@ async def respond(state: AgentState) -> AgentState:
         else:
             response = "抱歉，处理您的问题时遇到了一些麻烦。请检查您的输入，或稍后重试。如果情况紧急，请直接联系兽医。"
 
-    decision_trace = state.get("decision_trace") or []
-    decision_trace.append({
-        "node": "respond_node",
-        "mode": mode,
-        "sufficiency_level": (state.get("sufficiency") or {}).get("level"),
-        "used_llm": True,
-    })
-
     return {
         **state,
         "response": response,
-        "decision_trace": decision_trace,
+        "decision_trace": [{
+            "node": "respond_node",
+            "mode": mode,
+            "sufficiency_level": (state.get("sufficiency") or {}).get("level"),
+            "used_llm": True,
+        }],
     }
@@ -1,15 +1,22 @@
+from typing import List
+
+from langchain_core.documents import Document
+
 from app.agent.state import AgentState
 from app.config import settings
 from app.knowledge_base.retriever import get_retriever
+from app.utils.concurrency import run_blocking
 
 
-def retrieve_documents(state: AgentState) -> AgentState:
+async def retrieve_documents(state: AgentState) -> AgentState:
     """
     从向量知识库中检索相关文档
 
     改进点：
     - 支持上层（如 collect_evidence_node）通过 state["force_top_k"] 强制指定召回数量
     - 保持旧逻辑兼容：未提供 force_top_k 时，仍使用 settings.RETRIEVAL_TOP_K + 5*retry_count
+    - embedding + Qdrant 检索为阻塞调用，放到推理线程池执行
+    - 只做召回，rerank 交给 rerank_documents（按重试轮次扩大 Top_N / 放宽阈值）
     """
 
     query = state.get("rewrite_query") or state.get("query")
@@ -24,10 +31,28 @@ def retrieve_documents(state: AgentState) -> AgentState:
     except Exception:
         top_k = settings.RETRIEVAL_TOP_K + 5 * retry_count
 
-    retriever = get_retriever(top_k=top_k)
-    docs = retriever.retrieve(query, species=state.get("vision_facts", {}).get("species"), urgency=state.get("urgency"))
+    species = (state.get("vision_facts") or {}).get("species")
+    urgency = state.get("urgency")
+    docs = await run_blocking(
+        lambda: get_retriever(top_k=top_k).search(query, species=species, urgency=urgency)
+    )
 
     return {
         "kb_docs": docs,
         "retry_count": retry_count + 1
     }
+
+
+async def retrieve_candidates(
+        query: str,
+        top_k: int,
+        species: str | None = None,
+        urgency: str | None = None,
+) -> List[Document]:
+    """只做 Hybrid 召回、不做 rerank，供 collect_evidence 单次超量召回使用"""
+    if not query:
+        return []
+
+    return await run_blocking(
+        lambda: get_retriever(top_k=top_k).search(query, species=species, urgency=urgency)
+    )
@@ -25,7 +25,7 @@ def format_chat_history_for_prompt(chat_history: list[tuple[str, str]]) -> str:
     return "\n".join(formatted_lines)
 
 
-def rewrite_query(state: AgentState) -> AgentState:
+async def rewrite_query(state: AgentState) -> AgentState:
     """
     重写用户查询以改善搜索效果
 
@@ -39,7 +39,7 @@ def rewrite_query(state: AgentState) -> AgentState:
 
     if not input_query:
         logger.warning("rewrite_query_node: 输入 query 为空，跳过重写")
-        return {**state, "rewrite_query": ""}
+        return {"rewrite_query": ""}
     try:
         llm = get_llm().llm  # 这里的LLM不能是封装的类，否则会报错
         prompt = PromptTemplate(
@@ -47,7 +47,7 @@ def rewrite_query(state: AgentState) -> AgentState:
             input_variables=["query", "chat_history"],
         )
         chain = prompt | llm | StrOutputParser()
-        new_query = chain.invoke({
+        new_query = await chain.ainvoke({
             "query": input_query,
             "chat_history": format_chat_history_for_prompt(chat_history),
         })
@@ -57,31 +57,33 @@ def rewrite_query(state: AgentState) -> AgentState:
             new_query = input_query
 
         logger.info(f"重写后的查询：{new_query}")
-        decision_trace = state.get("decision_trace")
-        if isinstance(decision_trace, list):
-            decision_trace.append({
+
+        # 与 vision_triage / intent_classifier 并行执行，只返回本节点的增量
+        return {
+            "rewrite_query": new_query,
+            "decision_trace": [{
                 "node": "rewrite_query_node",
                 "input_query": input_query,
                 "output_query": new_query,
                 "history_len": len(chat_history) if isinstance(chat_history, list) else None,
-            })
-
-        return {**state, "rewrite_query": new_query}
+            }],
+        }
     except Exception as e:
         logger.exception(f"rewrite_query_node: 重写失败，使用兜底 query: {e}")
 
-        decision_trace = state.get("decision_trace")
-        if isinstance(decision_trace, list):
-            decision_trace.append({
+        return {
+            "rewrite_query": input_query,
+            "decision_trace": [{
                 "node": "rewrite_query_node",
                 "error": str(e),
                 "fallback_query": input_query,
-            })
-
-        return {**state, "rewrite_query": input_query}
+            }],
+        }
 
 
 if __name__ == "__main__":
+    import asyncio
+
     # 本地快速自测用
     example_state: AgentState = {
         "normalized_query": "它们有哪些要求？",
@@ -93,6 +95,6 @@ if __name__ == "__main__":
         "decision_trace": [],
     }
 
-    result = rewrite_query(example_state)
+    result = asyncio.run(rewrite_query(example_state))
     print("rewrite_query =", result.get("rewrite_query"))
     print("decision_trace =", result.get("decision_trace"))
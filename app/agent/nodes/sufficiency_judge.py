@@ -18,7 +18,7 @@ def _mode_from_gate(state: AgentState) -> str:
     return "normal"
 
 
-def sufficiency_judge(state: AgentState) -> AgentState:
+async def sufficiency_judge(state: AgentState) -> AgentState:
     """
     sufficiency_judge_node：评估证据是否足够支持回答，并产出回复策略。
 
@@ -129,19 +129,13 @@ def sufficiency_judge(state: AgentState) -> AgentState:
             "vision_confidence": vision_conf,
         }
 
-    decision_trace = state.get("decision_trace") or []
-    if not isinstance(decision_trace, list):
-        decision_trace = []
-
-    decision_trace.append({
-        "node": "sufficiency_judge_node",
-        "sufficiency": suff,
-    })
-
     logger.info(f"sufficiency_judge_node: mode={mode} level={suff.get('level')}")
 
     return {
         **state,
         "sufficiency": suff,
-        "decision_trace": decision_trace,
+        "decision_trace": [{
+            "node": "sufficiency_judge_node",
+            "sufficiency": suff,
+        }],
     }
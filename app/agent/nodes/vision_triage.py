@@ -1,7 +1,6 @@
 from __future__ import annotations
 import json
-from typing import Any, Optional
-import requests
+from typing import Any
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from loguru import logger
@@ -11,6 +10,7 @@ from app.agent.state import AgentState
 from app.config import settings
 from app.llm import get_llm
 from app.utils.common import clean_text, extract_first_json_object, normalize_urgency, normalize_red_flags
+from app.utils.http_client import get_http_client
 
 _DEFAULT_VISION_FACTS: dict = {
     "species": "uncertain",
@@ -21,6 +21,7 @@ _DEFAULT_VISION_FACTS: dict = {
     "confidence": 0.2,
 }
 
+
 def _validate_vision_facts(obj: Any) -> dict:
     """将模型输出规范成固定结构，并应用通用归一化逻辑"""
     if not isinstance(obj, dict):
@@ -61,7 +62,7 @@ def _validate_vision_facts(obj: Any) -> dict:
         "confidence": confidence,
     }
 
-def _call_vision_model_batch(image_urls: list[str], prompt: str) -> dict:
+async def _call_vision_model_batch(image_urls: list[str], prompt: str) -> dict:
     """批量多模态调用：单次请求发送所有图片"""
     if not settings.VISION_BASE_URL or not settings.VISION_API_KEY or not settings.VISION_MODEL:
         raise RuntimeError("Vision API 未配置")
@@ -84,8 +85,16 @@ def _call_vision_model_batch(image_urls: list[str], prompt: str) -> dict:
         "messages": [{"role": "user", "content": content_list}],
     }
 
-    resp = requests.post(url, headers=headers, json=payload, timeout=settings.VISION_TIMEOUT_SEC)
-    resp.raise_for_status()
+    # 单次调用耗时长，读超时不重试（避免超出证据收集预算），连接错误 / 429 / 5xx 仍按策略重试
+    resp = await get_http_client().request(
+        "vision",
+        "POST",
+        url,
+        timeout_sec=settings.VISION_TIMEOUT_SEC,
+        retry_on_timeout=False,
+        headers=headers,
+        json=payload,
+    )
     data = resp.json()
 
     content = data["choices"][0]["message"]["content"]
@@ -95,10 +104,14 @@ def _call_vision_model_batch(image_urls: list[str], prompt: str) -> dict:
 
     return json.loads(json_str)
 
-def vision_triage(state: AgentState) -> AgentState:
-    """vision_triage_node：支持多图批处理分诊"""
+async def vision_triage(state: AgentState) -> AgentState:
+    """
+    vision_triage_node：支持多图批处理分诊
+
+    与 rewrite_query 并行执行时 rewrite_query 尚未产出，回退到 normalized_query；
+    只返回本节点的增量字段。
+    """
     image_ids = state.get("image_ids") or []
-    decision_trace = list(state.get("decision_trace") or [])
     query = state.get("rewrite_query") or state.get("normalized_query") or state.get("query")
 
     # 1. 无图片场景：走语义分诊
@@ -109,18 +122,17 @@ def vision_triage(state: AgentState) -> AgentState:
             input_variables=["query"],
         )
         chain = prompt | llm | JsonOutputParser()
-        result = chain.invoke({"query": query})
+        result = await chain.ainvoke({"query": query})
 
         vf = _validate_vision_facts(result)
-        decision_trace.append({
-            "node": "vision_triage_node",
-            "status": "ok_no_image",
-            "urgency": vf["urgency"],
-            "red_flags": vf["red_flags"]
-        })
         logger.info(f"vision_triage_node: ok_no_image, vision_facts: {vf}")
-        return {**state, "vision_facts": vf, "urgency": vf["urgency"], "red_flags": vf["red_flags"],
-                "decision_trace": decision_trace}
+        return {"vision_facts": vf, "urgency": vf["urgency"], "red_flags": vf["red_flags"],
+                "decision_trace": [{
+                    "node": "vision_triage_node",
+                    "status": "ok_no_image",
+                    "urgency": vf["urgency"],
+                    "red_flags": vf["red_flags"]
+                }]}
 
     # 2. 有图片场景：执行批量视觉识别
     try:
@@ -132,23 +144,21 @@ def vision_triage(state: AgentState) -> AgentState:
             raise ValueError("没有有效的图片URL")
 
         # 单次请求发送所有图片
-        raw_result = _call_vision_model_batch(valid_urls, prompt)
+        raw_result = await _call_vision_model_batch(valid_urls, prompt)
         vf = _validate_vision_facts(raw_result)
 
-        decision_trace.append({
-            "node": "vision_triage_node",
-            "status": "ok_batch",
-            "image_count": len(valid_urls),
-            "urgency": vf["urgency"],
-            "red_flags": vf["red_flags"]
-        })
         logger.info(f"vision_triage_node: ok_batch, image_count: {len(valid_urls)}, vision_facts: {vf}")
         return {
-            **state,
             "vision_facts": vf,
             "urgency": vf["urgency"],
             "red_flags": vf["red_flags"],
-            "decision_trace": decision_trace
+            "decision_trace": [{
+                "node": "vision_triage_node",
+                "status": "ok_batch",
+                "image_count": len(valid_urls),
+                "urgency": vf["urgency"],
+                "red_flags": vf["red_flags"]
+            }]
         }
 
     except Exception as e:
@@ -156,16 +166,16 @@ def vision_triage(state: AgentState) -> AgentState:
         vf = dict(_DEFAULT_VISION_FACTS)
         vf["summary"] = f"图片分析失败: {str(e)}。请补充文字描述。"
 
-        decision_trace.append({
-            "node": "vision_triage_node",
-            "status": "error",
-            "error": str(e)
-        })
-        return {**state, "vision_facts": vf, "urgency": vf["urgency"], "red_flags": vf["red_flags"],
-                "decision_trace": decision_trace}
+        return {"vision_facts": vf, "urgency": vf["urgency"], "red_flags": vf["red_flags"],
+                "decision_trace": [{
+                    "node": "vision_triage_node",
+                    "status": "error",
+                    "error": str(e)
+                }]}
 
 if __name__ == "__main__":
     # 模拟多图测试
+    import asyncio
     import os
     
     # 确保本地测试时不走代理（如有必要）
@@ -184,7 +194,7 @@ if __name__ == "__main__":
 
     print("--- 开始多图分诊测试 ---")
     try:
-        final_result = vision_triage(test_state)
+        final_result = asyncio.run(vision_triage(test_state))
         print("\n[测试结果]")
         print(f"紧急程度: {final_result['urgency']}")
         print(f"危险信号: {final_result['red_flags']}")
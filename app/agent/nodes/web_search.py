@@ -6,12 +6,12 @@ from loguru import logger
 web_search_mcp = WebSearchMCP(api_key=settings.TAVILY_API_KEY)
 
 
-def web_search_node(state: AgentState) -> AgentState:
+async def web_search_node(state: AgentState) -> AgentState:
     query = state.get("rewrite_query") or state["query"]
 
     logger.info(f"🔍 WebSearch MCP 查询: {query}")
 
-    result = web_search_mcp.invoke(
+    result = await web_search_mcp.ainvoke(
         query=query,
         max_results=settings.WEB_SEARCH_MAX_RESULTS,
     )
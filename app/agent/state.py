@@ -1,5 +1,6 @@
+import operator
 from typing import List, Optional, Callable, Any
-from typing_extensions import TypedDict
+from typing_extensions import TypedDict, Annotated
 from langchain.schema import Document
 
 
@@ -45,4 +46,8 @@ class AgentState(TypedDict, total=False):
 
     # ===== output =====
     response: Optional[str]
-    decision_trace: list[dict]
\ No newline at end of file
+    # 并行分支各自只返回新增的 trace 条目，由 reducer 追加合并
+    decision_trace: Annotated[list[dict], operator.add]
+
+    # ===== timing =====
+    started_at: Optional[float]             # 图开始执行的 perf_counter，用于计算节点耗时偏移
\ No newline at end of file
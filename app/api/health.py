@@ -2,8 +2,18 @@
 健康检查路由
 """
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from datetime import datetime
 from app.api.schemas import HealthStatusResponse
+from app.knowledge_base.model_registry import memory_report
+from app.mcp.map.cache import map_cache_stats
+from app.mcp.map.resource_store import resource_store_stats
+from app.mcp.web_search.cache import web_cache_stats
+from app.services.response_cache import response_cache_stats
+from app.services.warmup import is_ready, warmup_report
+from app.utils.batching import batcher_stats
+from app.utils.concurrency import agent_in_flight
+from app.utils.http_client import upstream_stats
 
 router = APIRouter()
 
@@ -19,3 +29,40 @@ async def health_check():
         version="1.0.0",
         timestamp=datetime.now().isoformat()
     )
+
+
+@router.get("/health/ready")
+async def readiness_check():
+    """
+    就绪检查：模型预热完成前返回 503，响应中包含各组件的加载 / 首次推理耗时
+    """
+    report = warmup_report()
+    return JSONResponse(status_code=200 if is_ready() else 503, content={"ready": is_ready(), **report})
+
+
+@router.get("/health/inference")
+async def inference_metrics():
+    """
+    推理微批处理指标：各模型的队列深度、批大小分布、平均排队 / 执行耗时，
+    以及模型注册表中各模型的加载耗时与内存占用
+    """
+    return {
+        "agent_in_flight": agent_in_flight(),
+        "batchers": batcher_stats(),
+        "models": memory_report(),
+    }
+
+
+@router.get("/health/upstreams")
+async def upstream_metrics():
+    """
+    外部 HTTP 上游（高德 / Tavily / Vision）指标：调用 / 重试 / 失败次数、状态码分布与延迟直方图，
+    以及地图查询两级缓存各层、本地救助资源库、Web 搜索结果缓存、完整回答缓存的命中统计
+    """
+    return {
+        **upstream_stats(),
+        "map_cache": map_cache_stats(),
+        "map_resource_store": resource_store_stats(),
+        "web_cache": web_cache_stats(),
+        "response_cache": response_cache_stats(),
+    }
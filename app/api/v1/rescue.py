@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from loguru import logger
 from app.db.base import get_db
 from app.db.model import User
 from app.utils.auth import get_current_active_user
+from app.services import response_cache
 from app.services.session_service import SessionService
+from app.utils.concurrency import agent_slot, AgentBusyError
 from app.api.schemas import (
     AnimalRescueQueryRequest,
     AnimalRescueQueryResponse,
@@ -17,13 +20,12 @@ from app.agent.graph import app as agent_app
 router = APIRouter()
 
 
-@router.post("", response_model=AnimalRescueQueryResponse)
-def rescue_query(
-        req: AnimalRescueQueryRequest,
-        current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db),
-):
-    # 1️⃣ Session：支持前端传 session_id 续聊
+def _prepare_session_and_images(db: Session, current_user: User, req: AnimalRescueQueryRequest):
+    """
+    同步的数据库准备工作（会话校验 / 创建、图片权限校验），由 rescue_query 放到线程池执行，避免阻塞事件循环
+    返回 (session, image_ids, images_meta)
+    """
+    # Session：支持前端传 session_id 续聊
     if req.session_id:
         session = SessionService.get_session_by_id(db, req.session_id)
         if not session:
@@ -66,26 +68,45 @@ def rescue_query(
             for i in image_ids
         ]
 
-    # 2️⃣ 调 Agent
-    try:
-        result = agent_app.invoke({
-            "query": req.query,
-            "chat_history": req.chat_history or [],
-            "enable_web_search": req.enable_web_search,
-            "enable_map": req.enable_map,
-            "location": req.location,
-            "radius_km": req.radius_km,
-            "image_ids": image_ids,
-            "images": images_meta,
-        })
-    except Exception as e:
-        logger.exception("Agent 执行失败")
-        raise HTTPException(status_code=500, detail="Agent 执行失败")
+    return session, image_ids, images_meta
+
+
+@router.post("", response_model=AnimalRescueQueryResponse)
+async def rescue_query(
+        req: AnimalRescueQueryRequest,
+        current_user: User = Depends(get_current_active_user),
+        db: Session = Depends(get_db),
+):
+    # 1️⃣ Session + 图片校验（同步 DB 操作在线程池中执行）
+    session, image_ids, images_meta = await run_in_threadpool(_prepare_session_and_images, db, current_user, req)
+
+    # 2️⃣ 调 Agent（非紧急的重复问题直接复用缓存回答）
+    result = response_cache.lookup(req)
+    if result is None:
+        try:
+            async with agent_slot():
+                result = await agent_app.ainvoke({
+                    "query": req.query,
+                    "chat_history": req.chat_history or [],
+                    "enable_web_search": req.enable_web_search,
+                    "enable_map": req.enable_map,
+                    "location": req.location,
+                    "radius_km": req.radius_km,
+                    "image_ids": image_ids,
+                    "images": images_meta,
+                })
+        except AgentBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            logger.exception("Agent 执行失败")
+            raise HTTPException(status_code=500, detail="Agent 执行失败")
+        response_cache.store(req, result)
 
     answer = result.get("response", "")
 
     # 3️⃣ 记录对话
-    SessionService.add_conversation(
+    await run_in_threadpool(
+        SessionService.add_conversation,
         db=db,
         session_id=session.session_id,
         user_input=req.query,
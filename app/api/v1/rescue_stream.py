@@ -10,8 +10,10 @@ from app.agent.graph import app as agent_app
 from app.api.schemas import AnimalRescueQueryRequest
 from app.db.base import get_db
 from app.db.model import User, UploadedImage
+from app.services import response_cache
 from app.services.session_service import SessionService
 from app.utils.auth import get_current_active_user
+from app.utils.concurrency import agent_slot
 from app.utils.fallback import emergency_rescue_template
 
 router = APIRouter()
@@ -37,6 +39,68 @@ def _validate_or_create_session(db: Session, current_user: User, req: AnimalResc
     )
 
 
+def _build_final_meta(req: AnimalRescueQueryRequest, result: dict) -> dict:
+    """由 Agent 结果构造 done 事件 / 落库用的元信息"""
+    # 提取并转换证据 (kb_docs + web_facts 合并)
+    evidences = []
+
+    # 1) 知识库文档 (kb_docs: List[Document])
+    kb_docs = result.get("kb_docs") or []
+    for doc in kb_docs:
+        if hasattr(doc, "page_content"):
+            evidences.append({
+                "page_content": doc.page_content,
+                "metadata": doc.metadata if hasattr(doc, "metadata") else {},
+            })
+
+    # 2) WebSearch 证据（无论 KB 是否命中都追加）
+    web_facts = result.get("web_facts") or []
+    for fact in web_facts:
+        if not isinstance(fact, dict):
+            continue
+
+        url = fact.get("url") or fact.get("link") or ""
+        title = fact.get("title") or fact.get("name") or "网页搜索结果"
+        content = fact.get("snippet") or fact.get("content") or fact.get("text") or ""
+
+        if not (url or content):
+            continue
+
+        evidences.append({
+            "page_content": content,
+            "metadata": {
+                "title": title,
+                "source_info": {
+                    "url": url,
+                    "platform": fact.get("source") or fact.get("platform") or "Web Search",
+                    "author": fact.get("author"),
+                    "version": fact.get("version"),
+                },
+                **{k: v for k, v in fact.items() if k not in {"content", "snippet", "text"}},
+            },
+        })
+
+    # 获取 collect_evidence_node 的调试信息
+    collect_trace = next((t for t in result.get("decision_trace", []) if t.get("node") == "collect_evidence_node"), {})
+
+    return {
+        "used_web_search": result.get("used_web_search", False) or collect_trace.get("use_web", False),
+        "used_map": result.get("used_map", False) or collect_trace.get("use_map", False),
+        "evidences": evidences,  # 使用转换后的 evidences
+        "rescue_resources": result.get("rescue_resources", []) if result.get("map_result") else None,
+        # 注意：不要把用户上传的图片回显到 assistant meta，避免前端重复展示
+    # "images": images_meta,
+        # ===== 调试信息 (方便定位 web_search 不显示问题) =====
+        "debug": {
+            "use_web": collect_trace.get("use_web"),
+            "web_facts_len": len(result.get("web_facts") or []),
+            "web_error": collect_trace.get("web_error"),
+            "kb_docs_len": len(result.get("kb_docs") or []),
+            "enable_web_search": req.enable_web_search,
+        }
+    }
+
+
 @router.post("/stream")
 async def rescue_query_stream(
     req: AnimalRescueQueryRequest,
@@ -92,94 +156,48 @@ async def rescue_query_stream(
             # 并行执行：一边跑图，一边持续消费队列
             async def run_agent():
                 nonlocal final_meta, answer
-                result = await agent_app.ainvoke({
-                    "query": req.query,
-                    "chat_history": req.chat_history or [],
-                    "enable_web_search": req.enable_web_search,
-                    "enable_map": req.enable_map,
-                    "location": req.location,
-                    "radius_km": req.radius_km,
-                    "image_ids": [img["url"] for img in images_meta] if images_meta else [],
-                    # 注意：不要把用户上传的图片回显到 assistant meta，避免前端重复展示
-                    # "images": images_meta,
-                    "writer": writer,
-                })
+                # 并发限流：超出 AGENT_MAX_CONCURRENCY 的会话排队等待
+                async with agent_slot():
+                    result = await agent_app.ainvoke({
+                        "query": req.query,
+                        "chat_history": req.chat_history or [],
+                        "enable_web_search": req.enable_web_search,
+                        "enable_map": req.enable_map,
+                        "location": req.location,
+                        "radius_km": req.radius_km,
+                        "image_ids": [img["url"] for img in images_meta] if images_meta else [],
+                        # 注意：不要把用户上传的图片回显到 assistant meta，避免前端重复展示
+                        # "images": images_meta,
+                        "writer": writer,
+                    })
                 answer = result.get("response", "") or ""
 
-                # 提取并转换证据 (kb_docs + web_facts 合并)
-                evidences = []
-
-                # 1) 知识库文档 (kb_docs: List[Document])
-                kb_docs = result.get("kb_docs") or []
-                for doc in kb_docs:
-                    if hasattr(doc, "page_content"):
-                        evidences.append({
-                            "page_content": doc.page_content,
-                            "metadata": doc.metadata if hasattr(doc, "metadata") else {},
-                        })
-
-                # 2) WebSearch 证据（无论 KB 是否命中都追加）
-                web_facts = result.get("web_facts") or []
-                for fact in web_facts:
-                    if not isinstance(fact, dict):
-                        continue
-
-                    url = fact.get("url") or fact.get("link") or ""
-                    title = fact.get("title") or fact.get("name") or "网页搜索结果"
-                    content = fact.get("snippet") or fact.get("content") or fact.get("text") or ""
-
-                    if not (url or content):
+                final_meta = _build_final_meta(req, result)
+                response_cache.store(req, result)
+
+            # 回答缓存命中：不跑图，直接按块回放 delta
+            cached = response_cache.lookup(req)
+            if cached is not None:
+                answer = cached.get("response") or ""
+                final_meta = {**_build_final_meta(req, cached), "cached": True}
+                for chunk in response_cache.replay_chunks(answer):
+                    yield _sse("delta", {"text": chunk})
+            else:
+                # 启动后台任务
+                agent_task = asyncio.create_task(run_agent())
+
+                # 持续消费队列，直到 agent_task 完成
+                while not agent_task.done():
+                    try:
+                        msg = await asyncio.wait_for(queue.get(), timeout=0.5)
+                        yield msg
+                    except asyncio.TimeoutError:
+                        # 定期发心跳，防止缓冲区不动
+                        yield _sse("heartbeat", {"status": "waiting"})
                         continue
 
-                    evidences.append({
-                        "page_content": content,
-                        "metadata": {
-                            "title": title,
-                            "source_info": {
-                                "url": url,
-                                "platform": fact.get("source") or fact.get("platform") or "Web Search",
-                                "author": fact.get("author"),
-                                "version": fact.get("version"),
-                            },
-                            **{k: v for k, v in fact.items() if k not in {"content", "snippet", "text"}},
-                        },
-                    })
-
-                # 获取 collect_evidence_node 的调试信息
-                collect_trace = next((t for t in result.get("decision_trace", []) if t.get("node") == "collect_evidence_node"), {})
-
-                final_meta = {
-                    "used_web_search": result.get("used_web_search", False) or collect_trace.get("use_web", False),
-                    "used_map": result.get("used_map", False) or collect_trace.get("use_map", False),
-                    "evidences": evidences,  # 使用转换后的 evidences
-                    "rescue_resources": result.get("rescue_resources", []) if result.get("map_result") else None,
-                    # 注意：不要把用户上传的图片回显到 assistant meta，避免前端重复展示
-                # "images": images_meta,
-                    # ===== 调试信息 (方便定位 web_search 不显示问题) =====
-                    "debug": {
-                        "use_web": collect_trace.get("use_web"),
-                        "web_facts_len": len(result.get("web_facts") or []),
-                        "web_error": collect_trace.get("web_error"),
-                        "kb_docs_len": len(result.get("kb_docs") or []),
-                        "enable_web_search": req.enable_web_search,
-                    }
-                }
-
-            # 启动后台任务
-            agent_task = asyncio.create_task(run_agent())
-
-            # 持续消费队列，直到 agent_task 完成
-            while not agent_task.done():
-                try:
-                    msg = await asyncio.wait_for(queue.get(), timeout=0.5)
-                    yield msg
-                except asyncio.TimeoutError:
-                    # 定期发心跳，防止缓冲区不动
-                    yield _sse("heartbeat", {"status": "waiting"})
-                    continue
-
-            # 等待 agent_task 结束（如果有异常会在这里抛出）
-            await agent_task
+                # 等待 agent_task 结束（如果有异常会在这里抛出）
+                await agent_task
 
         except Exception as e:
             logger.exception("Agent 执行失败（stream），返回兜底答案")
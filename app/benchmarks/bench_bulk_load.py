@@ -0,0 +1,77 @@
+"""
+Qdrant 导入路径基准：LangChain add_documents（每 50 条一次 upsert） vs 原生 bulk_load（upload_points）
+两条路径分别写入临时集合，结束后删除
+
+用法：
+    python -m app.benchmarks.bench_bulk_load --limit 2000
+    python -m app.benchmarks.bench_bulk_load --parallel 4 --keep-hnsw
+"""
+import argparse
+import time
+
+from sqlalchemy.orm import joinedload
+
+from app.db.base import SessionLocal
+from app.db.knowledge_model import Chunk
+from app.knowledge_base.vector_store import QdrantHybridStore, chunk_to_document
+
+
+def load_chunks(limit: int):
+    db = SessionLocal()
+    try:
+        return db.query(Chunk).options(joinedload(Chunk.document)).order_by(Chunk.id).limit(limit).all()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Qdrant 导入路径基准")
+    parser.add_argument("--limit", type=int, default=2000, help="从 MySQL 读取的 chunk 数")
+    parser.add_argument("--parallel", type=int, default=None, help="upload_points 并行进程数")
+    parser.add_argument("--embed-batch-size", type=int, default=None)
+    parser.add_argument("--upload-batch-size", type=int, default=None)
+    parser.add_argument("--keep-hnsw", action="store_true", help="bulk_load 导入期间不关闭 HNSW")
+    parser.add_argument("--keep-collections", action="store_true", help="结束后保留临时集合")
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.limit)
+    if not chunks:
+        raise SystemExit("MySQL 中没有 chunk 数据，请先运行爬虫与入库")
+    print(f"语料 {len(chunks)} 条 chunk")
+
+    results = {}
+
+    store = QdrantHybridStore(collection_name="bench_load_langchain", recreate=True)
+    store.embedding_manager.embeddings.embed_documents(["预热"])
+    start = time.perf_counter()
+    store.add_documents(chunks)
+    store.wait_until_indexed()
+    results["langchain add_documents"] = (time.perf_counter() - start, None)
+    if not args.keep_collections:
+        store.client.delete_collection(store.collection_name)
+
+    store = QdrantHybridStore(collection_name="bench_load_native", recreate=True)
+    docs = [chunk_to_document(c) for c in chunks]
+    stats = store.bulk_load(
+        docs,
+        embed_batch_size=args.embed_batch_size,
+        upload_batch_size=args.upload_batch_size,
+        parallel=args.parallel,
+        disable_indexing=not args.keep_hnsw,
+    )
+    results["native bulk_load"] = (stats["elapsed_sec"], stats["index_wait_sec"])
+    count = store.client.count(store.collection_name, exact=True).count
+    if count != len(chunks):
+        print(f"⚠️ bulk_load 点数 {count} 与 chunk 数 {len(chunks)} 不一致")
+    if not args.keep_collections:
+        store.client.delete_collection(store.collection_name)
+
+    baseline = results["langchain add_documents"][0]
+    print(f"\n{'path':>24} {'total_s':>9} {'index_wait_s':>13} {'points/s':>10} {'speedup':>8}")
+    for name, (elapsed, index_wait) in results.items():
+        wait_col = f"{index_wait:>13.1f}" if index_wait is not None else f"{'-':>13}"
+        print(f"{name:>24} {elapsed:>9.1f} {wait_col} {len(chunks) / elapsed:>10.1f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+过滤检索基准：随集合规模增长（默认到 150k 合成 chunk），对比
+- 不带过滤的 Hybrid 查询
+- 带 species + urgency 过滤、有 keyword payload 索引
+- 带同样过滤、无 payload 索引（临时删除索引）
+的 p50 / p95 延迟。查询结构与 LangChain QdrantVectorStore 的 Hybrid 模式一致（dense + sparse prefetch + RRF）
+
+需要连接 Qdrant 服务（QDRANT_URL）；内存模式没有 HNSW 与 payload 索引，结果没有参考意义
+
+用法：
+    python -m app.benchmarks.bench_filtered_search
+    python -m app.benchmarks.bench_filtered_search --sizes 20000 100000 --queries 100
+"""
+import argparse
+import time
+import uuid
+from typing import Dict, List
+
+import numpy as np
+from qdrant_client.http import models as rest_models
+
+from app.config import settings
+from app.knowledge_base.vector_store import (
+    PAYLOAD_INDEX_FIELDS,
+    URGENCY,
+    build_filter,
+    build_search_params,
+    create_qdrant_client,
+    dense_vector_params,
+    ensure_payload_indexes,
+    quantization_config,
+    sparse_vector_params,
+)
+
+_SPECIES = ["cat", "dog", "bird", "rabbit", "uncertain"]
+_SPECIES_P = [0.4, 0.35, 0.1, 0.05, 0.1]
+_CATEGORIES = ["poisoning", "trauma", "skin", "behavior", "nutrition", "infection", "emergency"]
+_SPARSE_VOCAB = 30000
+_SPARSE_NNZ = 24
+
+
+def _sparse(rng: np.random.Generator) -> rest_models.SparseVector:
+    indices = rng.choice(_SPARSE_VOCAB, size=_SPARSE_NNZ, replace=False)
+    return rest_models.SparseVector(indices=indices.tolist(), values=rng.random(_SPARSE_NNZ).tolist())
+
+
+def make_points(start: int, n: int, dim: int, rng: np.random.Generator) -> List[rest_models.PointStruct]:
+    dense = rng.standard_normal((n, dim)).astype(np.float32)
+    dense /= np.linalg.norm(dense, axis=1, keepdims=True)
+    species = rng.choice(_SPECIES, size=n, p=_SPECIES_P)
+    urgency = rng.choice(list(URGENCY), size=n)
+    category = rng.choice(_CATEGORIES, size=n)
+
+    points = []
+    for j in range(n):
+        i = start + j
+        points.append(rest_models.PointStruct(
+            id=str(uuid.UUID(int=i + 1)),
+            vector={"": dense[j].tolist(), "sparse": _sparse(rng)},
+            payload={
+                "page_content": f"synthetic chunk {i}",
+                "metadata": {
+                    "species": str(species[j]),
+                    "urgency": str(urgency[j]),
+                    "category": str(category[j]),
+                    "parent_id": f"doc-{i // 8}",
+                    "chunk_id": f"chunk-{i}",
+                },
+            },
+        ))
+    return points
+
+
+def _wait_green(client, collection: str, timeout_sec: float = 1800):
+    deadline = time.monotonic() + timeout_sec
+    while time.monotonic() < deadline:
+        if client.get_collection(collection).status == rest_models.CollectionStatus.GREEN:
+            return
+        time.sleep(1)
+
+
+def _query(client, collection: str, dense, sparse, search_filter, k: int):
+    params = build_search_params()
+    return client.query_points(
+        collection_name=collection,
+        prefetch=[
+            rest_models.Prefetch(using="", query=dense, filter=search_filter, limit=k, params=params),
+            rest_models.Prefetch(using="sparse", query=sparse, filter=search_filter, limit=k, params=params),
+        ],
+        query=rest_models.FusionQuery(fusion=rest_models.Fusion.RRF),
+        limit=k,
+        with_payload=True,
+    ).points
+
+
+def measure(client, collection: str, queries, search_filter, k: int) -> Dict[str, float]:
+    latencies = []
+    for dense, sparse in queries:
+        start = time.perf_counter()
+        _query(client, collection, dense, sparse, search_filter, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    arr = np.asarray(latencies)
+    return {"p50": float(np.percentile(arr, 50)), "p95": float(np.percentile(arr, 95))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Qdrant 过滤 vs 非过滤检索延迟基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000, 150000])
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=settings.RETRIEVAL_TOP_K)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--collection", default="bench_filtered_search")
+    parser.add_argument("--keep", action="store_true", help="结束后保留集合")
+    args = parser.parse_args()
+
+    if not settings.QDRANT_URL:
+        print("⚠️ 未配置 QDRANT_URL，内存模式下 HNSW / payload 索引不生效")
+
+    client = create_qdrant_client()
+    if client.collection_exists(args.collection):
+        client.delete_collection(args.collection)
+    client.create_collection(
+        collection_name=args.collection,
+        vectors_config=dense_vector_params(args.dim),
+        sparse_vectors_config={"sparse": sparse_vector_params()},
+        hnsw_config=rest_models.HnswConfigDiff(m=settings.QDRANT_HNSW_M, ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT),
+        quantization_config=quantization_config(),
+    )
+    ensure_payload_indexes(client, args.collection)
+
+    rng = np.random.default_rng(42)
+    queries = []
+    for _ in range(args.queries):
+        q = rng.standard_normal(args.dim).astype(np.float32)
+        queries.append(((q / np.linalg.norm(q)).tolist(), _sparse(rng)))
+    search_filter = build_filter("cat", "common")
+
+    print(f"{'size':>8} {'mode':>16} {'p50_ms':>8} {'p95_ms':>8}")
+    loaded = 0
+    try:
+        for size in sorted(args.sizes):
+            while loaded < size:
+                n = min(args.batch, size - loaded)
+                client.upload_points(args.collection, points=make_points(loaded, n, args.dim, rng), wait=True)
+                loaded += n
+            _wait_green(client, args.collection)
+
+            rows = {
+                "unfiltered": measure(client, args.collection, queries, None, args.k),
+                "filtered+index": measure(client, args.collection, queries, search_filter, args.k),
+            }
+
+            for field in PAYLOAD_INDEX_FIELDS:
+                client.delete_payload_index(args.collection, field_name=field)
+            _wait_green(client, args.collection)
+            rows["filtered-noindex"] = measure(client, args.collection, queries, search_filter, args.k)
+            ensure_payload_indexes(client, args.collection)
+            _wait_green(client, args.collection)
+
+            for mode, r in rows.items():
+                print(f"{size:>8} {mode:>16} {r['p50']:>8.2f} {r['p95']:>8.2f}")
+    finally:
+        if not args.keep:
+            client.delete_collection(args.collection)
+
+
+if __name__ == "__main__":
+    main()
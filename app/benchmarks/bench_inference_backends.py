@@ -0,0 +1,183 @@
+"""
+推理后端基准：torch fp32 / torch_int8 / onnx / onnx_int8
+在 MySQL 中的 chunk 语料上分别测试 Embedding 与 Rerank 的延迟、吞吐，以及相对 fp32 的排序一致性（NDCG@k）
+
+用法：
+    python -m app.benchmarks.bench_inference_backends
+    python -m app.benchmarks.bench_inference_backends --chunks 2000 --backends torch onnx_int8
+    python -m app.benchmarks.bench_inference_backends --component rerank --top-k 30
+"""
+import argparse
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.knowledge_base.inference_backend import BACKENDS, load_cross_encoder, load_sentence_transformer
+
+_QUERIES = [
+    "流浪猫受伤出血怎么处理",
+    "幼猫不吃东西一直叫怎么办",
+    "狗误食巧克力中毒症状",
+    "捡到腿骨折的小狗如何固定搬运",
+    "猫咪抽搐口吐白沫急救",
+    "刚出生的小奶猫怎么喂奶保暖",
+    "流浪狗被车撞了还有呼吸",
+    "鸟从窝里掉下来该不该捡",
+    "猫眼睛发炎流脓怎么处理",
+    "狗中暑的急救方法",
+    "发现受伤的刺猬怎么办",
+    "猫瘟的早期症状和护理",
+]
+
+
+def load_corpus(limit: int) -> List[str]:
+    """从 MySQL 读取前 limit 条非空 chunk 文本"""
+    from app.db.base import SessionLocal
+    from app.db.knowledge_model import Chunk
+
+    db = SessionLocal()
+    try:
+        rows = db.query(Chunk.content).order_by(Chunk.id).limit(limit).all()
+        return [r[0] for r in rows if r[0] and r[0].strip()]
+    finally:
+        db.close()
+
+
+def ndcg_at_k(reference: Sequence[int], candidate: Sequence[int], k: int) -> float:
+    """
+    以 fp32 排序为标准答案：参考排名第 r 位（从 0 开始）的条目增益为 k - r，其余为 0
+    """
+    gains = {idx: k - r for r, idx in enumerate(reference[:k])}
+    dcg = sum(gains.get(idx, 0) / np.log2(i + 2) for i, idx in enumerate(candidate[:k]))
+    idcg = sum((k - r) / np.log2(r + 2) for r in range(min(k, len(reference))))
+    return float(dcg / idcg) if idcg > 0 else 0.0
+
+
+def _percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    arr = np.asarray(samples_ms)
+    return {"p50": float(np.percentile(arr, 50)), "p95": float(np.percentile(arr, 95))}
+
+
+def bench_embedding(backend: str, model_path: str, corpus: List[str], queries: List[str],
+                    batch_size: int, ref: Dict, ndcg_k: int) -> Dict:
+    start = time.perf_counter()
+    model = load_sentence_transformer(model_path, backend, local_files_only=settings.EMBEDDING_OFFLINE)
+    load_sec = time.perf_counter() - start
+
+    model.encode(queries[:2], normalize_embeddings=True)  # 预热
+
+    start = time.perf_counter()
+    doc_vecs = model.encode(corpus, batch_size=batch_size, normalize_embeddings=True)
+    corpus_sec = time.perf_counter() - start
+
+    latencies, query_vecs = [], []
+    for q in queries:
+        start = time.perf_counter()
+        query_vecs.append(model.encode(q, normalize_embeddings=True))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    rankings = np.argsort(-(np.asarray(query_vecs) @ doc_vecs.T), axis=1)
+    if not ref:
+        ref.update(doc_vecs=doc_vecs, rankings=rankings)
+
+    ndcg = np.mean([ndcg_at_k(r, c, ndcg_k) for r, c in zip(ref["rankings"], rankings)])
+    cos = float(np.mean(np.sum(doc_vecs * ref["doc_vecs"], axis=1)))
+
+    return {
+        "load_sec": load_sec,
+        **_percentiles(latencies),
+        "throughput": len(corpus) / corpus_sec,
+        "ndcg": ndcg,
+        "cos_vs_fp32": cos,
+    }
+
+
+def bench_rerank(backend: str, model_path: str, candidates: List[List[str]], queries: List[str],
+                 batch_size: int, ref: Dict, ndcg_k: int) -> Dict:
+    start = time.perf_counter()
+    model = load_cross_encoder(model_path, backend)
+    load_sec = time.perf_counter() - start
+
+    model.predict([(queries[0], candidates[0][0])])  # 预热
+
+    latencies, rankings, n_pairs = [], [], 0
+    for q, docs in zip(queries, candidates):
+        pairs = [(q, d) for d in docs]
+        start = time.perf_counter()
+        scores = model.predict(pairs, batch_size=batch_size)
+        latencies.append((time.perf_counter() - start) * 1000)
+        rankings.append(np.argsort(-np.asarray(scores)))
+        n_pairs += len(pairs)
+
+    if not ref:
+        ref.update(rankings=rankings)
+
+    ndcg = np.mean([ndcg_at_k(r, c, ndcg_k) for r, c in zip(ref["rankings"], rankings)])
+    top1 = np.mean([r[0] == c[0] for r, c in zip(ref["rankings"], rankings)])
+
+    return {
+        "load_sec": load_sec,
+        **_percentiles(latencies),
+        "throughput": n_pairs / (sum(latencies) / 1000),
+        "ndcg": ndcg,
+        "top1_agree": float(top1),
+    }
+
+
+def _print_table(title: str, unit: str, rows: Dict[str, Dict], extra: str):
+    print(f"\n== {title} ==")
+    print(f"{'backend':>11} {'load_s':>7} {'p50_ms':>8} {'p95_ms':>8} {unit:>12} {'ndcg@k':>7} {extra:>11}")
+    for backend, r in rows.items():
+        print(
+            f"{backend:>11} {r['load_sec']:>7.1f} {r['p50']:>8.1f} {r['p95']:>8.1f} "
+            f"{r['throughput']:>12.1f} {r['ndcg']:>7.4f} {r[extra]:>11.4f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding / Rerank 推理后端基准")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--component", choices=["embedding", "rerank", "both"], default="both")
+    parser.add_argument("--chunks", type=int, default=1000, help="从 MySQL 读取的 chunk 数")
+    parser.add_argument("--top-k", type=int, default=20, help="每条 query 交给 rerank 的候选数")
+    parser.add_argument("--ndcg-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    # fp32 作为一致性基准，始终第一个跑
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+
+    corpus = load_corpus(args.chunks)
+    if not corpus:
+        raise SystemExit("MySQL 中没有 chunk 数据，请先运行爬虫与入库")
+    queries = _QUERIES
+    print(f"语料 {len(corpus)} 条 chunk，{len(queries)} 条 query")
+
+    embed_model = settings.EMBEDDING_MODEL_PATH or settings.EMBEDDING_MODEL
+    embed_ref: Dict = {}
+    embed_rows = {}
+    # rerank 候选取 fp32 dense 检索的 top-k，保证与线上召回分布一致
+    if args.component in ("embedding", "both"):
+        for backend in backends:
+            embed_rows[backend] = bench_embedding(
+                backend, embed_model, corpus, queries, args.batch_size, embed_ref, args.ndcg_k
+            )
+        _print_table("Embedding", "chunks/s", embed_rows, "cos_vs_fp32")
+    else:
+        bench_embedding("torch", embed_model, corpus, queries, args.batch_size, embed_ref, args.ndcg_k)
+
+    if args.component in ("rerank", "both"):
+        candidates = [[corpus[i] for i in ranking[: args.top_k]] for ranking in embed_ref["rankings"]]
+        rerank_ref: Dict = {}
+        rerank_rows = {}
+        for backend in backends:
+            rerank_rows[backend] = bench_rerank(
+                backend, settings.RERANK_MODEL_PATH, candidates, queries, args.batch_size, rerank_ref, args.ndcg_k
+            )
+        _print_table("Rerank", "pairs/s", rerank_rows, "top1_agree")
+
+
+if __name__ == "__main__":
+    main()
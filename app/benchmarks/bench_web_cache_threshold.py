@@ -0,0 +1,103 @@
+"""
+Web 搜索结果缓存的近似命中阈值校准（WEB_CACHE_SIMILARITY）
+
+在标注好的 "同义问题对 / 非同义问题对" 上计算 query 向量的余弦相似度，
+逐个阈值统计：仅按相似度判定、以及叠加关键词一致性校验（key_terms）后的误命中与召回。
+误命中（非同义问题复用了结果）在救助场景下不可接受：关键词表总有遗漏，
+推荐阈值取 "仅按相似度也没有误命中" 的最小值，关键词校验作为第二道防线。
+
+用法：
+    python -m app.benchmarks.bench_web_cache_threshold              # 使用真实 embedding 模型
+    python -m app.benchmarks.bench_web_cache_threshold --show-pairs # 同时打印每对的相似度
+"""
+import argparse
+from typing import List, Tuple
+
+import numpy as np
+
+from app.mcp.web_search.cache import key_terms
+
+# (query_a, query_b, 是否同一问题)
+LABELLED_PAIRS: List[Tuple[str, str, bool]] = [
+    # 同义改写
+    ("猫能吃葡萄吗", "猫咪可以吃葡萄吗", True),
+    ("狗误食巧克力怎么办", "狗狗吃了巧克力该怎么办", True),
+    ("流浪猫受伤流血怎么处理", "流浪猫受伤出血怎么处理", True),
+    ("捡到受伤的鸟怎么办", "路边捡到一只受伤的鸟该怎么办", True),
+    ("狗中暑了怎么急救", "狗狗中暑怎么急救", True),
+    ("猫呕吐是什么原因", "猫咪呕吐是什么原因", True),
+    ("幼猫能喝牛奶吗", "幼猫可以喝牛奶吗", True),
+    ("狗吃了老鼠药怎么办", "狗误食鼠药怎么办", True),
+    ("兔子拉稀怎么办", "兔子腹泻怎么办", True),
+    ("猫发烧了怎么处理", "猫发热了怎么处理", True),
+    # 物种互换
+    ("猫能吃葡萄吗", "狗能吃葡萄吗", False),
+    ("狗误食巧克力怎么办", "猫误食巧克力怎么办", False),
+    ("猫能吃洋葱吗", "兔子能吃洋葱吗", False),
+    ("狗中暑了怎么急救", "猫中暑了怎么急救", False),
+    ("幼猫能喝牛奶吗", "幼犬能喝牛奶吗", False),
+    # 物质 / 症状互换
+    ("猫能吃葡萄吗", "猫能吃巧克力吗", False),
+    ("狗能吃葡萄吗", "狗能吃葡萄干吗", False),
+    ("狗吃了布洛芬怎么办", "狗吃了对乙酰氨基酚怎么办", False),
+    ("猫呕吐怎么办", "猫腹泻怎么办", False),
+    ("狗能吃苹果吗", "狗能吃樱桃吗", False),
+    # 年龄 / 剂量差异
+    ("幼猫能喝牛奶吗", "猫能喝牛奶吗", False),
+    ("狗吃了1片布洛芬", "狗吃了5片布洛芬", False),
+]
+
+
+def cosine_matrix(embed, pairs) -> np.ndarray:
+    texts = sorted({q for a, b, _ in pairs for q in (a, b)})
+    vectors = np.asarray([embed(t) for t in texts], dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = {t: i for i, t in enumerate(texts)}
+    return np.array([float(vectors[index[a]] @ vectors[index[b]]) for a, b, _ in pairs])
+
+
+def evaluate(scores: np.ndarray, labels: np.ndarray, terms_equal: np.ndarray, threshold: float) -> dict:
+    raw = scores >= threshold
+    guarded = raw & terms_equal
+    return {
+        "threshold": threshold,
+        "fp_raw": int((raw & ~labels).sum()),
+        "fp_guarded": int((guarded & ~labels).sum()),
+        "recall_guarded": float((guarded & labels).sum() / max(1, labels.sum())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--show-pairs", action="store_true")
+    args = parser.parse_args()
+
+    from app.knowledge_base.embedding_manager import get_embedding
+    embed = get_embedding().embed_query
+
+    scores = cosine_matrix(embed, LABELLED_PAIRS)
+    labels = np.array([same for _, _, same in LABELLED_PAIRS])
+    terms_equal = np.array([key_terms(a) == key_terms(b) for a, b, _ in LABELLED_PAIRS])
+
+    if args.show_pairs:
+        for (a, b, same), score, eq in zip(LABELLED_PAIRS, scores, terms_equal):
+            print(f"{score:.4f}  {'同义' if same else '不同'}  关键词{'一致' if eq else '不同'}  {a} | {b}")
+        print()
+
+    print(f"{'阈值':>6} {'误命中(仅相似度)':>16} {'误命中(含关键词)':>16} {'召回(含关键词)':>14}")
+    rows = [evaluate(scores, labels, terms_equal, t) for t in np.arange(0.80, 0.995, 0.01)]
+    for r in rows:
+        print(f"{r['threshold']:>6.2f} {r['fp_raw']:>16d} {r['fp_guarded']:>16d} {r['recall_guarded']:>14.2f}")
+
+    safe = [r for r in rows if r["fp_raw"] == 0]
+    if safe:
+        print(
+            f"\n推荐 WEB_CACHE_SIMILARITY={safe[0]['threshold']:.2f}"
+            f"（仅相似度无误命中的最小阈值，召回 {safe[0]['recall_guarded']:.2f}）"
+        )
+    else:
+        print("\n所有阈值下仅按相似度都存在误命中，需依赖关键词校验，请扩充标注对与关键词表")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Web 搜索结果打分微基准：逐条 embedding（旧路径） vs 批量 embedding + NumPy 向量化（normalize_results）
+
+用法：
+    python -m app.benchmarks.bench_web_normalizer            # 使用真实 BGE 模型
+    python -m app.benchmarks.bench_web_normalizer --fake     # 使用随机向量，只测 NumPy 路径开销
+"""
+import argparse
+import hashlib
+import random
+import time
+from typing import Dict, List
+from urllib.parse import urlparse
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.mcp.web_search.normalizer import cosine_similarity, normalize_results, rule_based_score
+from app.mcp.web_search.schemas import WebFact
+
+_DOMAINS = ["gov.cn", "edu.cn", "baike.baidu.com", "zhihu.com", "mp.weixin.qq.com", "weibo.com", "example.com"]
+_SENTENCES = [
+    "流浪猫外伤出血时应先用干净纱布按压止血。",
+    "幼猫不能喝牛奶，应喂食专用奶粉并注意保暖。",
+    "狗误食巧克力可能导致中毒，应尽快就医催吐。",
+    "骨折的动物搬运时要用硬板固定，避免二次伤害。",
+    "发现动物抽搐时不要强行按压，移开周围危险物品。",
+]
+
+
+class FakeEmbeddings(Embeddings):
+    """按文本哈希生成确定性随机向量，用于脱离模型测试计算路径"""
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _vec(self, text: str) -> List[float]:
+        seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).standard_normal(self.dim).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vec(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vec(text)
+
+
+def normalize_results_per_item(raw_results: List[Dict], query: str, embedder: Embeddings) -> List[WebFact]:
+    """旧实现：每条结果单独 embed_documents + 逐条打分，作为对照组"""
+    query_embedding = embedder.embed_query(query)
+    facts: List[WebFact] = []
+
+    for r in raw_results:
+        content = r.get("content") or r.get("snippet")
+        url = r.get("url")
+        if not content or not url:
+            continue
+
+        doc_embedding = embedder.embed_documents([content])[0]
+        semantic_score = cosine_similarity(query_embedding, doc_embedding)
+        semantic_score = max(0.0, min((semantic_score - 0.2) / 0.6, 1.0))
+        rule_score = rule_based_score(url, content)
+        confidence = round(0.6 * semantic_score + 0.4 * rule_score, 3)
+
+        facts.append(WebFact(content=content.strip(), source=urlparse(url).netloc, url=url, confidence=confidence))
+
+    facts.sort(key=lambda x: x.confidence, reverse=True)
+    return facts
+
+
+def make_results(n: int, seed: int = 42) -> List[Dict]:
+    rng = random.Random(seed)
+    results = []
+    for i in range(n):
+        content = "".join(rng.choice(_SENTENCES) for _ in range(rng.randint(1, 20)))
+        results.append({"url": f"https://www.{rng.choice(_DOMAINS)}/article/{i}", "content": content})
+    return results
+
+
+def _timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="normalize_results 逐条 vs 批量 基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--fake", action="store_true", help="使用随机向量代替真实模型")
+    args = parser.parse_args()
+
+    if args.fake:
+        embedder = FakeEmbeddings()
+    else:
+        from app.knowledge_base.embedding_manager import get_embedding
+        embedder = get_embedding()
+
+    query = "流浪猫受伤出血怎么处理"
+    embedder.embed_query(query)  # 预热
+
+    print(f"{'n':>6} {'per_item_ms':>12} {'batched_ms':>12} {'speedup':>8} {'max_abs_diff':>13}")
+    for n in args.sizes:
+        raw = make_results(n)
+
+        per_item_ms = _timeit(lambda: normalize_results_per_item(raw, query, embedder), args.repeat)
+        batched_ms = _timeit(lambda: normalize_results(raw, query, embedder=embedder), args.repeat)
+
+        # 两条路径的置信度应一致（仅浮点精度差异）
+        old = {f.url: f.confidence for f in normalize_results_per_item(raw, query, embedder)}
+        new = {f.url: f.confidence for f in normalize_results(raw, query, embedder=embedder)}
+        diff = max(abs(old[u] - new[u]) for u in old)
+
+        print(f"{n:>6} {per_item_ms:>12.1f} {batched_ms:>12.1f} {per_item_ms / batched_ms:>7.1f}x {diff:>13.4f}")
+
+
+if __name__ == "__main__":
+    main()
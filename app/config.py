@@ -23,6 +23,14 @@ class Settings(BaseSettings):
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "BAAI/bge-small-zh-v1.5")
     EMBEDDING_OFFLINE: bool = os.getenv("EMBEDDING_OFFLINE", "true").lower() == "true"
     EMBEDDING_MODEL_PATH: str = os.getenv("EMBEDDING_MODEL_PATH", "")
+    # 推理后端：torch / torch_int8 / onnx / onnx_int8（见 app/knowledge_base/inference_backend.py）
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch")
+    # onnx_int8 使用的量化配置：avx2 / avx512 / avx512_vnni / arm64
+    ONNX_QUANTIZATION_CONFIG: str = os.getenv("ONNX_QUANTIZATION_CONFIG", "avx2")
+    # 查询向量缓存（dense + sparse 共用，LRU + TTL）
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+    EMBEDDING_CACHE_TTL_SEC: float = float(os.getenv("EMBEDDING_CACHE_TTL_SEC", "3600"))
 
     # 数据库配置
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
@@ -32,6 +40,40 @@ class Settings(BaseSettings):
     QDRANT_URL: str = os.getenv("QDRANT_URL", "")
     QDRANT_API_KEY: str | None = os.getenv("QDRANT_API_KEY", None)
     QDRANT_COLLECTION_NAME: str = os.getenv("QDRANT_COLLECTION_NAME", "animal_rescue_collection")
+    # 未配置 QDRANT_URL 时使用本地持久化目录（嵌入式 Qdrant），重启无需重新同步
+    QDRANT_PATH: str = os.getenv("QDRANT_PATH", "")
+    # 本地模式只读：每个 worker 进程打开 QDRANT_PATH 的私有副本（嵌入式 Qdrant 同一目录只允许一个进程打开）
+    QDRANT_LOCAL_READ_ONLY: bool = os.getenv("QDRANT_LOCAL_READ_ONLY", "false").lower() == "true"
+    # 服务端模式：启动时集合不存在则从快照恢复（服务端可访问的 file:// 路径或 http(s) URL）
+    QDRANT_SNAPSHOT_LOCATION: str = os.getenv("QDRANT_SNAPSHOT_LOCATION", "")
+    # HNSW 构建参数（创建集合时生效）
+    QDRANT_HNSW_M: int = int(os.getenv("QDRANT_HNSW_M", "16"))
+    QDRANT_HNSW_EF_CONSTRUCT: int = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))
+    # 存储布局（创建集合 / migrate_collection 时生效）
+    # 量化：none / scalar(int8) / binary；量化向量常驻内存，原始向量可放磁盘只用于重打分
+    QDRANT_QUANTIZATION: str = os.getenv("QDRANT_QUANTIZATION", "none")
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = os.getenv("QDRANT_QUANTIZATION_ALWAYS_RAM", "true").lower() == "true"
+    QDRANT_VECTORS_ON_DISK: bool = os.getenv("QDRANT_VECTORS_ON_DISK", "false").lower() == "true"
+    QDRANT_SPARSE_ON_DISK: bool = os.getenv("QDRANT_SPARSE_ON_DISK", "false").lower() == "true"
+    # 查询参数：hnsw_ef 为 0 时使用服务端默认；exact=true 时全量精确检索（调试 / 评估召回用）
+    QDRANT_SEARCH_HNSW_EF: int = int(os.getenv("QDRANT_SEARCH_HNSW_EF", "0"))
+    QDRANT_SEARCH_EXACT: bool = os.getenv("QDRANT_SEARCH_EXACT", "false").lower() == "true"
+    # 量化集合的查询：是否用原始向量重打分，以及候选过采样倍数
+    QDRANT_QUANTIZATION_RESCORE: bool = os.getenv("QDRANT_QUANTIZATION_RESCORE", "true").lower() == "true"
+    QDRANT_QUANTIZATION_OVERSAMPLING: float = float(os.getenv("QDRANT_QUANTIZATION_OVERSAMPLING", "2.0"))
+    # 增量同步状态（created_at 水位线），按集合名记录
+    QDRANT_SYNC_STATE_FILE: str = os.getenv("QDRANT_SYNC_STATE_FILE", "./qdrant_sync_state.json")
+    # 流式全量同步：MySQL 读取 -> Embedding -> 上传 三级流水线
+    SYNC_READ_BATCH_SIZE: int = int(os.getenv("SYNC_READ_BATCH_SIZE", "500"))  # yield_per 行数
+    SYNC_EMBED_BATCH_SIZE: int = int(os.getenv("SYNC_EMBED_BATCH_SIZE", "64"))
+    SYNC_QUEUE_MAXSIZE: int = int(os.getenv("SYNC_QUEUE_MAXSIZE", "4"))  # 每级队列最多缓冲的批数
+    # 原生批量导入（upload_points）
+    QDRANT_BULK_EMBED_BATCH_SIZE: int = int(os.getenv("QDRANT_BULK_EMBED_BATCH_SIZE", "256"))
+    QDRANT_UPLOAD_BATCH_SIZE: int = int(os.getenv("QDRANT_UPLOAD_BATCH_SIZE", "256"))
+    QDRANT_UPLOAD_PARALLEL: int = int(os.getenv("QDRANT_UPLOAD_PARALLEL", "2"))
+    # 导入期间关闭 HNSW 构建（m=0），导入完成后恢复并重建索引
+    QDRANT_BULK_DISABLE_INDEXING: bool = os.getenv("QDRANT_BULK_DISABLE_INDEXING", "true").lower() == "true"
+    QDRANT_INDEX_WAIT_TIMEOUT_SEC: float = float(os.getenv("QDRANT_INDEX_WAIT_TIMEOUT_SEC", "600"))
 
     # 稀疏嵌入模型配置
     SPARSE_EMBEDDING_MODEL: str = os.getenv("SPARSE_EMBEDDING_MODEL", "Qdrant/bm25")
@@ -43,6 +85,24 @@ class Settings(BaseSettings):
 
     # 地图相关配置
     AMAP_API_KEY: str = os.getenv("AMAP_API_KEY", None)
+    # 地理编码 / 周边 POI 两级缓存（进程内 LRU + 可选 SQLite 持久层，路径为空时只用内存）
+    MAP_CACHE_ENABLED: bool = os.getenv("MAP_CACHE_ENABLED", "true").lower() == "true"
+    MAP_CACHE_MEMORY_SIZE: int = int(os.getenv("MAP_CACHE_MEMORY_SIZE", "2048"))
+    MAP_CACHE_MEMORY_TTL_SEC: float = float(os.getenv("MAP_CACHE_MEMORY_TTL_SEC", "3600"))
+    MAP_CACHE_DISK_PATH: str = os.getenv("MAP_CACHE_DISK_PATH", "")
+    MAP_CACHE_GEOCODE_DISK_TTL_SEC: float = float(os.getenv("MAP_CACHE_GEOCODE_DISK_TTL_SEC", str(30 * 86400)))
+    MAP_CACHE_POI_DISK_TTL_SEC: float = float(os.getenv("MAP_CACHE_POI_DISK_TTL_SEC", "86400"))
+    MAP_CACHE_GRID_DECIMALS: int = int(os.getenv("MAP_CACHE_GRID_DECIMALS", "3"))  # POI 网格精度，3 位约 100m
+    # 本地救助资源库（定期快照 + 网格空间索引），半径内结果不足 MAP_RESOURCE_MIN_HITS 条才请求高德
+    MAP_RESOURCE_STORE_ENABLED: bool = os.getenv("MAP_RESOURCE_STORE_ENABLED", "true").lower() == "true"
+    MAP_RESOURCE_STORE_PATH: str = os.getenv("MAP_RESOURCE_STORE_PATH", "./data/rescue_resources.json")
+    MAP_RESOURCE_MIN_HITS: int = int(os.getenv("MAP_RESOURCE_MIN_HITS", "3"))
+    MAP_RESOURCE_INDEX_CELL_DEG: float = float(os.getenv("MAP_RESOURCE_INDEX_CELL_DEG", "0.05"))  # 约 5km
+    # 定期刷新：以种子坐标（"lon,lat;lon,lat"）为中心分页拉取各类型资源，间隔为 0 或未配置种子时不刷新
+    MAP_RESOURCE_SEED_LOCATIONS: str = os.getenv("MAP_RESOURCE_SEED_LOCATIONS", "")
+    MAP_RESOURCE_SEED_RADIUS_M: int = int(os.getenv("MAP_RESOURCE_SEED_RADIUS_M", "30000"))
+    MAP_RESOURCE_SEED_PAGES: int = int(os.getenv("MAP_RESOURCE_SEED_PAGES", "4"))
+    MAP_RESOURCE_REFRESH_INTERVAL_SEC: float = float(os.getenv("MAP_RESOURCE_REFRESH_INTERVAL_SEC", "86400"))
 
     # 爬虫相关配置
     TAVILY_API_KEY: str = os.getenv("TAVILY_API_KEY", None)
@@ -53,17 +113,66 @@ class Settings(BaseSettings):
     # API配置
     API_V1_STR: str = "/api/v1"
 
+    # Agent 编排配置
+    # 需要等待 rewrite_query 完成的分诊节点（逗号分隔：vision_triage,intent_classifier），
+    # 未列出的节点与 rewrite_query 并行执行，使用 normalized_query
+    REWRITE_DEPENDENT_NODES: str = os.getenv("REWRITE_DEPENDENT_NODES", "")
+    # 仅在有历史对话时等待 rewrite_query 的分诊节点：追问需要补全指代后再做意图分类
+    REWRITE_DEPENDENT_NODES_WITH_HISTORY: str = os.getenv("REWRITE_DEPENDENT_NODES_WITH_HISTORY", "intent_classifier")
+
+    # 并发配置
+    AGENT_MAX_CONCURRENCY: int = int(os.getenv("AGENT_MAX_CONCURRENCY", "256"))  # 单 worker 同时执行的会话数
+    AGENT_QUEUE_TIMEOUT_SEC: float = float(os.getenv("AGENT_QUEUE_TIMEOUT_SEC", "30"))
+    # 检索/推理线程池大小；开启微批处理后模型前向在批处理线程中串行执行，这里的线程主要用于等待结果与 Qdrant IO
+    INFERENCE_MAX_WORKERS: int = int(os.getenv("INFERENCE_MAX_WORKERS", "16"))
+
+    # 启动预热：后台加载所有模型并各跑一次推理，完成前 /health/ready 返回 503
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+
+    # 推理微批处理：并发的 embed_query / rerank 合并成一次前向
+    INFERENCE_BATCHING_ENABLED: bool = os.getenv("INFERENCE_BATCHING_ENABLED", "true").lower() == "true"
+    EMBED_BATCH_MAX_SIZE: int = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))  # 每批 query 条数
+    EMBED_BATCH_MAX_WAIT_MS: float = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+    RERANK_BATCH_MAX_PAIRS: int = int(os.getenv("RERANK_BATCH_MAX_PAIRS", "64"))  # 每批 (query, doc) 对数
+    RERANK_BATCH_MAX_WAIT_MS: float = float(os.getenv("RERANK_BATCH_MAX_WAIT_MS", "5"))
+    TORCH_NUM_THREADS: int = int(os.getenv("TORCH_NUM_THREADS", "0"))  # torch intra-op 线程数，0 为默认
+
+    # 外部 HTTP 调用（高德 / Tavily / Vision）共享连接池、按 host 并发上限与重试
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY_SEC: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SEC", "30"))
+    HTTP_HTTP2: bool = os.getenv("HTTP_HTTP2", "true").lower() == "true"  # 需要安装 h2
+    HTTP_PER_HOST_CONCURRENCY: int = int(os.getenv("HTTP_PER_HOST_CONCURRENCY", "16"))
+    HTTP_CONNECT_TIMEOUT_SEC: float = float(os.getenv("HTTP_CONNECT_TIMEOUT_SEC", "3"))
+    HTTP_MAX_RETRIES: int = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+    HTTP_RETRY_BACKOFF_MS: float = float(os.getenv("HTTP_RETRY_BACKOFF_MS", "200"))  # 退避基数，按 2^n 增长并全抖动
+    HTTP_RETRY_BACKOFF_MAX_MS: float = float(os.getenv("HTTP_RETRY_BACKOFF_MAX_MS", "2000"))
+
+    # 证据收集（KB/Web/Map 并发分支）超时预算，单位秒
+    EVIDENCE_KB_TIMEOUT_SEC: float = float(os.getenv("EVIDENCE_KB_TIMEOUT_SEC", "20"))
+    EVIDENCE_WEB_TIMEOUT_SEC: float = float(os.getenv("EVIDENCE_WEB_TIMEOUT_SEC", "12"))
+    EVIDENCE_MAP_TIMEOUT_SEC: float = float(os.getenv("EVIDENCE_MAP_TIMEOUT_SEC", "8"))
+    EVIDENCE_EMERGENCY_BUDGET_SEC: float = float(os.getenv("EVIDENCE_EMERGENCY_BUDGET_SEC", "6"))  # emergency 模式各分支上限
+
     # 检索配置
     RETRIEVAL_TOP_K: int = 15
     SIMILARITY_THRESHOLD: float = 0.6
 
     MAX_RETRY: int = 2  # 最大重试次数
+    # 单次超量召回：按最大 top_k 召回并 rerank 一次，重试只在缓存结果上放宽阈值；
+    # 每轮取候选池的前 top_k 个，RRF 排名不具备前缀稳定性，候选与逐轮重新检索（false）不完全相同
+    KB_SINGLE_PASS_RETRIEVAL: bool = os.getenv("KB_SINGLE_PASS_RETRIEVAL", "true").lower() == "true"
     MIN_DOCS_REQUIRED: int = 5  # 至少需要的文档数量
 
     # rerank相关配置
     RERANK_TOP_K: int = 5
     MIN_RERANK_SCORE: float = 0.55
     RERANK_MODEL_PATH: str = os.getenv("RERANK_MODEL_PATH", "")
+    RERANK_BACKEND: str = os.getenv("RERANK_BACKEND", "torch")
+    # rerank 分数缓存（key: query 哈希 + chunk_id）
+    RERANK_CACHE_ENABLED: bool = os.getenv("RERANK_CACHE_ENABLED", "true").lower() == "true"
+    RERANK_CACHE_SIZE: int = int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+    RERANK_CACHE_TTL_SEC: float = float(os.getenv("RERANK_CACHE_TTL_SEC", "21600"))
 
     # 认证配置
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
@@ -84,6 +193,20 @@ class Settings(BaseSettings):
     COS_BUCKET: str = os.getenv("COS_BUCKET", "")
     # WebSearch 配置
     WEB_SEARCH_MAX_RESULTS: int = 8
+    # Web 搜索结果缓存：按 query 向量复用，余弦相似度超过阈值且关键词（物种 / 物质 / 症状 / 数字）一致的近似问题共用结果
+    WEB_CACHE_ENABLED: bool = os.getenv("WEB_CACHE_ENABLED", "true").lower() == "true"
+    WEB_CACHE_SIZE: int = int(os.getenv("WEB_CACHE_SIZE", "1024"))
+    WEB_CACHE_TTL_SEC: float = float(os.getenv("WEB_CACHE_TTL_SEC", "1800"))
+    WEB_CACHE_STALE_TTL_SEC: float = float(os.getenv("WEB_CACHE_STALE_TTL_SEC", "3600"))  # 过期后仍可返回并后台刷新的时长
+    # 上线前用 python -m app.benchmarks.bench_web_cache_threshold 在实际模型上校准
+    WEB_CACHE_SIMILARITY: float = float(os.getenv("WEB_CACHE_SIMILARITY", "0.95"))
+    WEB_CACHE_LSH_TABLES: int = int(os.getenv("WEB_CACHE_LSH_TABLES", "8"))
+    WEB_CACHE_LSH_BITS: int = int(os.getenv("WEB_CACHE_LSH_BITS", "6"))
+    # 完整回答缓存：非紧急的重复问题（无图片 / 无地图 / 无历史对话）直接复用上次回答
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+    RESPONSE_CACHE_TTL_SEC: float = float(os.getenv("RESPONSE_CACHE_TTL_SEC", "3600"))
+    RESPONSE_CACHE_REPLAY_CHUNK: int = int(os.getenv("RESPONSE_CACHE_REPLAY_CHUNK", "32"))  # SSE 回放时每个 delta 的字符数
 
     class Config:
         env_file = ".env"
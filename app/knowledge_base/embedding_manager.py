@@ -1,11 +1,110 @@
+from typing import Any, List, Union
+
 from loguru import logger
-from typing import List, Union
-import torch
 from langchain_core.embeddings import Embeddings
+from langchain_qdrant import FastEmbedSparse, SparseEmbeddings, SparseVector
 
 from app.config import settings
+from app.knowledge_base.inference_backend import (
+    device_for,
+    ensure_quantized_onnx,
+    model_kwargs_for,
+    quantize_torch_module,
+    validate_backend,
+)
+from app.knowledge_base.model_metadata import load_model_metadata
+from app.knowledge_base.model_registry import get_or_load
+from app.utils.batching import MicroBatcher, register_batcher
+from app.utils.cache import LRUCache
+from app.utils.common import normalize_whitespace
+
+_embedding_cache = None
+
+
+class EmbeddingCache(LRUCache):
+    """
+    进程级查询向量缓存（LRU + TTL，线程安全）
+    key = (模型名, 归一化文本)，同一条 query 在 dense 检索、重试、web 结果打分之间只编码一次
+    """
+
+    def get(self, model: str, text: str) -> Any:
+        return super().get(model, normalize_whitespace(text))
+
+    def put(self, model: str, text: str, value: Any):
+        super().put(model, normalize_whitespace(text), value)
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """获取全局唯一的查询向量缓存（单例）"""
+    global _embedding_cache
+
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(
+            maxsize=settings.EMBEDDING_CACHE_SIZE,
+            ttl_sec=settings.EMBEDDING_CACHE_TTL_SEC,
+        )
+    return _embedding_cache
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Dense Embeddings 包装：embed_query 走 EmbeddingCache，embed_documents 直接透传
+    （文档入库是一次性的，不应挤占查询缓存）
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str):
+        self.inner = embeddings
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        if not settings.EMBEDDING_CACHE_ENABLED:
+            return self.inner.embed_query(text)
+        return get_embedding_cache().get_or_compute(
+            f"dense:{self.model_name}", text, lambda: self.inner.embed_query(text)
+        )
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Dense Embeddings 包装：并发的 embed_query 经 MicroBatcher 合并为一次 embed_documents
+    （HuggingFaceEmbeddings 未配置 query_encode_kwargs 时，二者编码方式一致）
+    """
 
-_default_embedding_manager = None
+    def __init__(self, embeddings: Embeddings, model_name: str):
+        self.inner = embeddings
+        self.batcher = register_batcher(MicroBatcher(
+            name=f"embed:{model_name}",
+            batch_fn=embeddings.embed_documents,
+            max_batch_size=settings.EMBED_BATCH_MAX_SIZE,
+            max_wait_ms=settings.EMBED_BATCH_MAX_WAIT_MS,
+        ))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.batcher.submit(text)
+
+
+class CachedSparseEmbeddings(SparseEmbeddings):
+    """Sparse（FastEmbed BM25）Embeddings 包装：embed_query 走 EmbeddingCache"""
+
+    def __init__(self, sparse_embeddings: SparseEmbeddings, model_name: str):
+        self.inner = sparse_embeddings
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[SparseVector]:
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> SparseVector:
+        if not settings.EMBEDDING_CACHE_ENABLED:
+            return self.inner.embed_query(text)
+        return get_embedding_cache().get_or_compute(
+            f"sparse:{self.model_name}", text, lambda: self.inner.embed_query(text)
+        )
 
 
 class EmbeddingManager:
@@ -30,12 +129,14 @@ class EmbeddingManager:
         初始化嵌入模型（离线优先）。
         - 优先使用 settings.EMBEDDING_MODEL_PATH
         - settings.EMBEDDING_OFFLINE=true 时，强制只用本地文件，禁止联网
+        - settings.EMBEDDING_BACKEND 选择推理后端（torch / torch_int8 / onnx / onnx_int8）
         """
         try:
             from langchain_huggingface import HuggingFaceEmbeddings
             from sentence_transformers import SentenceTransformer
 
             offline = str(settings.EMBEDDING_OFFLINE).lower() == 'true'
+            backend = validate_backend(settings.EMBEDDING_BACKEND)
             local_path = settings.EMBEDDING_MODEL_PATH
 
             # 优先使用本地路径配置，否则使用传入的 model_name
@@ -44,10 +145,21 @@ class EmbeddingManager:
             if not model_to_load:
                 raise ValueError("未指定嵌入模型。请设置 EMBEDDING_MODEL_PATH 或 EMBEDDING_MODEL。")
 
-            # 验证模型能否加载
+            ensure_quantized_onnx(SentenceTransformer, model_to_load, backend, local_files_only=offline)
+
+            # 初始化 LangChain Embeddings（只加载一次模型；查询向量走进程级缓存，按 模型@后端 隔离）
             try:
                 # 关键：local_files_only=offline 决定是否联网
-                SentenceTransformer(model_to_load, local_files_only=offline)
+                hf_embeddings = HuggingFaceEmbeddings(
+                    model_name=model_to_load,
+                    model_kwargs={
+                        "device": device_for(backend),
+                        "trust_remote_code": True,
+                        "local_files_only": offline,
+                        **model_kwargs_for(backend),
+                    },
+                    encode_kwargs={"normalize_embeddings": True},
+                )
             except Exception as e:
                 logger.error(f"无法加载嵌入模型 '{model_to_load}' (offline={offline})。错误: {e}")
                 if offline:
@@ -56,17 +168,21 @@ class EmbeddingManager:
                     )
                 # 如果允许联网但失败，直接抛出异常，不再回退
                 raise e
+            self.model_path = model_to_load
+            self.backend = backend
+            self.st_model = quantize_torch_module(hf_embeddings._client, backend)
+            self.metadata = self._load_metadata(model_to_load)
+            model_key = f"{model_to_load}@{backend}"
+            inner: Embeddings = hf_embeddings
+            if settings.INFERENCE_BATCHING_ENABLED:
+                inner = BatchedEmbeddings(hf_embeddings, model_name=model_key)
+            self._embeddings = CachedEmbeddings(inner, model_name=model_key)
 
-            # 初始化 LangChain Embeddings
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            self._embeddings = HuggingFaceEmbeddings(
-                model_name=model_to_load,
-                model_kwargs={"device": device,"trust_remote_code": True},
-                encode_kwargs={"normalize_embeddings": True},
+            logger.info(
+                f"已加载 Embedding 模型: {model_to_load} (offline={offline}, backend={backend}, "
+                f"dim={self.metadata['dimension']}, max_seq_length={self.metadata['max_seq_length']})"
             )
 
-            logger.info(f"已加载 Embedding 模型: {model_to_load} (offline={offline})")
-
         except ImportError as e:
             logger.error(f"缺少必要的依赖: {str(e)}")
             raise
@@ -83,12 +199,31 @@ class EmbeddingManager:
             self._initialize_embeddings()
         return self._embeddings
 
+    def _load_metadata(self, model_path: str) -> dict:
+        """
+        读取模型元数据（配置文件解析 + 磁盘缓存，不做推理），并与已加载模型的维度交叉校验
+        模型不在本地目录时退化为从已加载模型上读取
+        """
+        loaded_dim = self.st_model.get_sentence_embedding_dimension()
+        metadata = load_model_metadata(model_path)
+        if metadata is None:
+            return {
+                "dimension": loaded_dim,
+                "max_seq_length": self.st_model.max_seq_length,
+                "normalize": None,
+                "tokenizer_hash": None,
+            }
+        if loaded_dim and loaded_dim != metadata["dimension"]:
+            logger.warning(
+                f"模型配置维度 {metadata['dimension']} 与已加载模型维度 {loaded_dim} 不一致，以已加载模型为准"
+            )
+            metadata = {**metadata, "dimension": loaded_dim}
+        return metadata
+
     @property
     def dimension(self) -> int:
-        """获取当前模型的向量维度，用于 Qdrant 初始化"""
-        # 预运行一次，获取维度
-        test_vec = self.embed_query("维度探测")
-        return len(test_vec)
+        """获取当前模型的向量维度，用于 Qdrant 初始化（来自模型元数据，不做推理）"""
+        return self.metadata["dimension"]
 
     def embed_texts(self, texts: Union[str, List[str]], batch_size: int = 32) -> List[List[float]]:
         """
@@ -119,29 +254,56 @@ class EmbeddingManager:
             raise
 
 
+def embedding_model_key() -> str:
+    """模型注册表中 dense 模型的 key（模型路径 + 推理后端）"""
+    model = settings.EMBEDDING_MODEL_PATH or settings.EMBEDDING_MODEL
+    return f"embedding:{model}@{settings.EMBEDDING_BACKEND}"
+
+
+def get_embedding_manager() -> EmbeddingManager:
+    """
+    获取全局唯一的 EmbeddingManager（经模型注册表，每个进程只加载一次）
+    向量库与 Web 结果打分共用同一份权重
+    """
+    return get_or_load(
+        embedding_model_key(),
+        lambda: EmbeddingManager(model_name=settings.EMBEDDING_MODEL),
+        torch_module=lambda manager: manager.st_model,
+    )
+
+
 def get_embedding() -> Embeddings:
     """
     获取全局唯一的 Embeddings 实例（单例）
     从 settings 中读取模型名称。
     """
-    global _default_embedding_manager
+    return get_embedding_manager().embeddings
+
 
-    if _default_embedding_manager is None:
-        logger.info("🔧 初始化全局 EmbeddingManager ...")
-        # 从 settings 读取模型名，而不是硬编码
-        model_name_from_settings = settings.EMBEDDING_MODEL
-        _default_embedding_manager = EmbeddingManager(model_name=model_name_from_settings)
+def get_sparse_embedding() -> SparseEmbeddings:
+    """
+    获取全局唯一的稀疏 Embeddings 实例（FastEmbed BM25，单例）
+    查询向量走进程级缓存
+    """
+    def _load() -> SparseEmbeddings:
+        logger.info("🔧 初始化全局 Sparse Embedding ...")
+        return CachedSparseEmbeddings(
+            FastEmbedSparse(
+                model_name=settings.SPARSE_EMBEDDING_MODEL,
+                cache_dir=settings.SPARSE_EMBEDDING_CACHE_DIR,
+                local_files_only=True
+            ),
+            model_name=settings.SPARSE_EMBEDDING_MODEL,
+        )
 
-    return _default_embedding_manager.embeddings
+    return get_or_load(f"sparse:{settings.SPARSE_EMBEDDING_MODEL}", _load)
 
 
 def initialize_embedding_model() -> EmbeddingManager:
     """
-    初始化嵌入模型的便捷函数
+    初始化嵌入模型的便捷函数（与 get_embedding 共用注册表中的同一个实例）
     """
-    # 从 settings 读取模型名
-    model_name_from_settings = settings.EMBEDDING_MODEL
-    return EmbeddingManager(model_name=model_name_from_settings)
+    return get_embedding_manager()
 
 
 if __name__ == "__main__":
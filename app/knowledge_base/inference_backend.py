@@ -0,0 +1,98 @@
+"""
+Embedding / Rerank 模型的推理后端选择（settings.EMBEDDING_BACKEND / settings.RERANK_BACKEND）
+
+- torch:       PyTorch fp32（默认）
+- torch_int8:  PyTorch 动态量化（Linear 层权重 int8）
+- onnx:        ONNX Runtime fp32
+- onnx_int8:   ONNX Runtime + 动态 int8 量化模型，首次使用时导出到本地模型目录的 onnx/ 下
+"""
+import os
+from typing import Any, Dict
+
+import torch
+from loguru import logger
+
+from app.config import settings
+
+BACKENDS = ("torch", "torch_int8", "onnx", "onnx_int8")
+
+if settings.TORCH_NUM_THREADS > 0:
+    # 多个 uvicorn worker 时限制每个进程的 intra-op 线程，避免超额订阅 CPU
+    torch.set_num_threads(settings.TORCH_NUM_THREADS)
+
+
+def validate_backend(backend: str) -> str:
+    backend = (backend or "torch").strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"不支持的推理后端: {backend}，可选: {', '.join(BACKENDS)}")
+    return backend
+
+
+def quantized_onnx_file() -> str:
+    """动态量化 ONNX 模型在模型目录中的相对路径（与 sentence-transformers 导出命名一致）"""
+    return f"onnx/model_qint8_{settings.ONNX_QUANTIZATION_CONFIG}.onnx"
+
+
+def model_kwargs_for(backend: str) -> Dict[str, Any]:
+    """SentenceTransformer / CrossEncoder 构造参数中与后端相关的部分"""
+    backend = validate_backend(backend)
+    if backend == "onnx":
+        return {"backend": "onnx"}
+    if backend == "onnx_int8":
+        return {"backend": "onnx", "model_kwargs": {"file_name": quantized_onnx_file()}}
+    return {}
+
+
+def ensure_quantized_onnx(model_cls, model_path: str, backend: str, **load_kwargs):
+    """
+    onnx_int8 需要预先导出的量化模型文件；不存在时先以 fp32 ONNX 加载，再导出到模型目录
+    """
+    if validate_backend(backend) != "onnx_int8":
+        return
+
+    if os.path.exists(os.path.join(model_path, quantized_onnx_file())):
+        return
+
+    if not os.path.isdir(model_path):
+        raise RuntimeError(f"onnx_int8 后端需要本地模型目录，当前模型路径: {model_path}")
+
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    logger.info(f"导出动态量化 ONNX 模型: {model_path}/{quantized_onnx_file()}")
+    model = model_cls(model_path, backend="onnx", **load_kwargs)
+    export_dynamic_quantized_onnx_model(
+        model,
+        quantization_config=settings.ONNX_QUANTIZATION_CONFIG,
+        model_name_or_path=model_path,
+    )
+
+
+def quantize_torch_module(module: torch.nn.Module, backend: str) -> torch.nn.Module:
+    """torch_int8：原地将 Linear 层替换为动态量化版本，其余后端原样返回"""
+    if validate_backend(backend) != "torch_int8":
+        return module
+    return torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def device_for(backend: str) -> str:
+    """ONNX 与 torch 动态量化只走 CPU，fp32 torch 有 GPU 时用 GPU"""
+    if validate_backend(backend) == "torch" and torch.cuda.is_available():
+        return "cuda"
+    return "cpu"
+
+
+def load_sentence_transformer(model_path: str, backend: str, **kwargs):
+    from sentence_transformers import SentenceTransformer
+
+    ensure_quantized_onnx(SentenceTransformer, model_path, backend, **kwargs)
+    model = SentenceTransformer(model_path, device=device_for(backend), **model_kwargs_for(backend), **kwargs)
+    return quantize_torch_module(model, backend)
+
+
+def load_cross_encoder(model_path: str, backend: str, **kwargs):
+    from sentence_transformers import CrossEncoder
+
+    ensure_quantized_onnx(CrossEncoder, model_path, backend, **kwargs)
+    # 原实现固定 device="cpu"，这里保持一致
+    model = CrossEncoder(model_path, device="cpu", **model_kwargs_for(backend), **kwargs)
+    return quantize_torch_module(model, backend)
@@ -0,0 +1,168 @@
+"""
+按当前 settings 的存储布局迁移已有集合（量化方式 / 原始向量 on_disk / 稀疏索引 on_disk / HNSW）
+
+通过 update_collection 原地变更，Qdrant 优化器在后台按新布局重建各 segment，迁移期间集合可正常读写；
+迁移前后分别输出按配置推算的内存占用估算（非实测值）与 dense recall@k（以不走量化的精确检索为基准）
+
+用法：
+    QDRANT_QUANTIZATION=scalar QDRANT_VECTORS_ON_DISK=true python -m app.knowledge_base.migrate_collection
+    python -m app.knowledge_base.migrate_collection --dry-run      # 只输出当前布局的报告
+"""
+import argparse
+from typing import Dict, List
+
+import numpy as np
+from loguru import logger
+from qdrant_client.http import models as rest_models
+
+from app.config import settings
+from app.knowledge_base.vector_store import (
+    create_qdrant_client,
+    quantization_config,
+    sparse_vector_params,
+    wait_for_indexing,
+)
+
+
+def _layout(client, collection_name: str) -> Dict:
+    """从集合信息中读取当前布局"""
+    info = client.get_collection(collection_name)
+    params = info.config.params
+    dense = params.vectors[""] if isinstance(params.vectors, dict) else params.vectors
+    quant = info.config.quantization_config
+    if isinstance(quant, rest_models.ScalarQuantization):
+        quant_mode, always_ram = "scalar", bool(quant.scalar.always_ram)
+    elif isinstance(quant, rest_models.BinaryQuantization):
+        quant_mode, always_ram = "binary", bool(quant.binary.always_ram)
+    else:
+        quant_mode, always_ram = "none", False
+    sparse = (params.sparse_vectors or {}).get("sparse")
+
+    return {
+        "points": info.points_count or 0,
+        "dim": dense.size,
+        "vectors_on_disk": bool(dense.on_disk),
+        "quantization": quant_mode,
+        "quantization_always_ram": always_ram,
+        "sparse_on_disk": bool(sparse and sparse.index and sparse.index.on_disk),
+        "hnsw_m": info.config.hnsw_config.m,
+    }
+
+
+def estimate_memory_mb(layout: Dict) -> Dict[str, float]:
+    """
+    dense 部分常驻内存估算（MB）：原始 float32 向量 + 量化向量 + HNSW 邻接表
+    由集合配置与点数推算，不是进程实测占用（segment 开销、payload、页缓存等均未计入）
+    on_disk 的数据由操作系统页缓存按需加载，不计入；稀疏索引大小依赖语料，只标注是否在磁盘
+    """
+    n, dim = layout["points"], layout["dim"]
+    original = 0 if layout["vectors_on_disk"] else n * dim * 4
+    quant_bytes = {"scalar": n * dim, "binary": n * dim / 8}.get(layout["quantization"], 0)
+    quantized = quant_bytes if layout["quantization_always_ram"] else 0
+    hnsw = n * layout["hnsw_m"] * 2 * 4
+
+    mb = 1024 * 1024
+    return {
+        "original_mb": original / mb,
+        "quantized_mb": quantized / mb,
+        "hnsw_mb": hnsw / mb,
+        "total_mb": (original + quantized + hnsw) / mb,
+    }
+
+
+def _sample_queries(client, collection_name: str, n: int) -> List[List[float]]:
+    """用库内已有点的 dense 向量作为查询，分布与真实数据一致"""
+    points, _ = client.scroll(
+        collection_name=collection_name,
+        limit=n,
+        with_payload=False,
+        with_vectors=[""],
+    )
+    return [p.vector[""] if isinstance(p.vector, dict) else p.vector for p in points]
+
+
+def recall_at_k(client, collection_name: str, queries: List[List[float]], k: int) -> float:
+    """近似检索（当前量化 + HNSW + 重打分设置）相对精确 float32 检索的 recall@k"""
+    approx_params = rest_models.SearchParams(
+        hnsw_ef=settings.QDRANT_SEARCH_HNSW_EF or None,
+        quantization=rest_models.QuantizationSearchParams(
+            rescore=settings.QDRANT_QUANTIZATION_RESCORE,
+            oversampling=settings.QDRANT_QUANTIZATION_OVERSAMPLING,
+        ),
+    )
+    exact_params = rest_models.SearchParams(
+        exact=True,
+        quantization=rest_models.QuantizationSearchParams(ignore=True),
+    )
+
+    recalls = []
+    for q in queries:
+        exact = client.query_points(collection_name, query=q, using="", limit=k, search_params=exact_params).points
+        approx = client.query_points(collection_name, query=q, using="", limit=k, search_params=approx_params).points
+        truth = {p.id for p in exact}
+        recalls.append(len(truth & {p.id for p in approx}) / max(1, len(truth)))
+    return float(np.mean(recalls)) if recalls else 0.0
+
+
+def _report(title: str, layout: Dict, memory: Dict, recall: float, k: int):
+    print(f"\n== {title} ==")
+    print(
+        f"points={layout['points']} dim={layout['dim']} quantization={layout['quantization']} "
+        f"(always_ram={layout['quantization_always_ram']}) vectors_on_disk={layout['vectors_on_disk']} "
+        f"sparse_on_disk={layout['sparse_on_disk']} hnsw_m={layout['hnsw_m']}"
+    )
+    print(
+        f"内存估算（按配置推算，非实测）: 原始向量 {memory['original_mb']:.1f}MB + 量化向量 {memory['quantized_mb']:.1f}MB "
+        f"+ HNSW {memory['hnsw_mb']:.1f}MB = {memory['total_mb']:.1f}MB"
+    )
+    print(f"dense recall@{k}: {recall:.4f}")
+
+
+def migrate_collection(collection_name: str, client=None, timeout_sec: float = None):
+    """将集合原地迁移到 settings 中配置的存储布局，并等待后台重建完成"""
+    client = client or create_qdrant_client(read_only=False)
+    quant = quantization_config()
+
+    client.update_collection(
+        collection_name=collection_name,
+        vectors_config={"": rest_models.VectorParamsDiff(on_disk=settings.QDRANT_VECTORS_ON_DISK)},
+        sparse_vectors_config={"sparse": sparse_vector_params()},
+        hnsw_config=rest_models.HnswConfigDiff(
+            m=settings.QDRANT_HNSW_M,
+            ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+        ),
+        quantization_config=quant if quant is not None else rest_models.Disabled.DISABLED,
+    )
+    logger.info(f"已提交集合 {collection_name} 的布局变更，等待优化器重建...")
+
+    # 变更前索引计数就已达标，需观察到优化器开始工作（或长时间稳定的 GREEN）才算重建完成
+    if wait_for_indexing(client, collection_name, timeout_sec=timeout_sec, poll_sec=2, expect_rebuild=True):
+        logger.success(f"集合 {collection_name} 迁移完成")
+        return True
+    logger.warning(f"集合 {collection_name} 重建未在超时内完成，迁移仍在后台进行")
+    return False
+
+def main():
+    parser = argparse.ArgumentParser(description="按 settings 存储布局迁移 Qdrant 集合")
+    parser.add_argument("--collection", default=settings.QDRANT_COLLECTION_NAME)
+    parser.add_argument("--queries", type=int, default=100, help="recall 评估查询数")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dry-run", action="store_true", help="只输出当前布局的内存与 recall 报告")
+    args = parser.parse_args()
+
+    client = create_qdrant_client(read_only=False)
+    queries = _sample_queries(client, args.collection, args.queries)
+
+    before = _layout(client, args.collection)
+    _report("当前布局", before, estimate_memory_mb(before), recall_at_k(client, args.collection, queries, args.k), args.k)
+    if args.dry_run:
+        return
+
+    migrate_collection(args.collection, client=client)
+
+    after = _layout(client, args.collection)
+    _report("迁移后", after, estimate_memory_mb(after), recall_at_k(client, args.collection, queries, args.k), args.k)
+
+
+if __name__ == "__main__":
+    main()
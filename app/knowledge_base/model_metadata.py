@@ -0,0 +1,150 @@
+"""
+嵌入模型元数据：向量维度 / 最大序列长度 / 是否自带归一化 / tokenizer 哈希
+
+直接读取 sentence-transformers 模型目录中的配置文件（不加载权重、不做推理），
+结果缓存在模型目录下的 .model_metadata.json；配置或 tokenizer 文件变化（大小 / 修改时间）时自动失效
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+METADATA_FILE = ".model_metadata.json"
+
+_CONFIG_FILES = ("modules.json", "sentence_bert_config.json", "config.json", "config_sentence_transformers.json")
+_TOKENIZER_FILES = (
+    "tokenizer.json",
+    "tokenizer_config.json",
+    "special_tokens_map.json",
+    "vocab.txt",
+    "vocab.json",
+    "merges.txt",
+    "sentencepiece.bpe.model",
+    "spiece.model",
+)
+_POOLING = "sentence_transformers.models.Pooling"
+_DENSE = "sentence_transformers.models.Dense"
+_NORMALIZE = "sentence_transformers.models.Normalize"
+
+
+def _read_json(path: str) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _modules(model_dir: str) -> List[Dict[str, Any]]:
+    path = os.path.join(model_dir, "modules.json")
+    return _read_json(path) if os.path.exists(path) else []
+
+
+def _source_files(model_dir: str) -> List[str]:
+    """参与元数据计算的文件（相对路径），用于指纹与缓存失效判断"""
+    files = [f for f in _CONFIG_FILES + _TOKENIZER_FILES if os.path.exists(os.path.join(model_dir, f))]
+    for module in _modules(model_dir):
+        config = os.path.join(module.get("path", ""), "config.json")
+        if module.get("path") and os.path.exists(os.path.join(model_dir, config)):
+            files.append(config)
+    return files
+
+
+def _fingerprint(model_dir: str, files: List[str]) -> str:
+    h = hashlib.sha1()
+    for name in files:
+        st = os.stat(os.path.join(model_dir, name))
+        h.update(f"{name}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _tokenizer_hash(model_dir: str) -> Optional[str]:
+    h = hashlib.sha256()
+    found = False
+    for name in _TOKENIZER_FILES:
+        path = os.path.join(model_dir, name)
+        if not os.path.exists(path):
+            continue
+        found = True
+        h.update(name.encode("utf-8") + b"\x00")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest() if found else None
+
+
+def read_model_metadata(model_dir: str) -> Dict[str, Any]:
+    """
+    从模型目录的配置文件解析元数据（不读缓存）
+    维度：最后一个 Dense 层的 out_features > Pooling 的 word_embedding_dimension > config.json 的 hidden_size
+    """
+    config_path = os.path.join(model_dir, "config.json")
+    config = _read_json(config_path) if os.path.exists(config_path) else {}
+    st_config_path = os.path.join(model_dir, "sentence_bert_config.json")
+    st_config = _read_json(st_config_path) if os.path.exists(st_config_path) else {}
+
+    dimension = config.get("hidden_size") or config.get("d_model")
+    normalize = False
+    for module in _modules(model_dir):
+        module_type = module.get("type", "")
+        module_config_path = os.path.join(model_dir, module.get("path", ""), "config.json")
+        if module_type == _NORMALIZE:
+            normalize = True
+        elif module_type in (_POOLING, _DENSE) and os.path.exists(module_config_path):
+            module_config = _read_json(module_config_path)
+            dimension = module_config.get(
+                "out_features" if module_type == _DENSE else "word_embedding_dimension",
+                dimension,
+            )
+
+    if not dimension:
+        raise ValueError(f"无法从模型配置中解析向量维度: {model_dir}")
+
+    files = _source_files(model_dir)
+    return {
+        "dimension": int(dimension),
+        "max_seq_length": st_config.get("max_seq_length") or config.get("max_position_embeddings"),
+        "normalize": normalize,
+        "tokenizer_hash": _tokenizer_hash(model_dir),
+        "fingerprint": _fingerprint(model_dir, files),
+    }
+
+
+def resolve_model_dir(model_name_or_path: str) -> Optional[str]:
+    """本地路径直接返回；HF repo id 返回本地缓存中的快照目录（不联网），不存在时返回 None"""
+    if os.path.isdir(model_name_or_path):
+        return model_name_or_path
+    try:
+        from huggingface_hub import snapshot_download
+
+        return snapshot_download(model_name_or_path, local_files_only=True)
+    except Exception:
+        return None
+
+
+def load_model_metadata(model_name_or_path: str) -> Optional[Dict[str, Any]]:
+    """
+    读取模型元数据，优先使用模型目录下的缓存文件；模型不在本地时返回 None
+    """
+    model_dir = resolve_model_dir(model_name_or_path)
+    if model_dir is None:
+        return None
+
+    cache_path = os.path.join(model_dir, METADATA_FILE)
+    if os.path.exists(cache_path):
+        try:
+            cached = _read_json(cache_path)
+            if cached.get("fingerprint") == _fingerprint(model_dir, _source_files(model_dir)):
+                return cached
+        except (OSError, ValueError):
+            pass
+
+    metadata = read_model_metadata(model_dir)
+    try:
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        # 模型目录只读（如挂载的镜像层）时只是不缓存，解析本身很便宜
+        logger.debug(f"模型元数据缓存写入失败 {cache_path}: {e}")
+    return metadata
@@ -0,0 +1,126 @@
+"""
+进程级模型注册表：每个模型（按 key 区分模型路径与推理后端）在一个进程内只加载一次，
+并记录加载耗时、参数内存与加载前后的 RSS 增量
+
+预派生（prefork）部署时可在 master 进程中先调用 preload_models()，fork 出的 worker
+通过写时复制共享同一份权重（见项目根目录 gunicorn.conf.py）
+"""
+import os
+import resource
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+
+_models: Dict[str, Any] = {}
+_model_info: Dict[str, Dict[str, Any]] = {}
+_lock = threading.RLock()
+
+
+def _reset_after_fork():
+    # fork 时锁可能正被其他线程持有，子进程中重新创建；已加载的模型保留（写时复制共享）
+    global _lock
+    _lock = threading.RLock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _rss_bytes() -> int:
+    """当前进程常驻内存（Linux 读 /proc，其他平台退化为峰值 RSS）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _smaps_rollup() -> Dict[str, int]:
+    """进程内存中共享 / 私有部分（字节），用于确认 fork 后权重是否仍被共享"""
+    fields = {"Rss": "rss", "Shared_Clean": "shared", "Shared_Dirty": "shared",
+              "Private_Clean": "private", "Private_Dirty": "private"}
+    result = {"rss": 0, "shared": 0, "private": 0}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in fields:
+                    result[fields[key]] += int(rest.split()[0]) * 1024
+    except (OSError, ValueError):
+        result["rss"] = _rss_bytes()
+    return result
+
+
+def _param_bytes(module) -> Optional[int]:
+    if module is None:
+        return None
+    try:
+        return sum(p.numel() * p.element_size() for p in module.parameters())
+    except Exception:
+        return None
+
+
+def get_or_load(key: str, loader: Callable[[], Any], torch_module: Callable[[Any], Any] = None) -> Any:
+    """
+    获取已注册的模型，不存在时调用 loader 加载（同一进程内只加载一次）
+
+    Args:
+        key: 模型唯一标识，如 "embedding:/models/bge-small-zh@torch"
+        loader: 加载函数
+        torch_module: 可选，从加载结果中取出 torch.nn.Module，用于统计参数内存
+    """
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        if key in _models:
+            return _models[key]
+
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        model = loader()
+        load_sec = time.perf_counter() - start
+
+        _models[key] = model
+        _model_info[key] = {
+            "load_sec": round(load_sec, 2),
+            "rss_delta_mb": round((_rss_bytes() - rss_before) / 1024 / 1024, 1),
+            "param_mb": None,
+            "loaded_pid": os.getpid(),
+        }
+        param_bytes = _param_bytes(torch_module(model)) if torch_module else None
+        if param_bytes is not None:
+            _model_info[key]["param_mb"] = round(param_bytes / 1024 / 1024, 1)
+
+        logger.info(f"📦 模型已注册 {key}: {_model_info[key]}")
+        return model
+
+
+def memory_report() -> Dict[str, Any]:
+    """
+    各模型的加载耗时 / 参数内存 / 加载时 RSS 增量，以及当前进程的共享 / 私有内存
+    loaded_pid 与当前 pid 不同说明模型由 master 预加载、经 fork 共享
+    """
+    mb = 1024 * 1024
+    process = {k: round(v / mb, 1) for k, v in _smaps_rollup().items()}
+    return {
+        "pid": os.getpid(),
+        "process_mb": process,
+        "models": {key: {**info, "inherited": info["loaded_pid"] != os.getpid()} for key, info in _model_info.items()},
+    }
+
+
+def preload_models():
+    """
+    加载全部本地模型（不做推理）。prefork 部署时在 master 中调用，
+    推理放到各 worker 的启动预热中执行，避免 fork 前初始化 torch / OpenMP 线程池
+    """
+    from app.knowledge_base.embedding_manager import get_embedding_manager, get_sparse_embedding
+    from app.knowledge_base.reranker import get_reranker
+
+    get_embedding_manager()
+    get_sparse_embedding()
+    get_reranker()  # 微批处理线程按 pid 惰性启动，fork 后在各 worker 中创建
+    return memory_report()
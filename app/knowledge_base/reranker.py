@@ -1,11 +1,48 @@
-from typing import List
+import hashlib
+from typing import List, Optional, Tuple
 from langchain_core.documents import Document
 from loguru import logger
-from sentence_transformers import CrossEncoder
 
 from app.config import settings
+from app.knowledge_base.inference_backend import load_cross_encoder, validate_backend
+from app.knowledge_base.model_registry import get_or_load
+from app.utils.batching import MicroBatcher, register_batcher
+from app.utils.cache import LRUCache
+from app.utils.common import normalize_whitespace
 
-_default_reranker = None
+_rerank_score_cache = None
+
+
+def get_rerank_score_cache() -> LRUCache:
+    """
+    获取全局 rerank 分数缓存（单例）
+    key = (模型名@后端, (归一化 query 的哈希, chunk_id + 内容哈希))，热门问题命中同一批 chunk 时跳过 CrossEncoder 推理；
+    增量同步改写 chunk 后 chunk_id 不变但内容哈希变化，旧分数自然不再命中（各 worker 进程无需显式失效）
+    """
+    global _rerank_score_cache
+
+    if _rerank_score_cache is None:
+        _rerank_score_cache = LRUCache(
+            maxsize=settings.RERANK_CACHE_SIZE,
+            ttl_sec=settings.RERANK_CACHE_TTL_SEC,
+        )
+    return _rerank_score_cache
+
+
+def _query_hash(query: str) -> str:
+    return hashlib.sha1(normalize_whitespace(query).encode("utf-8")).hexdigest()
+
+
+def _chunk_key(doc: Document) -> str:
+    """
+    chunk_id + Qdrant payload 中的 content_hash；
+    缺少任一项（旧版本入库的点）时退化为正文哈希，保证内容变化后不会复用旧分数
+    """
+    metadata = doc.metadata or {}
+    chunk_id, content_hash = metadata.get("chunk_id"), metadata.get("content_hash")
+    if chunk_id and content_hash:
+        return f"{chunk_id}:{content_hash}"
+    return "md5:" + hashlib.md5(doc.page_content.encode("utf-8")).hexdigest()
 
 
 class Reranker:
@@ -17,46 +54,109 @@ class Reranker:
     def __init__(
             self,
             model_name: str = settings.RERANK_MODEL_PATH,
-            top_n: int = 5
+            top_n: int = 5,
+            backend: str = settings.RERANK_BACKEND,
     ):
         """
         Args:
             model_name: rerank 模型名称
-            top_n: rerank 后保留的文档数量
+            top_n: 调用时未指定 top_n 时默认保留的文档数量
+            backend: 推理后端（torch / torch_int8 / onnx / onnx_int8）
         """
         self.model_name = model_name
         self.top_n = top_n
+        self.backend = validate_backend(backend)
+        # 不同后端的分数存在微小差异，缓存按 模型@后端 隔离
+        self.cache_namespace = f"{model_name}@{self.backend}"
         self._model = None
+        self._batcher = None
 
         self._load_model()
+        if settings.INFERENCE_BATCHING_ENABLED:
+            self._batcher = register_batcher(MicroBatcher(
+                name=f"rerank:{self.cache_namespace}",
+                batch_fn=self._predict_batch,
+                max_batch_size=settings.RERANK_BATCH_MAX_PAIRS,
+                max_wait_ms=settings.RERANK_BATCH_MAX_WAIT_MS,
+                size_of=len,
+                split=lambda pairs, n: [pairs[i: i + n] for i in range(0, len(pairs), n)],
+                merge=lambda parts: [score for part in parts for score in part],
+            ))
 
     def _load_model(self):
         """加载 rerank 模型"""
         try:
-            self._model = CrossEncoder(
-                self.model_name,
-                device="cpu"
-            )
-            logger.info(f"Rerank 模型加载成功: {self.model_name}")
+            self._model = load_cross_encoder(self.model_name, self.backend)
+            logger.info(f"Rerank 模型加载成功: {self.model_name} (backend={self.backend})")
         except Exception as e:
             logger.error(f"Rerank 模型加载失败: {e}")
             raise
 
-    def rerank(
+    def _predict_batch(self, pair_groups: List[List[Tuple[str, str]]]) -> List[List[float]]:
+        """多个请求的 (query, doc) 对拼成一次 predict，再按原分组切回"""
+        flat = [pair for group in pair_groups for pair in group]
+        scores = [float(s) for s in self._model.predict(flat, batch_size=settings.RERANK_BATCH_MAX_PAIRS)]
+        results, offset = [], 0
+        for group in pair_groups:
+            results.append(scores[offset: offset + len(group)])
+            offset += len(group)
+        return results
+
+    def _predict(self, query: str, documents: List[Document]) -> List[float]:
+        pairs = [(query, doc.page_content) for doc in documents]
+        if self._batcher is not None:
+            return self._batcher.submit(pairs)
+        return [float(s) for s in self._model.predict(pairs)]
+
+    def score(self, query: str, documents: List[Document], use_cache: bool = True) -> List[float]:
+        """
+        计算每个 Document 与 query 的 CrossEncoder 相关度分数（与输入顺序一一对应）
+        不截断、不修改 Document，调用方需保证 page_content 非空
+        已缓存的 (query, chunk_id + 内容哈希) 直接复用，只对未见过的组合做推理；
+        use_cache=False 时既不读也不写分数缓存（预热等非真实请求）
+        """
+        if not documents:
+            return []
+
+        if not use_cache or not settings.RERANK_CACHE_ENABLED:
+            return self._predict(query, documents)
+
+        cache = get_rerank_score_cache()
+        qhash = _query_hash(query)
+        keys = [(qhash, _chunk_key(doc)) for doc in documents]
+
+        scores = [cache.get(self.cache_namespace, key) for key in keys]
+        missing = [i for i, s in enumerate(scores) if s is None]
+
+        if missing:
+            new_scores = self._predict(query, [documents[i] for i in missing])
+            for i, s in zip(missing, new_scores):
+                scores[i] = s
+                cache.put(self.cache_namespace, keys[i], s)
+
+        logger.debug(f"Rerank 缓存命中 {len(documents) - len(missing)}/{len(documents)}")
+        return scores
+
+    def rerank_with_scores(
             self,
             query: str,
             documents: List[Document],
-    ) -> List[Document]:
+            top_n: Optional[int] = None,
+            score_threshold: Optional[float] = None,
+    ) -> List[Tuple[Document, float]]:
         """
-        对检索到的 Document 进行重排序（CrossEncoder）
+        对检索到的 Document 进行重排序（CrossEncoder），无状态、可并发调用
 
         Args:
             query: 用户查询
-            documents: LangChain Document 列表
+            documents: LangChain Document 列表（不会被修改）
+            top_n: 本次保留的文档数量，默认使用实例的 top_n
+            score_threshold: 可选，过滤掉分数低于该阈值的文档
 
         Returns:
-            rerank 后的 Document 列表（按相关度降序）
+            按相关度降序的 (Document, score) 列表
         """
+        top_n = self.top_n if top_n is None else top_n
 
         if not documents:
             logger.warning("Rerank 输入文档为空")
@@ -64,7 +164,7 @@ class Reranker:
 
         if not query:
             logger.warning("Rerank query 为空，跳过 rerank")
-            return documents[: self.top_n]
+            return [(doc, 0.0) for doc in documents[:top_n]]
 
         # 过滤空文本 Document，防止模型报错
         valid_docs: List[Document] = []
@@ -79,56 +179,60 @@ class Reranker:
             return []
         logger.info(f"开始 Rerank，共 {len(valid_docs)} 条候选文档")
 
-        # 构造 (query, doc_text) 对
-        pairs = [
-            (query, doc.page_content)
-            for doc in valid_docs
-        ]
-
         try:
-            scores = self._model.predict(pairs)
+            scores = self.score(query, valid_docs)
         except Exception as e:
             logger.error(f"Rerank 预测失败: {e}")
-            return valid_docs[: self.top_n]
-
-        # 将 rerank_score 写入 Document.metadata
-        for doc, score in zip(valid_docs, scores):
-            doc.metadata["rerank_score"] = float(score)
+            return [(doc, 0.0) for doc in valid_docs[:top_n]]
 
         # 按分数排序
-        valid_docs.sort(
-            key=lambda d: d.metadata.get("rerank_score", 0.0),
-            reverse=True
-        )
+        scored = sorted(zip(valid_docs, scores), key=lambda x: x[1], reverse=True)
 
-        reranked_docs = valid_docs[: self.top_n]
+        if score_threshold is not None:
+            scored = [(doc, s) for doc, s in scored if s >= score_threshold]
 
-        logger.info(f"Rerank 完成，返回 Top-{len(reranked_docs)} 文档")
+        reranked = scored[:top_n]
+
+        logger.info(f"Rerank 完成，返回 Top-{len(reranked)} 文档")
+
+        return reranked
+
+    def rerank(
+            self,
+            query: str,
+            documents: List[Document],
+            top_n: Optional[int] = None,
+            score_threshold: Optional[float] = None,
+    ) -> List[Document]:
+        """
+        rerank_with_scores 的兼容封装：返回新的 Document 副本，rerank_score 写入副本的 metadata
 
-        return reranked_docs
+        Returns:
+            rerank 后的 Document 列表（按相关度降序）
+        """
+        return [
+            Document(id=doc.id, page_content=doc.page_content, metadata={**doc.metadata, "rerank_score": score})
+            for doc, score in self.rerank_with_scores(query, documents, top_n=top_n, score_threshold=score_threshold)
+        ]
 
 
-def get_reranker(
-        model_name: str = settings.RERANK_MODEL_PATH,
-        top_n: int = 5
-) -> Reranker:
+def get_reranker(model_name: str = settings.RERANK_MODEL_PATH) -> Reranker:
     """
-    获取全局唯一的 Reranker 实例（单例）
+    获取全局唯一的 Reranker 实例（经模型注册表，每个模型 + 后端在进程内只加载一次）
+    top_n / 阈值在每次调用 rerank / rerank_with_scores 时传入
 
     Args:
         model_name: rerank 模型名称
-        top_n: rerank 后保留的文档数量
 
     Returns:
         Reranker 实例
     """
-    global _default_reranker
-
-    if _default_reranker is None:
-        logger.info("🔧 初始化全局 Reranker ...")
-        _default_reranker = Reranker(
-            model_name=model_name,
-            top_n=top_n
-        )
-
-    return _default_reranker
+    def _load() -> Reranker:
+        logger.info(f"🔧 初始化全局 Reranker: {model_name}")
+        return Reranker(model_name=model_name)
+
+    return get_or_load(
+        f"rerank:{model_name}@{settings.RERANK_BACKEND}",
+        _load,
+        torch_module=lambda reranker: reranker._model,
+    )
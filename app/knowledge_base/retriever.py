@@ -21,12 +21,13 @@ class HybridRetriever:
         self.reranker = get_reranker()
         self.vector_store = get_vector_store(collection_name)
 
-    def retrieve(
+    def search(
             self,
             query: str,
             species: str = None,
             urgency: str = None
     ) -> List[Document]:
+        """只做 Hybrid 召回（一次 embedding + 一次 Qdrant 查询），不做 rerank，按召回顺序返回"""
         logger.info(f"Hybrid 检索查询: {query}")
 
         min_urgency = urgency if urgency else None
@@ -37,7 +38,15 @@ class HybridRetriever:
             min_urgency=min_urgency
         )
 
-        initial_docs = base_retriever.invoke(query)
+        return base_retriever.invoke(query)
+
+    def retrieve(
+            self,
+            query: str,
+            species: str = None,
+            urgency: str = None
+    ) -> List[Document]:
+        initial_docs = self.search(query, species=species, urgency=urgency)
 
         if not initial_docs:
             return []
@@ -1,48 +1,376 @@
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
 from sqlalchemy.orm import Session, joinedload
 from loguru import logger
 
+from app.config import settings
 from app.db.base import SessionLocal
 from app.db.knowledge_model import Document, Chunk  # 导入数据模型
-from app.knowledge_base.vector_store import get_vector_store
+from app.knowledge_base.vector_store import (
+    chunk_content_hash,
+    chunk_metadata,
+    chunk_point_id,
+    chunk_to_document,
+    get_vector_store,
+)
+
+
+def _load_sync_state(collection_name: str) -> dict:
+    if not os.path.exists(settings.QDRANT_SYNC_STATE_FILE):
+        return {}
+    with open(settings.QDRANT_SYNC_STATE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f).get(collection_name, {})
+
+
+def _save_sync_state(collection_name: str, state: dict):
+    all_state = {}
+    if os.path.exists(settings.QDRANT_SYNC_STATE_FILE):
+        with open(settings.QDRANT_SYNC_STATE_FILE, "r", encoding="utf-8") as f:
+            all_state = json.load(f)
+    all_state[collection_name] = state
+    with open(settings.QDRANT_SYNC_STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(all_state, f, ensure_ascii=False, indent=2)
+
+
+def _iter_chunks(db: Session, chunk_ids: List[str], batch_size: int = 500) -> Iterator[Chunk]:
+    """按 ID 分批读取完整 Chunk（带 Document），避免超长 IN 列表；逐批产出，内存占用与候选集规模无关"""
+    for i in range(0, len(chunk_ids), batch_size):
+        yield from (
+            db.query(Chunk)
+            .options(joinedload(Chunk.document))
+            .filter(Chunk.id.in_(chunk_ids[i: i + batch_size]))
+            .all()
+        )
 
 
-def sync_mysql_to_qdrant(recreate: bool = False):
+def sync_mysql_to_qdrant(
+        recreate: bool = False,
+        incremental: bool = True,
+        verify_hashes: bool = True,
+        collection_name: str = "animal_rescue_collection",
+        resume: bool = True,
+) -> Optional[Dict[str, int]]:
     """
-    将 MySQL 中的 608 篇文章及其片段同步到 Qdrant
-    :param recreate: 是否清空旧的 Qdrant 集合重新创建
+    将 MySQL 中的文章片段同步到 Qdrant
+    :param recreate: 是否清空旧的 Qdrant 集合重新创建（全量）
+    :param incremental: 增量同步，只 upsert / 删除变化的部分
+    :param verify_hashes: 增量模式下对全部已入库 chunk 比对内容哈希（默认开启，捕获不更新 created_at 的
+        正文 / 文章元数据原地修改）；关闭后只检查新增行、created_at 超过水位线的行与旧版本入库的点
+    :param resume: 全量模式下从上次中断的断点继续
+    :return: 同步统计 {new, changed, deleted, unchanged}
     """
+    if recreate or not incremental:
+        return _sync_full(recreate, collection_name, resume=resume)
+    return _sync_incremental(verify_hashes, collection_name)
+
+
+def _prune_removed(store) -> int:
+    """删除 MySQL 中已不存在的 chunk 对应的点及孤儿点，返回删除的点数"""
     db: Session = SessionLocal()
+    try:
+        mysql_ids = {chunk_id for chunk_id, in db.query(Chunk.id).all()}
+    finally:
+        db.close()
+
+    indexed, orphans = store.fetch_indexed_chunks()
+    stale_points = orphans + [point_id for chunk_id, (point_id, _) in indexed.items() if chunk_id not in mysql_ids]
+    if stale_points:
+        store.delete_points(stale_points)
+    return len(stale_points)
+
+
+def _sync_full(recreate: bool, collection_name: str, resume: bool = True) -> Optional[Dict[str, int]]:
+    """
+    流式全量同步，三级流水线并发执行、之间用有界队列衔接（内存占用与语料规模无关）：
+    reader   —— 按 Chunk.id 顺序 yield_per 流式读取 MySQL，转换为 Document
+    embedder —— 按 SYNC_EMBED_BATCH_SIZE 批量计算 dense + sparse 向量
+    uploader —— 攒够 QDRANT_UPLOAD_BATCH_SIZE × QDRANT_UPLOAD_PARALLEL 个点后走 store.upload_points
+               （与 bulk_load 相同的并行 wait=False 上传路径），每组完成后写入断点（最后一个 chunk_id）
+
+    不重建集合时，全部上传完成后删除 MySQL 中已不存在的 chunk 对应的点（upsert 只会覆盖、不会删除）
+
+    中断后再次运行会从断点继续（resume=False 或 recreate=True 时从头开始）
+    """
+    state = _load_sync_state(collection_name)
+    checkpoint = state.get("checkpoint") if resume and not recreate else None
+    if checkpoint:
+        logger.info(f"从断点继续同步: chunk_id > {checkpoint['last_chunk_id']}（已完成 {checkpoint['done']} 条）")
 
     try:
-        # 1. 获取 store 实例
-        store = get_vector_store(collection_name="animal_rescue_collection", recreate=recreate)
+        store = get_vector_store(collection_name=collection_name, recreate=recreate, read_only=False)
+    except Exception as e:
+        logger.error(f"❌ 同步失败: {e}")
+        return None
+
+    docs_queue: "queue.Queue" = queue.Queue(maxsize=settings.SYNC_QUEUE_MAXSIZE)
+    points_queue: "queue.Queue" = queue.Queue(maxsize=settings.SYNC_QUEUE_MAXSIZE)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    busy = {"read": 0.0, "embed": 0.0, "upload": 0.0}
+    progress = {
+        "done": checkpoint["done"] if checkpoint else 0,
+        "watermark": datetime.fromisoformat(checkpoint["watermark"]) if checkpoint and checkpoint.get("watermark") else None,
+    }
+
+    def _put(q: "queue.Queue", item) -> bool:
+        # 下游出错时不再阻塞等待
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(q: "queue.Queue"):
+        # 上游出错时返回 None 结束本阶段
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return None
+
+    def _stage(name: str, fn):
+        def run():
+            try:
+                fn()
+            except BaseException as e:
+                logger.error(f"❌ 同步流水线 {name} 阶段失败: {e}")
+                errors.append(e)
+                stop.set()
+        return threading.Thread(target=run, name=f"sync-{name}", daemon=True)
+
+    def reader():
+        db: Session = SessionLocal()
+        try:
+            query = db.query(Chunk).options(joinedload(Chunk.document)).order_by(Chunk.id)
+            if checkpoint:
+                query = query.filter(Chunk.id > checkpoint["last_chunk_id"])
 
-        # 2. 一次性从 MySQL 查出所有数据 (668篇约4000条Chunk)
-        logger.info("正在从 MySQL 读取全量数据...")
-        chunks = db.query(Chunk).options(joinedload(Chunk.document)).all()
+            batch, watermark = [], None
+            t0 = time.perf_counter()
+            for chunk in query.yield_per(settings.SYNC_READ_BATCH_SIZE):
+                batch.append(chunk_to_document(chunk))
+                watermark = chunk.created_at if watermark is None else max(watermark, chunk.created_at)
+                if len(batch) >= settings.SYNC_EMBED_BATCH_SIZE:
+                    busy["read"] += time.perf_counter() - t0
+                    if not _put(docs_queue, (batch, watermark)):
+                        return
+                    batch = []
+                    t0 = time.perf_counter()
+            busy["read"] += time.perf_counter() - t0
+            if batch:
+                _put(docs_queue, (batch, watermark))
+        finally:
+            db.close()
+            _put(docs_queue, None)
 
-        if not chunks:
+    def embedder():
+        while True:
+            item = _get(docs_queue)
+            if item is None:
+                break
+            docs, watermark = item
+            t0 = time.perf_counter()
+            points = store.build_points(docs)
+            busy["embed"] += time.perf_counter() - t0
+            if not _put(points_queue, (points, docs[-1].metadata["chunk_id"], watermark)):
+                return
+        _put(points_queue, None)
+
+    def uploader():
+        # 每组点数足够让 upload_points 的多个进程都分到完整批次
+        group_size = settings.QDRANT_UPLOAD_BATCH_SIZE * max(1, settings.QDRANT_UPLOAD_PARALLEL)
+        group: List = []
+        last_chunk_id, finished = None, False
+        while not finished:
+            item = _get(points_queue)
+            if item is None:
+                finished = True
+            else:
+                points, last_chunk_id, watermark = item
+                group.extend(points)
+                if watermark is not None:
+                    progress["watermark"] = watermark if progress["watermark"] is None else max(progress["watermark"], watermark)
+            if not group or (not finished and len(group) < group_size):
+                continue
+            if stop.is_set():
+                return
+
+            t0 = time.perf_counter()
+            store.upload_points(group)
+            busy["upload"] += time.perf_counter() - t0
+            progress["done"] += len(group)
+            group = []
+            # upload_points 返回时整组已写入 WAL；组按 chunk_id 顺序提交，断点之前的数据都已入库
+            _save_sync_state(collection_name, {
+                **state,
+                "checkpoint": {
+                    "last_chunk_id": last_chunk_id,
+                    "done": progress["done"],
+                    "watermark": progress["watermark"].isoformat() if progress["watermark"] else None,
+                },
+            })
+
+    start = time.perf_counter()
+    logger.info("🚀 启动流式同步流水线 (MySQL -> Embedding -> Qdrant)...")
+    threads = [_stage("reader", reader), _stage("embedder", embedder), _stage("uploader", uploader)]
+    # 重建集合时没有线上查询，导入期间暂停 HNSW 构建，结束后一次性重建
+    with store.indexing_paused(recreate and settings.QDRANT_BULK_DISABLE_INDEXING):
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    if not errors:
+        # upload_points 以 wait=False 写入，等待数据可检索（重建集合时还包括 HNSW 重建）
+        store.wait_until_indexed()
+    elapsed = time.perf_counter() - start
+
+    if errors:
+        logger.error(f"❌ 同步中断，已完成 {progress['done']} 条，再次运行将从断点继续")
+        return None
+
+    if progress["done"] == 0:
+        logger.warning("MySQL 中没有数据，请先运行爬虫。")
+        return None
+
+    deleted = 0
+    if not recreate:
+        try:
+            deleted = _prune_removed(store)
+        except Exception as e:
+            # 数据已全部写入，清理失败不影响本次同步结果，下次同步会再次清理
+            logger.error(f"❌ 清理已删除 chunk 的点失败: {e}")
+
+    _save_sync_state(collection_name, {
+        "watermark": progress["watermark"].isoformat() if progress["watermark"] else None,
+        "synced_at": datetime.utcnow().isoformat(),
+        "count": progress["done"],
+    })
+
+    synced_now = progress["done"] - (checkpoint["done"] if checkpoint else 0)
+    logger.success(
+        f"🎉 知识库全量同步完成: {synced_now} 条，删除 {deleted} 个过期点，耗时 {elapsed:.1f}s，"
+        f"吞吐 {synced_now / max(elapsed, 1e-6):.1f} chunks/s "
+        f"(各阶段耗时 read={busy['read']:.1f}s embed={busy['embed']:.1f}s upload={busy['upload']:.1f}s)"
+    )
+    return {"new": progress["done"], "changed": 0, "deleted": deleted, "unchanged": 0}
+
+
+def _sync_incremental(verify_hashes: bool, collection_name: str) -> Optional[Dict[str, int]]:
+    """
+    增量同步：
+    1. 扫描 Qdrant 已入库的 {chunk_id: (point_id, content_hash)}
+    2. 从 MySQL 只读 (id, created_at)，确定候选集：默认全部 chunk（原地修改不一定更新 created_at，
+       只能靠内容哈希发现）；verify_hashes=False 时退化为水位线快速路径：未入库 / created_at 超过水位线 / 旧版本随机 ID 入库
+    3. 逐批读取候选 Chunk 并比对内容哈希，变化的才重新 Embedding + upsert
+    4. MySQL 中已不存在的 chunk 及孤儿点直接删除
+    """
+    start = time.perf_counter()
+    db: Session = SessionLocal()
+
+    try:
+        store = get_vector_store(collection_name=collection_name, read_only=False)
+
+        indexed, orphans = store.fetch_indexed_chunks()
+        state = _load_sync_state(collection_name)
+        watermark = datetime.fromisoformat(state["watermark"]) if state.get("watermark") else None
+
+        rows = db.query(Chunk.id, Chunk.created_at).all()
+        if not rows:
             logger.warning("MySQL 中没有数据，请先运行爬虫。")
-            return
+            return None
+
+        mysql_ids = {chunk_id for chunk_id, _ in rows}
+        candidates = [
+            chunk_id for chunk_id, created_at in rows
+            if verify_hashes
+            or chunk_id not in indexed
+            or watermark is None
+            or created_at > watermark
+            or indexed[chunk_id][1] is None
+            or indexed[chunk_id][0] != chunk_point_id(chunk_id)
+        ]
+
+        to_upsert: List[Chunk] = []
+        stale_points: List[str] = list(orphans)
+        n_new = n_changed = 0
 
-        # 3. 直接把整列表丢进去，让 vector_store 自己去分批 Embedding
-        logger.info(f"🚀 发送 {len(chunks)} 条数据至向量库处理管道...")
+        for chunk in _iter_chunks(db, candidates):
+            point_id, old_hash = indexed.get(chunk.id, (None, None))
+            deterministic = chunk_point_id(chunk.id)
+            if point_id == deterministic and old_hash == chunk_content_hash(chunk, chunk_metadata(chunk)):
+                continue
+            if point_id is None:
+                n_new += 1
+            else:
+                n_changed += 1
+                if point_id != deterministic:
+                    stale_points.append(point_id)
+            to_upsert.append(chunk)
 
-        store.add_documents(chunks)
+        deleted = [point_id for chunk_id, (point_id, _) in indexed.items() if chunk_id not in mysql_ids]
+        stale_points.extend(deleted)
 
-        logger.success("🎉 知识库全量同步指令已完成！")
+        if stale_points:
+            store.delete_points(stale_points)
+        if to_upsert:
+            store.add_documents(to_upsert)
+
+        _save_sync_state(collection_name, {
+            "watermark": max(created_at for _, created_at in rows).isoformat(),
+            "synced_at": datetime.utcnow().isoformat(),
+            "count": len(rows),
+        })
+
+        summary = {
+            "new": n_new,
+            "changed": n_changed,
+            "deleted": len(deleted),
+            "unchanged": len(rows) - n_new - n_changed,
+        }
+        logger.success(
+            f"🎉 增量同步完成: {summary}，候选 {len(candidates)} 条，"
+            f"清理孤儿点 {len(orphans)} 个，耗时 {time.perf_counter() - start:.1f}s"
+        )
+        return summary
 
     except Exception as e:
-        logger.error(f"❌ 同步失败: {e}")
+        logger.error(f"❌ 增量同步失败: {e}")
     finally:
         db.close()
 
 
-# if __name__ == "__main__":
-#     import os
-#
-#     os.environ["NO_PROXY"] = "127.0.0.1,localhost"
-#     os.environ["no_proxy"] = "127.0.0.1,localhost"
-#
-#     # 第一次运行建议设为 True，以确保维度(512)和索引完全正确
-#     sync_mysql_to_qdrant(recreate=True)
+if __name__ == "__main__":
+    import argparse
+
+    os.environ["NO_PROXY"] = "127.0.0.1,localhost"
+    os.environ["no_proxy"] = "127.0.0.1,localhost"
+
+    parser = argparse.ArgumentParser(description="MySQL -> Qdrant 知识库同步")
+    parser.add_argument("--recreate", action="store_true", help="删除并重建集合后全量同步（维度变化时使用）")
+    parser.add_argument("--full", action="store_true", help="全量重新 Embedding（不删除集合）")
+    parser.add_argument(
+        "--watermark-only", action="store_true",
+        help="增量模式只检查新增 / created_at 超过水位线的 chunk（更快，但发现不了未更新 created_at 的原地修改）",
+    )
+    parser.add_argument("--verify-hashes", action="store_true", help="已是默认行为，保留以兼容旧脚本")
+    parser.add_argument("--no-resume", action="store_true", help="全量模式下忽略断点，从头开始")
+    parser.add_argument("--snapshot", action="store_true", help="同步完成后创建集合快照（配合 QDRANT_SNAPSHOT_LOCATION 启动恢复）")
+    args = parser.parse_args()
+
+    summary = sync_mysql_to_qdrant(
+        recreate=args.recreate,
+        incremental=not args.full,
+        verify_hashes=not args.watermark_only,
+        resume=not args.no_resume,
+    )
+    if args.snapshot and summary is not None:
+        get_vector_store(read_only=False).create_snapshot()
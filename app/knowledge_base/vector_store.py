@@ -1,16 +1,255 @@
-from typing import List
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from loguru import logger
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams
-from langchain_qdrant import QdrantVectorStore, RetrievalMode, FastEmbedSparse
+from langchain_qdrant import QdrantVectorStore, RetrievalMode
 from app.config import settings
 from app.db.knowledge_model import Chunk
-from app.knowledge_base.embedding_manager import initialize_embedding_model
+from app.knowledge_base.embedding_manager import initialize_embedding_model, get_sparse_embedding
 from qdrant_client.http import models as rest_models
 from langchain_core.documents import Document
 
 _vector_store_cache = {}
 
+# Qdrant 点 ID 只接受 UUID / 整数，由 Chunk.id 确定性派生，重复同步即为覆盖写入
+_POINT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "animal_rescue_agent/chunks")
+
+
+# 检索时用于过滤的 payload 字段，创建集合时建 keyword 索引，避免过滤查询逐条扫描 payload
+PAYLOAD_INDEX_FIELDS = ("metadata.species", "metadata.urgency", "metadata.category", "metadata.parent_id")
+
+URGENCY = {
+    "info": 1,
+    "common": 2,
+    "critical": 3,
+}
+
+
+def _local_replica(path: str) -> str:
+    """复制本地持久化目录为当前进程私有的只读副本，进程退出时删除"""
+    replica = os.path.join(tempfile.gettempdir(), f"qdrant-replica-{os.getpid()}")
+    if not os.path.exists(replica):
+        os.makedirs(path, exist_ok=True)
+        start = time.perf_counter()
+        shutil.copytree(path, replica, ignore=shutil.ignore_patterns(".lock"))
+        atexit.register(shutil.rmtree, replica, True)
+        logger.info(f"已复制本地 Qdrant 副本 {path} -> {replica} ({time.perf_counter() - start:.2f}s)")
+    return replica
+
+
+def create_qdrant_client(read_only: Optional[bool] = None) -> QdrantClient:
+    """
+    按 settings 创建 Qdrant 客户端，优先级：
+    1. QDRANT_URL —— 服务端模式
+    2. QDRANT_PATH —— 本地持久化模式；read_only 时打开进程私有副本，供多个 worker 共享同一份预构建数据
+    3. 都未配置 —— 内存模式（每次启动为空集合，需要重新同步）
+
+    Args:
+        read_only: 仅对本地模式生效，默认取 settings.QDRANT_LOCAL_READ_ONLY；同步脚本需传 False
+    """
+    if settings.QDRANT_URL:
+        return QdrantClient(
+            url=settings.QDRANT_URL,
+            api_key=getattr(settings, "QDRANT_API_KEY", None),
+        )
+
+    if settings.QDRANT_PATH:
+        read_only = settings.QDRANT_LOCAL_READ_ONLY if read_only is None else read_only
+        path = _local_replica(settings.QDRANT_PATH) if read_only else settings.QDRANT_PATH
+        return QdrantClient(path=path)
+
+    logger.warning("未配置 QDRANT_URL / QDRANT_PATH，使用内存模式，重启后需重新同步知识库")
+    return QdrantClient(location=":memory:")
+
+
+def ensure_payload_indexes(client: QdrantClient, collection_name: str) -> List[str]:
+    """补齐缺失的 keyword payload 索引（幂等），返回本次新建的字段"""
+    existing = client.get_collection(collection_name).payload_schema or {}
+    created = []
+    for field in PAYLOAD_INDEX_FIELDS:
+        if field in existing:
+            continue
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field,
+            field_schema=rest_models.PayloadSchemaType.KEYWORD,
+        )
+        created.append(field)
+    if created:
+        logger.info(f"已为集合 {collection_name} 创建 payload 索引: {created}")
+    return created
+
+
+def build_filter(species: list | str = None, min_urgency: str = None) -> Optional[rest_models.Filter]:
+    """物种（总是包含 uncertain）+ 最低紧急度 过滤条件"""
+    filter_conditions = []
+
+    if species:
+        species_list = [species] if isinstance(species, str) else list(species)
+
+        if "uncertain" not in species_list:
+            species_list.append("uncertain")
+
+        filter_conditions.append(
+            rest_models.FieldCondition(
+                key="metadata.species",
+                match=rest_models.MatchAny(any=species_list),
+            )
+        )
+
+    if min_urgency:
+        min_level = URGENCY.get(min_urgency, 1)
+
+        allowed_urgencies = [
+            key for key, level in URGENCY.items()
+            if level >= min_level
+        ]
+
+        filter_conditions.append(
+            rest_models.FieldCondition(
+                key="metadata.urgency",
+                match=rest_models.MatchAny(any=allowed_urgencies),
+            )
+        )
+
+    return rest_models.Filter(must=filter_conditions) if filter_conditions else None
+
+
+def quantization_config() -> Optional[rest_models.QuantizationConfig]:
+    """按 QDRANT_QUANTIZATION 生成量化配置，none 返回 None"""
+    mode = (settings.QDRANT_QUANTIZATION or "none").lower()
+    if mode == "none":
+        return None
+    if mode == "scalar":
+        return rest_models.ScalarQuantization(
+            scalar=rest_models.ScalarQuantizationConfig(
+                type=rest_models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM,
+            )
+        )
+    if mode == "binary":
+        return rest_models.BinaryQuantization(
+            binary=rest_models.BinaryQuantizationConfig(always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM)
+        )
+    raise ValueError(f"不支持的量化方式: {mode}，可选: none / scalar / binary")
+
+
+def dense_vector_params(size: int, distance: str = "Cosine") -> VectorParams:
+    return VectorParams(
+        size=size,
+        distance=Distance[distance.upper()],
+        on_disk=settings.QDRANT_VECTORS_ON_DISK,
+    )
+
+
+def sparse_vector_params() -> rest_models.SparseVectorParams:
+    return rest_models.SparseVectorParams(
+        index=rest_models.SparseIndexParams(on_disk=settings.QDRANT_SPARSE_ON_DISK),
+    )
+
+
+def build_search_params() -> rest_models.SearchParams:
+    """查询参数：hnsw_ef / exact / 量化重打分，均来自 settings"""
+    return rest_models.SearchParams(
+        hnsw_ef=settings.QDRANT_SEARCH_HNSW_EF or None,
+        exact=settings.QDRANT_SEARCH_EXACT,
+        quantization=rest_models.QuantizationSearchParams(
+            rescore=settings.QDRANT_QUANTIZATION_RESCORE,
+            oversampling=settings.QDRANT_QUANTIZATION_OVERSAMPLING,
+        ),
+    )
+
+
+def chunk_point_id(chunk_id: str) -> str:
+    return str(uuid.uuid5(_POINT_ID_NAMESPACE, chunk_id))
+
+
+def chunk_metadata(chunk: Chunk) -> dict:
+    """Chunk -> Qdrant payload metadata（6 大维度完整映射，不含 content_hash）"""
+    source_info = {
+        "platform": chunk.document.source_platform,
+        "url": chunk.document.url,
+        "author": chunk.document.author or "Unknown",
+        "version": chunk.document.source_version or "Pet Owner Edition"
+    }
+
+    return {
+        "species": chunk.document.species,  # 物种: cat/dog等
+        "urgency": chunk.urgency,  # 紧急度: critical等
+        "category": chunk.document.category,  # 分类: poisoning等
+        "source_info": source_info,  # 来源对象
+        "parent_id": chunk.document_id,  # 文章序号 (md5_hash)
+        "chunk_id": chunk.id,  # 片段唯一ID
+        "index": chunk.chunk_index,  # 片段索引
+        "total": chunk.total_chunks,  # 总片段数
+        "title": chunk.document.title
+    }
+
+
+def chunk_content_hash(chunk: Chunk, metadata: Optional[dict] = None) -> str:
+    """正文 + 元数据的哈希，任一变化都需要重新入库"""
+    metadata = metadata if metadata is not None else chunk_metadata(chunk)
+    raw = chunk.content + "\x00" + json.dumps(metadata, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def chunk_to_document(chunk: Chunk) -> Document:
+    metadata = chunk_metadata(chunk)
+    metadata["content_hash"] = chunk_content_hash(chunk, metadata)
+    return Document(page_content=chunk.content, metadata=metadata)
+
+
+def wait_for_indexing(
+        client: QdrantClient,
+        collection_name: str,
+        timeout_sec: float = None,
+        poll_sec: float = 1.0,
+        settle_polls: int = 3,
+        expect_rebuild: bool = False,
+) -> bool:
+    """
+    等待索引构建完成：集合为 GREEN 且 indexed_vectors_count 达到 points_count × 向量字段数
+
+    刚以 wait=False 写完、刚恢复 m 或刚变更布局时，优化器可能尚未启动，状态仍是 GREEN，不能只看状态；
+    小于 indexing_threshold 的段不会构建 HNSW，索引计数可能永远达不到总数，
+    此时以 GREEN 且索引计数连续 settle_polls 次不变视为完成。
+    expect_rebuild=True（布局迁移等已有索引需要重建的场景）时，索引计数在变更前就已达标，
+    只有观察到过非 GREEN 状态后才接受计数判定，否则必须等满 settle_polls 次稳定的 GREEN
+    """
+    timeout_sec = settings.QDRANT_INDEX_WAIT_TIMEOUT_SEC if timeout_sec is None else timeout_sec
+    deadline = time.monotonic() + timeout_sec
+    last_indexed, stable = None, 0
+    seen_busy = False
+    while time.monotonic() < deadline:
+        info = client.get_collection(collection_name)
+        params = info.config.params
+        n_fields = (len(params.vectors) if isinstance(params.vectors, dict) else 1) + len(params.sparse_vectors or {})
+        points, indexed = info.points_count or 0, info.indexed_vectors_count or 0
+
+        if info.status == rest_models.CollectionStatus.GREEN:
+            if points and indexed >= points * n_fields and (seen_busy or not expect_rebuild):
+                return True
+            stable = stable + 1 if indexed == last_indexed else 0
+            if stable >= settle_polls:
+                return True
+        else:
+            seen_busy = True
+            stable = 0
+        last_indexed = indexed
+        time.sleep(poll_sec)
+    logger.warning(f"等待集合 {collection_name} 索引完成超时 ({timeout_sec}s)")
+    return False
+
 
 class QdrantHybridStore:
     """
@@ -20,26 +259,26 @@ class QdrantHybridStore:
     def __init__(
             self,
             collection_name: str = "animal_rescue_collection",
-            vector_size: int = 512,  # BGE 模型默认向量维度
+            vector_size: Optional[int] = None,  # 默认取嵌入模型元数据中的维度
             distance: str = "Cosine",
             recreate: bool = False,
+            read_only: Optional[bool] = None,
     ):
         self.collection_name = collection_name
-        self.vector_size = vector_size
         self.distance = distance
         self.recreate = recreate
 
         # 连接 Qdrant
-        if settings.QDRANT_URL:
-            self.client = QdrantClient(
-                url=settings.QDRANT_URL,
-                api_key=getattr(settings, "QDRANT_API_KEY", None),
-            )
-        else:
-            self.client = QdrantClient(location=":memory:", host="localhost")
+        self.client = create_qdrant_client(read_only=read_only)
 
         # 配置embedding模型（离线优先，由 embedding_manager 内部读取 settings 配置）
         self.embedding_manager = initialize_embedding_model()
+        self.vector_size = self.embedding_manager.dimension
+        if vector_size is not None and vector_size != self.vector_size:
+            raise ValueError(
+                f"指定的向量维度 {vector_size} 与嵌入模型 {self.embedding_manager.model_path} "
+                f"的维度 {self.vector_size} 不一致"
+            )
 
         # 初始化collection
         self._init_collection()
@@ -49,11 +288,7 @@ class QdrantHybridStore:
             client=self.client,
             collection_name=self.collection_name,
             embedding=self.embedding_manager.embeddings,  # 配置embedding模型
-            sparse_embedding=FastEmbedSparse(
-                model_name=settings.SPARSE_EMBEDDING_MODEL,
-                cache_dir=settings.SPARSE_EMBEDDING_CACHE_DIR,
-                local_files_only=True
-            ),
+            sparse_embedding=get_sparse_embedding(),
             retrieval_mode=RetrievalMode.HYBRID,
             sparse_vector_name="sparse",
         )
@@ -67,113 +302,277 @@ class QdrantHybridStore:
             logger.info(f"已删除集合 {self.collection_name}")
             exists = False
 
+        if not exists and settings.QDRANT_SNAPSHOT_LOCATION:
+            exists = self._restore_snapshot()
+
         if not exists:
             # 为混合检索创建包含密集和稀疏向量的集合
             self.client.create_collection(
                 collection_name=self.collection_name,
-                vectors_config=VectorParams(
-                    size=self.vector_size,
-                    distance=Distance[self.distance.upper()],
-                ),
+                vectors_config=dense_vector_params(self.vector_size, self.distance),
                 sparse_vectors_config={
-                    "sparse": rest_models.SparseVectorParams()
-                }
+                    "sparse": sparse_vector_params()
+                },
+                hnsw_config=rest_models.HnswConfigDiff(
+                    m=settings.QDRANT_HNSW_M,
+                    ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+                ),
+                quantization_config=quantization_config(),
+            )
+            logger.info(
+                f"已初始化集合 {self.collection_name} (Size: {self.vector_size}, "
+                f"quantization={settings.QDRANT_QUANTIZATION}, on_disk={settings.QDRANT_VECTORS_ON_DISK})"
+            )
+        else:
+            self._validate_collection()
+
+        ensure_payload_indexes(self.client, self.collection_name)
+
+    def _validate_collection(self):
+        """
+        已有集合（含快照恢复）的 dense 维度必须与当前嵌入模型一致，
+        否则在任何向量计算 / 重新入库开始之前报错
+        """
+        params = self.client.get_collection(self.collection_name).config.params
+        dense = params.vectors[""] if isinstance(params.vectors, dict) else params.vectors
+        if dense.size != self.vector_size:
+            raise ValueError(
+                f"集合 {self.collection_name} 的向量维度为 {dense.size}，当前嵌入模型 "
+                f"{self.embedding_manager.model_path} 的维度为 {self.vector_size}；"
+                f"请确认 EMBEDDING_MODEL_PATH，或以 recreate=True（--recreate）重建集合"
             )
-            logger.info(f"已初始化集合 {self.collection_name} (Size: {self.vector_size})")
+
+    def _restore_snapshot(self) -> bool:
+        """从 QDRANT_SNAPSHOT_LOCATION 恢复集合（仅服务端模式），返回集合是否已存在"""
+        if not settings.QDRANT_URL:
+            logger.warning("快照恢复仅支持服务端模式（QDRANT_URL），本地模式请使用 QDRANT_PATH 预构建目录")
+            return False
+
+        start = time.perf_counter()
+        try:
+            self.client.recover_snapshot(
+                collection_name=self.collection_name,
+                location=settings.QDRANT_SNAPSHOT_LOCATION,
+                priority=rest_models.SnapshotPriority.SNAPSHOT,
+                wait=True,
+            )
+            logger.info(
+                f"已从快照恢复集合 {self.collection_name}: {settings.QDRANT_SNAPSHOT_LOCATION} "
+                f"({time.perf_counter() - start:.1f}s)"
+            )
+            return True
+        except Exception as e:
+            # 多个 worker 同时启动时，可能已被其他进程恢复
+            logger.warning(f"快照恢复失败: {e}")
+            return self.client.collection_exists(self.collection_name)
+
+    def create_snapshot(self) -> Optional[str]:
+        """在服务端创建集合快照，返回快照名（本地模式直接复制 QDRANT_PATH 目录即可）"""
+        if not settings.QDRANT_URL:
+            logger.warning("本地模式不支持快照，请直接复制 QDRANT_PATH 目录")
+            return None
+        snapshot = self.client.create_snapshot(collection_name=self.collection_name, wait=True)
+        logger.info(f"已创建集合快照: {snapshot.name}")
+        return snapshot.name
 
     def add_documents(self, chunks: List[Chunk], batch_size=50):
         """
         将 MySQL 中的 Chunk 对象数组批量存入 Qdrant。
-        实现了 Metadata 6大维度的完整映射。
+        实现了 Metadata 6大维度的完整映射，点 ID 由 Chunk.id 派生（幂等 upsert）。
         """
-        converted_docs = []
-        for chunk in chunks:
-            source_info = {
-                "platform": chunk.document.source_platform,
-                "url": chunk.document.url,
-                "author": chunk.document.author or "Unknown",
-                "version": chunk.document.source_version or "Pet Owner Edition"
-            }
-
-            metadata = {
-                "species": chunk.document.species,  # 物种: cat/dog等
-                "urgency": chunk.urgency,  # 紧急度: critical等
-                "category": chunk.document.category,  # 分类: poisoning等
-                "source_info": source_info,  # 来源对象
-                "parent_id": chunk.document_id,  # 文章序号 (md5_hash)
-                "chunk_id": chunk.id,  # 片段唯一ID
-                "index": chunk.chunk_index,  # 片段索引
-                "total": chunk.total_chunks,  # 总片段数
-                "title": chunk.document.title
-            }
-
-            # 3. 创建 LangChain Document 对象
-            converted_docs.append(Document(
-                page_content=chunk.content,
-                metadata=metadata
-            ))
+        converted_docs = [chunk_to_document(chunk) for chunk in chunks]
 
         for i in range(0, len(converted_docs), batch_size):
             batch = converted_docs[i: i + batch_size]
-            self.vector_store.add_documents(batch)
+            self.vector_store.add_documents(
+                batch,
+                ids=[chunk_point_id(doc.metadata["chunk_id"]) for doc in batch],
+            )
 
         logger.info(f"已成功将 {len(converted_docs)} 条带完整元数据的 Chunk 同步至 Qdrant")
 
-    def get_retriever(
+    def build_points(self, docs: List[Document]) -> List[rest_models.PointStruct]:
+        """
+        批量计算 dense + sparse 向量并组装成 Qdrant 点
+        payload 结构与 LangChain QdrantVectorStore 一致（page_content / metadata），检索侧无感知
+        """
+        texts = [doc.page_content for doc in docs]
+        dense_vectors = self.embedding_manager.embeddings.embed_documents(texts)
+        sparse_vectors = get_sparse_embedding().embed_documents(texts)
+
+        return [
+            rest_models.PointStruct(
+                id=chunk_point_id(doc.metadata["chunk_id"]),
+                vector={
+                    "": dense,
+                    "sparse": rest_models.SparseVector(indices=sparse.indices, values=sparse.values),
+                },
+                payload={"page_content": doc.page_content, "metadata": doc.metadata},
+            )
+            for doc, dense, sparse in zip(docs, dense_vectors, sparse_vectors)
+        ]
+
+    def upload_points(
             self,
-            k: int = 5,
-            species: list | str = None,
-            min_urgency: str = None,
+            points: Iterable[rest_models.PointStruct],
+            upload_batch_size: int = None,
+            parallel: int = None,
     ):
-        URGENCY = {
-            "info": 1,
-            "common": 2,
-            "critical": 3,
-        }
-        search_kwargs = {"k": k}
-        filter_conditions = []
-
-        if species:
-            species_list = [species] if isinstance(species, str) else species
-
-            if "uncertain" not in species_list:
-                species_list.append("uncertain")
-
-            filter_conditions.append(
-                rest_models.FieldCondition(
-                    key="metadata.species",
-                    match=rest_models.MatchAny(any=species_list),
-                )
+        """
+        批量导入的上传路径（bulk_load 与全量同步共用）：upload_points 分批、多进程并行、wait=False
+        wait=False 返回时数据已写入 WAL，但不保证可检索，导入结束后需 wait_until_indexed
+        """
+        self.client.upload_points(
+            collection_name=self.collection_name,
+            points=points,
+            batch_size=upload_batch_size or settings.QDRANT_UPLOAD_BATCH_SIZE,
+            parallel=parallel or settings.QDRANT_UPLOAD_PARALLEL,
+            wait=False,
+        )
+
+    def _iter_points(self, docs: List[Document], embed_batch_size: int) -> Iterator[rest_models.PointStruct]:
+        for i in range(0, len(docs), embed_batch_size):
+            yield from self.build_points(docs[i: i + embed_batch_size])
+
+    def wait_until_indexed(self, timeout_sec: float = None, poll_sec: float = 1.0, settle_polls: int = 3) -> bool:
+        """等待集合索引构建完成，见 wait_for_indexing"""
+        return wait_for_indexing(
+            self.client, self.collection_name, timeout_sec=timeout_sec, poll_sec=poll_sec, settle_polls=settle_polls
+        )
+
+    @contextmanager
+    def indexing_paused(self, enabled: bool = True):
+        """
+        批量导入期间关闭 HNSW 图构建（m=0），退出时恢复原 m 值，Qdrant 随后一次性重建索引
+        比边写边建图快得多，适合全量导入
+        """
+        if not enabled:
+            yield
+            return
+
+        original_m = self.client.get_collection(self.collection_name).config.hnsw_config.m
+        self.client.update_collection(
+            collection_name=self.collection_name,
+            hnsw_config=rest_models.HnswConfigDiff(m=0),
+        )
+        logger.info(f"已暂停集合 {self.collection_name} 的 HNSW 构建 (原 m={original_m})")
+        try:
+            yield
+        finally:
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                hnsw_config=rest_models.HnswConfigDiff(m=original_m),
             )
+            logger.info(f"已恢复 HNSW (m={original_m})，开始重建索引")
+
+    def bulk_load(
+            self,
+            docs: List[Document],
+            embed_batch_size: int = None,
+            upload_batch_size: int = None,
+            parallel: int = None,
+            disable_indexing: bool = None,
+    ) -> Dict[str, float]:
+        """
+        原生批量导入：大批量预计算 dense + sparse 向量，绕过 LangChain 逐批 upsert，
+        通过 upload_points 多进程并行上传（wait=False），可选导入期间关闭 HNSW
+
+        Args:
+            docs: chunk_to_document 转换后的 Document（metadata 必须包含 chunk_id）
+            embed_batch_size: 每次 Embedding 的文本数
+            upload_batch_size: 每个上传请求的点数
+            parallel: 上传并行进程数
+            disable_indexing: 导入期间是否关闭 HNSW 构建
+
+        Returns:
+            {points, elapsed_sec, index_wait_sec}
+        """
+        embed_batch_size = embed_batch_size or settings.QDRANT_BULK_EMBED_BATCH_SIZE
+        disable_indexing = settings.QDRANT_BULK_DISABLE_INDEXING if disable_indexing is None else disable_indexing
+
+        start = time.perf_counter()
+        with self.indexing_paused(disable_indexing):
+            self.upload_points(self._iter_points(docs, embed_batch_size), upload_batch_size, parallel)
+        upload_sec = time.perf_counter() - start
 
-        if min_urgency:
-            min_level = URGENCY.get(min_urgency, 1)
+        # wait=False 只保证写入 WAL，这里等待数据可见且索引重建完成
+        self.wait_until_indexed()
+        elapsed = time.perf_counter() - start
 
-            allowed_urgencies = [
-                key for key, level in URGENCY.items()
-                if level >= min_level
-            ]
+        logger.info(
+            f"批量导入 {len(docs)} 条至 {self.collection_name}，上传 {upload_sec:.1f}s，"
+            f"含索引重建共 {elapsed:.1f}s ({len(docs) / max(elapsed, 1e-6):.1f} points/s)"
+        )
+        return {"points": len(docs), "elapsed_sec": elapsed, "index_wait_sec": elapsed - upload_sec}
 
-            filter_conditions.append(
-                rest_models.FieldCondition(
-                    key="metadata.urgency",
-                    match=rest_models.MatchAny(any=allowed_urgencies),
-                )
+    def fetch_indexed_chunks(self, page_size: int = 1000) -> Tuple[Dict[str, Tuple[str, Optional[str]]], List[str]]:
+        """
+        扫描集合中已入库的 chunk（只取 payload，不取向量）
+
+        Returns:
+            ({chunk_id: (point_id, content_hash)}, 缺少 chunk_id 的孤儿点 ID 列表)
+            旧版本随机 UUID 入库的点没有 content_hash，返回 None
+        """
+        indexed: Dict[str, Tuple[str, Optional[str]]] = {}
+        orphans: List[str] = []
+        offset = None
+
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=page_size,
+                offset=offset,
+                with_payload=["metadata"],
+                with_vectors=False,
+            )
+            for point in points:
+                metadata = (point.payload or {}).get("metadata") or {}
+                chunk_id = metadata.get("chunk_id")
+                if not chunk_id:
+                    orphans.append(str(point.id))
+                    continue
+                entry = (str(point.id), metadata.get("content_hash"))
+                if chunk_id in indexed:
+                    # 旧版本重复同步产生的副本：优先保留确定性 ID 的点，其余按孤儿删除
+                    if entry[0] == chunk_point_id(chunk_id):
+                        indexed[chunk_id], entry = entry, indexed[chunk_id]
+                    orphans.append(entry[0])
+                    continue
+                indexed[chunk_id] = entry
+            if offset is None:
+                break
+
+        return indexed, orphans
+
+    def delete_points(self, point_ids: List[str], batch_size: int = 500):
+        """按点 ID 删除"""
+        for i in range(0, len(point_ids), batch_size):
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=rest_models.PointIdsList(points=point_ids[i: i + batch_size]),
             )
 
-        if filter_conditions:
-            search_kwargs["filter"] = rest_models.Filter(must=filter_conditions)
+    def get_retriever(
+            self,
+            k: int = 5,
+            species: list | str = None,
+            min_urgency: str = None,
+    ):
+        search_kwargs = {"k": k, "search_params": build_search_params()}
+
+        search_filter = build_filter(species, min_urgency)
+        if search_filter is not None:
+            search_kwargs["filter"] = search_filter
 
         return self.vector_store.as_retriever(search_kwargs=search_kwargs)
 
 
-def get_vector_store(collection_name="animal_rescue_collection", recreate=False):
+def get_vector_store(collection_name="animal_rescue_collection", recreate=False, read_only=None):
     if collection_name not in _vector_store_cache:
-        # bge-small-zh-v1.5 的维度是 512
-        # recreate=True 会删除并重建 collection，解决维度不匹配问题
+        # 向量维度取自嵌入模型元数据；已有集合维度不一致时报错，recreate=True 会删除并重建 collection
         _vector_store_cache[collection_name] = QdrantHybridStore(
             collection_name=collection_name,
-            vector_size=512,
-            recreate=recreate
+            recreate=recreate,
+            read_only=read_only,
         )
     return _vector_store_cache[collection_name]
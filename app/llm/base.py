@@ -8,3 +8,7 @@ class BaseChatModel(ABC):
     @abstractmethod
     def invoke(self, messages: List[BaseMessage]) -> str:
         pass
+
+    @abstractmethod
+    async def ainvoke(self, messages: List[BaseMessage]) -> str:
+        pass
@@ -27,6 +27,11 @@ class ChatModel(BaseChatModel):
         response = self.llm.invoke(messages)
         return response.content if isinstance(response.content, str) else str(response.content)
 
+    # ===== 异步调用 =====
+    async def ainvoke(self, messages: List[BaseMessage]) -> str:
+        response = await self.llm.ainvoke(messages)
+        return response.content if isinstance(response.content, str) else str(response.content)
+
     # ===== 同步流  =====
     def stream(self, messages: List[BaseMessage]):
         """
@@ -4,6 +4,10 @@ from contextlib import asynccontextmanager
 from app.api import health, v1
 from loguru import logger
 from app.db import init_db
+from app.services.warmup import run_warmup, skip_warmup
+from app.utils.concurrency import run_blocking
+from app.utils.http_client import close_http_client
+import asyncio
 import os
 
 os.environ["NO_PROXY"] = "127.0.0.1,localhost"
@@ -26,18 +30,24 @@ async def lifespan(app: FastAPI):
         init_db()
         logger.info("✅ 数据库初始化成功")
 
-        # 3. 检查/初始化向量数据库 (Qdrant)
-        try:
-            logger.info("🔍 检查向量数据库连接...")
-            from app.knowledge_base.vector_store import get_vector_store
-            # get_vector_store 会触发 QdrantHybridStore 的初始化和集合检查
-            _ = get_vector_store()
-            logger.info("✅ 向量数据库连接正常")
-        except Exception as e:
-            logger.error(f"❌ 向量数据库连接失败: {e}")
-            # 本地使用时不强制退出，仅报错
-
-        logger.info("✨ 应用启动成功，准备就绪")
+        # 3. 后台预热：向量库 (Qdrant) / Embedding / Sparse / Rerank / LLM
+        # 预热期间服务已可访问，/health/ready 在预热完成前返回 503
+        if settings.WARMUP_ENABLED:
+            logger.info("🔥 开始后台预热模型...")
+            app.state.warmup_task = asyncio.create_task(run_blocking(run_warmup))
+        else:
+            skip_warmup()
+
+        # 4. 本地救助资源库定期刷新（配置了种子坐标时）
+        if (
+            settings.MAP_RESOURCE_STORE_ENABLED
+            and settings.MAP_RESOURCE_SEED_LOCATIONS
+            and settings.MAP_RESOURCE_REFRESH_INTERVAL_SEC > 0
+        ):
+            from app.mcp.map.resource_store import resource_refresh_loop
+            app.state.resource_refresh_task = asyncio.create_task(resource_refresh_loop())
+
+        logger.info("✨ 应用启动成功")
     except Exception as e:
         logger.error(f"❌ 应用启动失败: {e}")
         raise
@@ -46,6 +56,10 @@ async def lifespan(app: FastAPI):
 
     # 关闭时：清理资源
     logger.info("⚰️ 关闭应用，清理资源...")
+    refresh_task = getattr(app.state, "resource_refresh_task", None)
+    if refresh_task is not None:
+        refresh_task.cancel()
+    await close_http_client()
 
 
 app = FastAPI(
@@ -1,4 +1,5 @@
 # app/mcp/base.py
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Any, Dict
 
@@ -12,3 +13,7 @@ class BaseMCP(ABC):
     @abstractmethod
     def invoke(self, **kwargs) -> Dict[str, Any]:
         pass
+
+    async def ainvoke(self, **kwargs) -> Dict[str, Any]:
+        """异步调用：默认放到线程中执行同步 invoke，子类可覆盖为原生异步实现"""
+        return await asyncio.to_thread(self.invoke, **kwargs)
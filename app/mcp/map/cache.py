@@ -0,0 +1,197 @@
+# app/mcp/map/cache.py
+"""
+地图查询两级缓存：进程内 LRU（第一级）+ 可选 SQLite 持久层（第二级，多 worker / 重启间共享）
+
+- geocode：key = 归一化地址，地址→坐标几乎不变，持久层 TTL 较长
+- poi：    key = 经纬度网格 + 半径 + 资源类型；同一网格内的查询以网格中心坐标发起，结果可直接复用
+两级各自有独立的 TTL 与命中统计
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from app.config import settings
+from app.utils.cache import LRUCache
+from app.utils.common import normalize_whitespace
+
+GEOCODE = "geocode"
+POI = "poi"
+
+
+def geocode_key(address: str) -> str:
+    """地址归一化：去掉所有空白并转小写（"上海市 浦东新区" 与 "上海市浦东新区" 命中同一条）"""
+    return normalize_whitespace(address).replace(" ", "").lower()
+
+
+def snap_location(location: str) -> str:
+    """将 "lon,lat" 对齐到 MAP_CACHE_GRID_DECIMALS 位小数的网格（3 位约 100m）"""
+    lon, lat = (float(v) for v in location.split(","))
+    decimals = settings.MAP_CACHE_GRID_DECIMALS
+    return f"{round(lon, decimals):.{decimals}f},{round(lat, decimals):.{decimals}f}"
+
+
+def poi_key(location: str, radius: int, resource_type: str) -> str:
+    return f"{snap_location(location)}|{radius}|{resource_type}"
+
+
+class DiskCache:
+    """
+    SQLite 持久层：(namespace, key) → JSON 值，按 namespace 使用各自的 TTL
+    每次操作新建连接（开销很小），可在线程池与 fork 出的 worker 中安全使用
+    """
+
+    def __init__(self, path: str, ttl_sec: Dict[str, float]):
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS map_cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, stored_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _count(self, namespace: str, field: str):
+        with self._lock:
+            self._stats.setdefault(namespace, {"hits": 0, "misses": 0, "expired": 0, "errors": 0})[field] += 1
+
+    def get(self, namespace: str, key: str) -> Any:
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, stored_at FROM map_cache WHERE namespace = ? AND key = ?", (namespace, key)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"地图持久缓存读取失败: {e}")
+            self._count(namespace, "errors")
+            return None
+
+        if row is None:
+            self._count(namespace, "misses")
+            return None
+        ttl = self.ttl_sec.get(namespace)
+        if ttl is not None and time.time() - row[1] > ttl:
+            self._count(namespace, "expired")
+            self._count(namespace, "misses")
+            return None
+        self._count(namespace, "hits")
+        return json.loads(row[0])
+
+    def put(self, namespace: str, key: str, value: Any):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO map_cache (namespace, key, value, stored_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value, ensure_ascii=False), time.time()),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"地图持久缓存写入失败: {e}")
+            self._count(namespace, "errors")
+
+    def purge_expired(self) -> int:
+        """删除各 namespace 中已过期的条目，返回删除条数"""
+        now = time.time()
+        deleted = 0
+        with self._connect() as conn:
+            for namespace, ttl in self.ttl_sec.items():
+                deleted += conn.execute(
+                    "DELETE FROM map_cache WHERE namespace = ? AND stored_at < ?", (namespace, now - ttl)
+                ).rowcount
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            namespaces = {
+                ns: {
+                    **counts,
+                    "hit_rate": round(counts["hits"] / max(1, counts["hits"] + counts["misses"]), 4),
+                }
+                for ns, counts in self._stats.items()
+            }
+        return {"path": self.path, "ttl_sec": dict(self.ttl_sec), "namespaces": namespaces}
+
+
+class MapCache:
+    """两级缓存：先查内存，未命中再查持久层，持久层命中后回填内存"""
+
+    def __init__(self):
+        self.memory = LRUCache(maxsize=settings.MAP_CACHE_MEMORY_SIZE, ttl_sec=settings.MAP_CACHE_MEMORY_TTL_SEC)
+        self.disk: Optional[DiskCache] = None
+        if settings.MAP_CACHE_DISK_PATH:
+            # 持久层不可用（目录不可写 / 数据库被锁或损坏）时退化为仅内存缓存，不影响地图查询
+            try:
+                self.disk = DiskCache(
+                    settings.MAP_CACHE_DISK_PATH,
+                    ttl_sec={
+                        GEOCODE: settings.MAP_CACHE_GEOCODE_DISK_TTL_SEC,
+                        POI: settings.MAP_CACHE_POI_DISK_TTL_SEC,
+                    },
+                )
+                purged = self.disk.purge_expired()
+                if purged:
+                    logger.info(f"地图持久缓存清理过期条目 {purged} 条")
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"地图持久缓存不可用，仅使用内存缓存: {e}")
+                self.disk = None
+
+    def get(self, namespace: str, key: str) -> Any:
+        value = self.memory.get(namespace, key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(namespace, key)
+            if value is not None:
+                self.memory.put(namespace, key, value)
+        return value
+
+    def put(self, namespace: str, key: str, value: Any):
+        self.memory.put(namespace, key, value)
+        if self.disk is not None:
+            self.disk.put(namespace, key, value)
+
+    async def aget(self, namespace: str, key: str) -> Any:
+        """异步版本：持久层读写放到线程中执行，不阻塞事件循环"""
+        value = self.memory.get(namespace, key)
+        if value is None and self.disk is not None:
+            value = await asyncio.to_thread(self.disk.get, namespace, key)
+            if value is not None:
+                self.memory.put(namespace, key, value)
+        return value
+
+    async def aput(self, namespace: str, key: str, value: Any):
+        self.memory.put(namespace, key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.put, namespace, key, value)
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+_map_cache: Optional[MapCache] = None
+
+
+def get_map_cache() -> MapCache:
+    """获取全局唯一的地图查询缓存（单例）"""
+    global _map_cache
+
+    if _map_cache is None:
+        _map_cache = MapCache()
+    return _map_cache
+
+
+def map_cache_stats() -> Optional[dict]:
+    return _map_cache.stats() if _map_cache is not None else None
@@ -1,32 +1,61 @@
 # app/mcp/map/client.py
-import requests
+from app.utils.http_client import get_http_client
 
 
 class AmapClient:
     BASE_URL = "https://restapi.amap.com/v3"
+    TIMEOUT_SEC = 10
+    UPSTREAM = "amap"
 
     def __init__(self, api_key: str):
         self.api_key = api_key
 
-    def geocode(self, address: str) -> str:
-        """
-        地址 → 经纬度
-        """
-        url = f"{self.BASE_URL}/geocode/geo"
-        params = {
+    def _geocode_params(self, address: str) -> dict:
+        return {
             "key": self.api_key,
             "address": address,
         }
-        resp = requests.get(url, params=params)
-        resp.raise_for_status()
-        data = resp.json()
 
+    def _around_params(self, location: str, radius: int, keywords: str, page: int = 1, offset: int = 10) -> dict:
+        return {
+            "key": self.api_key,
+            "location": location,
+            "keywords": keywords,
+            "radius": radius,
+            "sortrule": "distance",
+            "offset": offset,  # 每页条数，高德上限 25
+            "page": page,
+            "extensions": "all",
+        }
+
+    @staticmethod
+    def _parse_geocode(data: dict) -> str:
         geocodes = data.get("geocodes")
         if not geocodes:
             raise ValueError("高德地理编码失败")
 
         return geocodes[0]["location"]  # "lng,lat"
 
+    def geocode(self, address: str) -> str:
+        """
+        地址 → 经纬度
+        """
+        url = f"{self.BASE_URL}/geocode/geo"
+        resp = get_http_client().request_sync(
+            self.UPSTREAM, "GET", url, timeout_sec=self.TIMEOUT_SEC, params=self._geocode_params(address)
+        )
+        return self._parse_geocode(resp.json())
+
+    async def ageocode(self, address: str) -> str:
+        """
+        地址 → 经纬度（异步）
+        """
+        url = f"{self.BASE_URL}/geocode/geo"
+        resp = await get_http_client().request(
+            self.UPSTREAM, "GET", url, timeout_sec=self.TIMEOUT_SEC, params=self._geocode_params(address)
+        )
+        return self._parse_geocode(resp.json())
+
     def search_rescue_resources(
         self,
         location: str,
@@ -34,15 +63,23 @@ class AmapClient:
         keywords: str = "动物医院",
     ):
         url = f"{self.BASE_URL}/place/around"
-        params = {
-            "key": self.api_key,
-            "location": location,
-            "keywords": keywords,
-            "radius": radius,
-            "sortrule": "distance",
-            "offset": 10,
-            "extensions": "all",
-        }
-        resp = requests.get(url, params=params)
-        resp.raise_for_status()
+        resp = get_http_client().request_sync(
+            self.UPSTREAM, "GET", url, timeout_sec=self.TIMEOUT_SEC,
+            params=self._around_params(location, radius, keywords),
+        )
+        return resp.json().get("pois", [])
+
+    async def asearch_rescue_resources(
+        self,
+        location: str,
+        radius: int = 5000,
+        keywords: str = "动物医院",
+        page: int = 1,
+        offset: int = 10,
+    ):
+        url = f"{self.BASE_URL}/place/around"
+        resp = await get_http_client().request(
+            self.UPSTREAM, "GET", url, timeout_sec=self.TIMEOUT_SEC,
+            params=self._around_params(location, radius, keywords, page=page, offset=offset),
+        )
         return resp.json().get("pois", [])
@@ -1,11 +1,16 @@
 # app/mcp/map/mcp.py
-from typing import Dict, List
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 import re
+from loguru import logger
 from app.config import settings
 from app.mcp.base import BaseMCP
+from app.mcp.map.cache import GEOCODE, POI, geocode_key, get_map_cache, poi_key, snap_location
 from app.mcp.map.client import AmapClient
-from app.mcp.map.normalizer import normalize_pois
-from app.mcp.map.schemas import MapSearchResult, RescueResource
+from app.mcp.map.normalizer import merge_pois
+from app.mcp.map.resource_store import get_resource_store
+from app.mcp.map.schemas import MapMultiSearchResult, MapSearchResult, RescueResource
 
 
 # 不同救助资源类型对应的搜索关键词
@@ -53,6 +58,172 @@ class MapMCP(BaseMCP):
         """根据资源类型获取搜索关键词"""
         return RESOURCE_KEYWORDS.get(resource_type, [])
 
+    @staticmethod
+    def _parse_coordinates(address: str) -> str:
+        """address 为 "lat,lon" 格式时直接转换为高德需要的 "lon,lat"，否则返回空串"""
+        if re.match(r"^-?\d{1,2}\.\d+,-?\d{1,3}\.\d+$", address):
+            try:
+                lat, lon = address.split(',')
+                return f"{lon},{lat}"  # 高德API需要 lon,lat 格式
+            except ValueError:
+                return ""  # 解析失败则回退到地理编码
+        return ""
+
+    def _geocode(self, address: str) -> str:
+        """地理编码（经两级缓存，失败不缓存）"""
+        if not settings.MAP_CACHE_ENABLED:
+            return self.client.geocode(address)
+        cache, key = get_map_cache(), geocode_key(address)
+        location = cache.get(GEOCODE, key)
+        if location is None:
+            location = self.client.geocode(address)
+            cache.put(GEOCODE, key, location)
+        return location
+
+    async def _ageocode(self, address: str) -> str:
+        if not settings.MAP_CACHE_ENABLED:
+            return await self.client.ageocode(address)
+        cache, key = get_map_cache(), geocode_key(address)
+        location = await cache.aget(GEOCODE, key)
+        if location is None:
+            location = await self.client.ageocode(address)
+            await cache.aput(GEOCODE, key, location)
+        return location
+
+    def _search_pois(self, location: str, resource_type: str, radius: int) -> list:
+        """
+        周边 POI 搜索：先查本地资源库，未命中再请求高德（经两级缓存）；
+        高德失败时使用本地库中已有的部分结果
+        """
+        if not settings.MAP_RESOURCE_STORE_ENABLED:
+            return self._search_pois_remote(location, resource_type, radius)
+        store = get_resource_store()
+        local_pois, hit = store.lookup(location, resource_type, radius)
+        if hit:
+            return local_pois
+        try:
+            return self._search_pois_remote(location, resource_type, radius)
+        except Exception as e:
+            if not local_pois:
+                raise
+            logger.warning(f"高德 POI 搜索失败，使用本地资源库结果 {len(local_pois)} 条: {e}")
+            store.record_fallback()
+            return local_pois
+
+    async def _asearch_pois(self, location: str, resource_type: str, radius: int) -> list:
+        if not settings.MAP_RESOURCE_STORE_ENABLED:
+            return await self._asearch_pois_remote(location, resource_type, radius)
+        store = get_resource_store()
+        local_pois, hit = store.lookup(location, resource_type, radius)
+        if hit:
+            return local_pois
+        try:
+            return await self._asearch_pois_remote(location, resource_type, radius)
+        except Exception as e:
+            if not local_pois:
+                raise
+            logger.warning(f"高德 POI 搜索失败，使用本地资源库结果 {len(local_pois)} 条: {e}")
+            store.record_fallback()
+            return local_pois
+
+    def _search_pois_remote(self, location: str, resource_type: str, radius: int) -> list:
+        """
+        高德周边 POI 搜索（经两级缓存）。开启缓存时以网格中心坐标发起搜索，
+        同一网格内的查询结果完全一致；返回的 distance 相对网格中心，
+        调用方需以实际坐标重新计算距离并按半径过滤（_build_result / _build_multi_result 均经 merge_pois）
+        """
+        keywords = "|".join(self._get_keywords(resource_type))
+        if not settings.MAP_CACHE_ENABLED:
+            return self.client.search_rescue_resources(location=location, keywords=keywords, radius=radius)
+        cache, key = get_map_cache(), poi_key(location, radius, resource_type)
+        pois = cache.get(POI, key)
+        if pois is None:
+            pois = self.client.search_rescue_resources(
+                location=snap_location(location), keywords=keywords, radius=radius
+            )
+            cache.put(POI, key, pois)
+        return pois
+
+    async def _asearch_pois_remote(self, location: str, resource_type: str, radius: int) -> list:
+        keywords = "|".join(self._get_keywords(resource_type))
+        if not settings.MAP_CACHE_ENABLED:
+            return await self.client.asearch_rescue_resources(location=location, keywords=keywords, radius=radius)
+        cache, key = get_map_cache(), poi_key(location, radius, resource_type)
+        pois = await cache.aget(POI, key)
+        if pois is None:
+            pois = await self.client.asearch_rescue_resources(
+                location=snap_location(location), keywords=keywords, radius=radius
+            )
+            await cache.aput(POI, key, pois)
+        return pois
+
+    @staticmethod
+    def _empty_result(address: str, resource_type: str) -> dict:
+        return MapSearchResult(
+            query_address=address,
+            resource_type=resource_type,
+            resources=[]
+        ).model_dump()
+
+    def _validate_resource_types(self, resource_types: List[str]) -> List[str]:
+        """去重（保持顺序）并校验资源类型"""
+        resource_types = list(dict.fromkeys(resource_types))
+        for resource_type in resource_types:
+            if not self._get_keywords(resource_type):
+                raise ValueError(f"不支持的资源类型: {resource_type}")
+        return resource_types
+
+    @staticmethod
+    def _build_multi_result(
+            address: str,
+            resource_types: List[str],
+            location: str,
+            outcomes: list,
+            max_results: int,
+            max_per_type: Optional[int],
+            radius_m: float,
+    ) -> dict:
+        """合并各类型的 POI；部分类型失败时只记录日志，全部失败才抛出"""
+        pois_by_type = {}
+        errors = []
+        for resource_type, outcome in zip(resource_types, outcomes):
+            if isinstance(outcome, Exception):
+                logger.warning(f"地图搜索 {resource_type} 失败: {outcome}")
+                errors.append(outcome)
+            else:
+                pois_by_type[resource_type] = outcome
+        if errors and not pois_by_type:
+            raise errors[0]
+
+        resources = merge_pois(
+            pois_by_type, location, max_results=max_results, max_per_type=max_per_type, radius_m=radius_m
+        )
+        return MapMultiSearchResult(
+            query_address=address,
+            resource_types=resource_types,
+            resources=[RescueResource(**r) for r in resources],
+        ).model_dump()
+
+    @staticmethod
+    def _empty_multi_result(address: str, resource_types: List[str]) -> dict:
+        return MapMultiSearchResult(query_address=address, resource_types=resource_types, resources=[]).model_dump()
+
+    @staticmethod
+    def _build_result(
+            address: str, resource_type: str, location: str, raw_pois: list, max_results: int, radius_m: float
+    ) -> dict:
+        # 结果标准化：距离以用户实际坐标重新计算并排序，超出半径的丢弃（缓存的 POI 是以网格中心搜索得到的）
+        resources = merge_pois({resource_type: raw_pois}, location, max_results=max_results, radius_m=radius_m)
+
+        # 构造结构化返回
+        result = MapSearchResult(
+            query_address=address,
+            resource_type=resource_type,
+            resources=[RescueResource(**r) for r in resources]
+        )
+
+        return result.model_dump()
+
     def invoke(
         self,
         address: str | None,
@@ -76,11 +247,7 @@ class MapMCP(BaseMCP):
         # 0️⃣ 参数兜底：address 为空时直接返回空结果（不中断 Agent）
         address = (address or "").strip()
         if not address:
-            return MapSearchResult(
-                query_address="",
-                resource_type=resource_type,
-                resources=[]
-            ).model_dump()
+            return self._empty_result("", resource_type)
 
         # 1️⃣ 校验资源类型
         keywords = self._get_keywords(resource_type)
@@ -88,47 +255,113 @@ class MapMCP(BaseMCP):
             raise ValueError(f"不支持的资源类型: {resource_type}")
 
         # 2️⃣ 地址 → 经纬度 (或直接使用经纬度)
-        location = ""
-        # 检查 address 是否为 "lat,lon" 格式
-        if re.match(r"^-?\d{1,2}\.\d+,-?\d{1,3}\.\d+$", address):
-            try:
-                lat, lon = address.split(',')
-                location = f"{lon},{lat}"  # 高德API需要 lon,lat 格式
-            except ValueError:
-                location = self.client.geocode(address) # 解析失败则回退
-        else:
-            location = self.client.geocode(address)
+        location = self._parse_coordinates(address) or self._geocode(address)
 
         if not location:
             # 地址无法解析，直接返回空结果（不中断 Agent）
-            return MapSearchResult(
-                query_address=address,
-                resource_type=resource_type,
-                resources=[]
-            ).model_dump()
+            return self._empty_result(address, resource_type)
 
         # 3️⃣ POI 搜索
-        raw_pois = self.client.search_rescue_resources(
-            location=location,
-            keywords="|".join(keywords),
-            radius=radius_km * 1000,
-        )
+        raw_pois = self._search_pois(location, resource_type, radius_km * 1000)
 
-        # 4️⃣ 结果标准化
-        resources = normalize_pois(
-            raw_pois,
-            max_results=max_results,
-            category=resource_type
+        # 4️⃣ 结果标准化 + 结构化返回
+        return self._build_result(address, resource_type, location, raw_pois, max_results, radius_km * 1000)
+
+    async def ainvoke(
+        self,
+        address: str | None,
+        resource_type: str = "hospital",
+        radius_km: int = 5,
+        max_results: int = 5,
+    ) -> dict:
+        """调用地图 MCP（异步版本，参数与返回同 invoke）"""
+        address = (address or "").strip()
+        if not address:
+            return self._empty_result("", resource_type)
+
+        keywords = self._get_keywords(resource_type)
+        if not keywords:
+            raise ValueError(f"不支持的资源类型: {resource_type}")
+
+        location = self._parse_coordinates(address) or await self._ageocode(address)
+
+        if not location:
+            return self._empty_result(address, resource_type)
+
+        raw_pois = await self._asearch_pois(location, resource_type, radius_km * 1000)
+
+        return self._build_result(address, resource_type, location, raw_pois, max_results, radius_km * 1000)
+
+    def invoke_many(
+        self,
+        address: str | None,
+        resource_types: List[str],
+        radius_km: int = 5,
+        max_results: int = 5,
+        max_per_type: Optional[int] = None,
+    ) -> dict:
+        """
+        一次调用查询多种资源类型：只做一次地理编码，各类型的 POI 搜索并发执行，
+        结果按高德 POI id 去重后按到用户位置的距离排序
+
+        Args:
+            address: 用户提供的位置
+            resource_types: 资源类型列表（hospital / shelter / volunteer / gov）
+            radius_km: 搜索半径（公里）
+            max_results: 合并后的最大返回结果数
+            max_per_type: 每种类型最多参与合并的结果数（避免某一类型占满结果），默认不限
+
+        Returns:
+            MapMultiSearchResult（dict）
+        """
+        address = (address or "").strip()
+        resource_types = self._validate_resource_types(resource_types)
+        if not address or not resource_types:
+            return self._empty_multi_result(address, resource_types)
+
+        location = self._parse_coordinates(address) or self._geocode(address)
+        if not location:
+            return self._empty_multi_result(address, resource_types)
+
+        def _search(resource_type: str):
+            try:
+                return self._search_pois(location, resource_type, radius_km * 1000)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=len(resource_types)) as pool:
+            outcomes = list(pool.map(_search, resource_types))
+
+        return self._build_multi_result(
+            address, resource_types, location, outcomes, max_results, max_per_type, radius_km * 1000
         )
 
-        # 5️⃣ 构造结构化返回
-        result = MapSearchResult(
-            query_address=address,
-            resource_type=resource_type,
-            resources=[RescueResource(**r) for r in resources]
+    async def ainvoke_many(
+        self,
+        address: str | None,
+        resource_types: List[str],
+        radius_km: int = 5,
+        max_results: int = 5,
+        max_per_type: Optional[int] = None,
+    ) -> dict:
+        """多资源类型查询（异步版本，参数与返回同 invoke_many）"""
+        address = (address or "").strip()
+        resource_types = self._validate_resource_types(resource_types)
+        if not address or not resource_types:
+            return self._empty_multi_result(address, resource_types)
+
+        location = self._parse_coordinates(address) or await self._ageocode(address)
+        if not location:
+            return self._empty_multi_result(address, resource_types)
+
+        outcomes = await asyncio.gather(
+            *(self._asearch_pois(location, t, radius_km * 1000) for t in resource_types),
+            return_exceptions=True,
         )
 
-        return result.model_dump()
+        return self._build_multi_result(
+            address, resource_types, location, outcomes, max_results, max_per_type, radius_km * 1000
+        )
 
 
 if __name__ == "__main__":
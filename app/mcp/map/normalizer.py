@@ -1,16 +1,90 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def _normalize_poi(poi: dict, category: str, distance_m: int) -> dict:
+    return {
+        "poi_id": poi.get("id"),
+        "name": poi.get("name"),
+        "address": poi.get("address"),
+        "location": poi.get("location"),
+        "distance_m": distance_m,
+        "category": category,
+        "tel": poi.get("tel"),
+    }
+
+
 def normalize_pois(pois, max_results: int, category: str="unknown"):
     results = []
 
     for poi in pois[:max_results]:
-        results.append(
-            {
-                "name": poi.get("name"),
-                "address": poi.get("address"),
-                "location": poi.get("location"),
-                "distance_m": int(poi.get("distance", 0)),
-                "category": category,
-                "tel": poi.get("tel"),
-            }
-        )
+        results.append(_normalize_poi(poi, category, int(poi.get("distance", 0))))
+
+    return results
+
+
+def parse_lon_lat(location: Optional[str]) -> tuple:
+    try:
+        lon, lat = location.split(",")
+        return float(lon), float(lat)
+    except (AttributeError, ValueError):
+        return np.nan, np.nan
 
+
+def haversine_rad(lon0: float, lat0: float, lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+    """(lon0, lat0) 到一组坐标的大圆距离（米），输入均为弧度"""
+    a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_m(origin: str, locations: List[Optional[str]]) -> np.ndarray:
+    """
+    origin（"lon,lat"）到一组 POI location 的大圆距离（米），向量化计算；
+    location 缺失或无法解析的位置为 nan
+    """
+    if not locations:
+        return np.empty(0)
+    lon0, lat0 = np.radians(parse_lon_lat(origin))
+    coords = np.radians(np.array([parse_lon_lat(loc) for loc in locations], dtype=np.float64))
+    return haversine_rad(lon0, lat0, coords[:, 0], coords[:, 1])
+
+
+def merge_pois(
+        pois_by_type: Dict[str, list],
+        origin: str,
+        max_results: int,
+        max_per_type: Optional[int] = None,
+        radius_m: Optional[float] = None,
+) -> List[dict]:
+    """
+    多资源类型的 POI 合并：按高德 POI id 去重（同一 POI 归入先出现的类型），
+    以 origin 为起点重新计算距离并由近到远排序；无法计算距离的 POI 使用高德返回的 distance
+    指定 radius_m 时丢弃距离超出半径的 POI（网格中心搜索到的结果可能落在用户实际位置的半径之外）
+    """
+    seen = set()
+    rows = []
+    for category, pois in pois_by_type.items():
+        for poi in pois[:max_per_type] if max_per_type else pois:
+            key = poi.get("id") or (poi.get("name"), poi.get("location"))
+            if key in seen:
+                continue
+            seen.add(key)
+            rows.append((category, poi))
+
+    distances = haversine_m(origin, [poi.get("location") for _, poi in rows])
+    fallback = np.array([float(poi.get("distance") or np.inf) for _, poi in rows])
+    distances = np.where(np.isnan(distances), fallback, distances)
+
+    order = np.argsort(distances, kind="stable")
+    if radius_m is not None:
+        order = order[distances[order] <= radius_m]
+
+    results = []
+    for i in order[:max_results]:
+        category, poi = rows[i]
+        distance_m = int(round(distances[i])) if np.isfinite(distances[i]) else 0
+        results.append(_normalize_poi(poi, category, distance_m))
     return results
@@ -0,0 +1,308 @@
+# app/mcp/map/resource_store.py
+"""
+本地救助资源库：医院 / 救助站 / 志愿组织 / 政府机构的定期快照 + 网格空间索引
+
+- 快照为 JSON 文件（MAP_RESOURCE_STORE_PATH），由 refresh_resources() 以种子坐标批量拉取高德周边搜索生成，
+  也可以直接指向离线样例数据（fixtures/rescue_resources_sample.json）
+- 索引按 MAP_RESOURCE_INDEX_CELL_DEG 度的经纬度网格分桶（等价于定长 geohash 前缀），
+  查询只取覆盖半径的网格内候选，再向量化计算 haversine 距离
+- MapMCP 先查本地库，半径内结果不足 MAP_RESOURCE_MIN_HITS 条才回退到高德 API；
+  API 失败时使用本地已有的部分结果
+
+用法：
+    python -m app.mcp.map.resource_store --query 121.4737,31.2304 --type hospital
+    python -m app.mcp.map.resource_store --refresh
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.config import settings
+from app.mcp.map.normalizer import haversine_rad, parse_lon_lat
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "rescue_resources_sample.json")
+
+_REFRESH_PAGE_SIZE = 25  # 高德周边搜索单页上限
+
+
+class ResourceIndex:
+    """不可变的网格空间索引，刷新时整体替换"""
+
+    def __init__(self, resources: List[dict], cell_deg: float):
+        self.cell_deg = cell_deg
+        self.resources = []
+        coords = []
+        for r in resources:
+            lon, lat = parse_lon_lat(r.get("location"))
+            if not (math.isnan(lon) or math.isnan(lat)):
+                self.resources.append(r)
+                coords.append((lon, lat))
+
+        coords = np.array(coords, dtype=np.float64).reshape(-1, 2)
+        self.lon = np.radians(coords[:, 0])
+        self.lat = np.radians(coords[:, 1])
+        self.categories = np.array([r.get("category") for r in self.resources], dtype=object)
+
+        cells = defaultdict(list)
+        for i, (lon, lat) in enumerate(coords):
+            cells[self._cell(lon, lat)].append(i)
+        self.cells: Dict[Tuple[int, int], np.ndarray] = {k: np.array(v, dtype=np.int64) for k, v in cells.items()}
+
+    def __len__(self) -> int:
+        return len(self.resources)
+
+    def _cell(self, lon: float, lat: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def _candidates(self, lon: float, lat: float, radius_m: float) -> np.ndarray:
+        dlat = math.degrees(radius_m / 6371008.8)
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        y0, x0 = self._cell(lon - dlon, lat - dlat)
+        y1, x1 = self._cell(lon + dlon, lat + dlat)
+        if (y1 - y0 + 1) * (x1 - x0 + 1) > len(self.cells):
+            # 半径覆盖的网格比已有网格还多，直接遍历已有网格
+            buckets = list(self.cells.values())
+        else:
+            buckets = [self.cells[c] for y in range(y0, y1 + 1) for x in range(x0, x1 + 1) if (c := (y, x)) in self.cells]
+        return np.concatenate(buckets) if buckets else np.empty(0, dtype=np.int64)
+
+    def nearest(
+            self,
+            lon: float,
+            lat: float,
+            radius_m: float,
+            category: Optional[str] = None,
+            limit: int = 10,
+    ) -> List[Tuple[dict, float]]:
+        """半径内最近的 limit 个资源（按距离升序），返回 [(资源, 距离米)]"""
+        candidates = self._candidates(lon, lat, radius_m)
+        if category is not None and len(candidates):
+            candidates = candidates[self.categories[candidates] == category]
+        if not len(candidates):
+            return []
+
+        distances = haversine_rad(math.radians(lon), math.radians(lat), self.lon[candidates], self.lat[candidates])
+        within = distances <= radius_m
+        candidates, distances = candidates[within], distances[within]
+        order = np.argsort(distances, kind="stable")[:limit]
+        return [(self.resources[candidates[i]], float(distances[i])) for i in order]
+
+
+class ResourceStore:
+    """本地资源库：持有当前索引、快照元信息与命中统计"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index = ResourceIndex([], settings.MAP_RESOURCE_INDEX_CELL_DEG)
+        self.updated_at: Optional[str] = None
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "fallbacks": 0}
+
+    def load(self) -> bool:
+        """从快照文件加载（文件不存在时保持空索引），返回是否加载成功"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.index = ResourceIndex(data.get("resources", []), settings.MAP_RESOURCE_INDEX_CELL_DEG)
+        self.updated_at = data.get("updated_at")
+        self._mtime = os.path.getmtime(self.path)
+        logger.info(f"已加载本地救助资源 {len(self.index)} 条: {self.path} (updated_at={self.updated_at})")
+        return True
+
+    def replace(self, resources: List[dict]):
+        """写入新快照（原子替换文件）并切换索引"""
+        updated_at = datetime.now().isoformat()
+        index = ResourceIndex(resources, settings.MAP_RESOURCE_INDEX_CELL_DEG)
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"updated_at": updated_at, "resources": resources}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._mtime = os.path.getmtime(self.path)
+        self.index, self.updated_at = index, updated_at
+
+    def age_sec(self) -> Optional[float]:
+        """快照文件距今的秒数（可能由其他 worker 刷新），无快照时返回 None"""
+        if not self.path or not os.path.exists(self.path):
+            return None
+        return time.time() - os.path.getmtime(self.path)
+
+    def reload_if_changed(self):
+        """其他 worker 已写入更新的快照时重新加载"""
+        if self.path and os.path.exists(self.path) and os.path.getmtime(self.path) != self._mtime:
+            self.load()
+
+    def _count(self, field: str):
+        with self._lock:
+            self._stats[field] += 1
+
+    def lookup(self, location: str, resource_type: str, radius_m: int, limit: int = 10) -> Tuple[List[dict], bool]:
+        """
+        查询半径内最近的资源，返回 (高德 POI 格式的结果, 是否命中)
+        结果不少于 MAP_RESOURCE_MIN_HITS 条视为命中；未命中时结果仍可作为 API 失败时的兜底
+        """
+        lon, lat = parse_lon_lat(location)
+        if math.isnan(lon) or math.isnan(lat):
+            return [], False
+        pois = [
+            {**r, "distance": str(int(round(d)))}
+            for r, d in self.index.nearest(lon, lat, radius_m, category=resource_type, limit=limit)
+        ]
+        hit = len(pois) >= settings.MAP_RESOURCE_MIN_HITS
+        self._count("hits" if hit else "misses")
+        return pois, hit
+
+    def record_fallback(self):
+        """API 失败、改用本地部分结果"""
+        self._count("fallbacks")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._stats)
+        return {
+            "path": self.path,
+            "size": len(self.index),
+            "cells": len(self.index.cells),
+            "updated_at": self.updated_at,
+            **counts,
+            "hit_rate": round(counts["hits"] / max(1, counts["hits"] + counts["misses"]), 4),
+        }
+
+
+_resource_store: Optional[ResourceStore] = None
+
+
+def get_resource_store() -> ResourceStore:
+    """获取全局唯一的本地资源库（单例，首次调用时从快照文件加载）"""
+    global _resource_store
+
+    if _resource_store is None:
+        store = ResourceStore(settings.MAP_RESOURCE_STORE_PATH)
+        try:
+            store.load()
+        except (OSError, ValueError) as e:
+            logger.warning(f"本地救助资源快照加载失败，仅使用高德 API: {e}")
+        _resource_store = store
+    return _resource_store
+
+
+def resource_store_stats() -> Optional[dict]:
+    return _resource_store.stats() if _resource_store is not None else None
+
+
+def _seed_locations() -> List[str]:
+    return [s.strip() for s in settings.MAP_RESOURCE_SEED_LOCATIONS.split(";") if s.strip()]
+
+
+async def refresh_resources(client=None) -> int:
+    """
+    以 MAP_RESOURCE_SEED_LOCATIONS 中的每个种子坐标为中心，按资源类型分页拉取高德周边搜索，
+    按 POI id 去重后写入新快照，返回资源条数
+    """
+    from app.mcp.map.client import AmapClient
+    from app.mcp.map.mcp import RESOURCE_KEYWORDS
+
+    seeds = _seed_locations()
+    if not seeds:
+        raise ValueError("未配置 MAP_RESOURCE_SEED_LOCATIONS")
+    client = client or AmapClient(settings.AMAP_API_KEY)
+
+    async def _fetch(seed: str, resource_type: str) -> List[dict]:
+        pois = []
+        for page in range(1, settings.MAP_RESOURCE_SEED_PAGES + 1):
+            batch = await client.asearch_rescue_resources(
+                location=seed,
+                radius=settings.MAP_RESOURCE_SEED_RADIUS_M,
+                keywords="|".join(RESOURCE_KEYWORDS[resource_type]),
+                page=page,
+                offset=_REFRESH_PAGE_SIZE,
+            )
+            pois.extend(batch)
+            if len(batch) < _REFRESH_PAGE_SIZE:
+                break
+        return pois
+
+    jobs = [(seed, resource_type) for seed in seeds for resource_type in RESOURCE_KEYWORDS]
+    outcomes = await asyncio.gather(*(_fetch(seed, t) for seed, t in jobs))
+
+    resources, seen = [], set()
+    for (_, resource_type), pois in zip(jobs, outcomes):
+        for poi in pois:
+            key = poi.get("id") or (poi.get("name"), poi.get("location"))
+            if key in seen or not isinstance(poi.get("location"), str):
+                continue
+            seen.add(key)
+            resources.append({
+                "id": poi.get("id"),
+                "name": poi.get("name"),
+                "address": poi.get("address") if isinstance(poi.get("address"), str) else "",
+                "location": poi.get("location"),
+                "tel": poi.get("tel") or None,
+                "category": resource_type,
+            })
+
+    get_resource_store().replace(resources)
+    logger.success(f"本地救助资源已刷新: {len(resources)} 条（{len(seeds)} 个种子坐标）")
+    return len(resources)
+
+
+async def resource_refresh_loop():
+    """
+    后台定期刷新：快照（可能由其他 worker 写入）未过期时只重新加载，过期才拉取高德
+    """
+    interval = settings.MAP_RESOURCE_REFRESH_INTERVAL_SEC
+    store = get_resource_store()
+    while True:
+        age = store.age_sec()
+        if age is not None and age < interval:
+            store.reload_if_changed()
+            await asyncio.sleep(interval - age)
+            continue
+        try:
+            await refresh_resources()
+        except Exception as e:
+            logger.error(f"本地救助资源刷新失败，继续使用旧快照: {e}")
+            await asyncio.sleep(min(interval, 600))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地救助资源库：刷新快照 / 离线查询")
+    parser.add_argument("--refresh", action="store_true", help="按种子坐标从高德拉取并写入快照")
+    parser.add_argument("--fixture", action="store_true", help="使用离线样例数据（不读写快照文件）")
+    parser.add_argument("--query", help="查询坐标 lon,lat")
+    parser.add_argument("--type", default="hospital")
+    parser.add_argument("--radius", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.refresh:
+        print(f"刷新完成: {asyncio.run(refresh_resources())} 条")
+        return
+
+    store = ResourceStore(FIXTURE_PATH if args.fixture else settings.MAP_RESOURCE_STORE_PATH)
+    store.load()
+    if args.query:
+        start = time.perf_counter()
+        pois, hit = store.lookup(args.query, args.type, args.radius, limit=args.limit)
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        print(f"hit={hit} results={len(pois)} ({elapsed_us:.0f}µs)")
+        for poi in pois:
+            print(f"  {poi['distance']:>6}m  {poi['name']}  {poi['address']}")
+    print(store.stats())
+
+
+if __name__ == "__main__":
+    main()
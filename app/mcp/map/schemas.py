@@ -1,8 +1,9 @@
-from typing import List, Union
+from typing import List, Optional, Union
 from pydantic import BaseModel
 
 
 class RescueResource(BaseModel):
+    poi_id: Optional[str] = None  # 高德 POI id
     name: str
     category: str
     address: str
@@ -16,3 +17,9 @@ class MapSearchResult(BaseModel):
     query_address: str
     resource_type: str
     resources: List[RescueResource]
+
+
+class MapMultiSearchResult(BaseModel):
+    query_address: str
+    resource_types: List[str]
+    resources: List[RescueResource]  # 多类型合并去重后按距离排序
@@ -0,0 +1,259 @@
+# app/mcp/web_search/cache.py
+"""
+Web 搜索结果缓存：按 query 向量复用已标准化的 WebFact 列表
+
+- 精确匹配：归一化 query → 条目，O(1)
+- 近似匹配：随机超平面 LSH（多表 SimHash 分桶）取候选，再精确计算余弦相似度，
+  超过 WEB_CACHE_SIMILARITY 且关键词（物种 / 物质 / 症状 / 数字）完全一致才视为同一问题——
+  "猫能吃葡萄吗" 与 "狗能吃葡萄吗" 向量极其相近，但答案不能互相复用；
+  阈值可用 python -m app.benchmarks.bench_web_cache_threshold 在标注的同义 / 非同义问题对上校准
+- 过期策略：WEB_CACHE_TTL_SEC 内为新鲜命中；之后 WEB_CACHE_STALE_TTL_SEC 内仍返回旧结果，
+  同时由调用方在后台重新搜索（stale-while-revalidate）；再之后视为未命中
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.utils.common import normalize_whitespace
+
+FRESH = "fresh"
+STALE = "stale"
+
+# 关键词 → 规范名：同义写法归一，不同物种 / 物质 / 症状之间不允许近似命中
+_KEY_TERMS: Dict[str, str] = {
+    # 物种（与知识库 payload 的 species 取值一致）
+    "猫": "cat", "猫咪": "cat", "喵": "cat",
+    "狗": "dog", "狗狗": "dog", "犬": "dog",
+    "兔": "rabbit", "兔子": "rabbit",
+    "鸟": "bird", "鹦鹉": "bird", "鸽子": "bird", "麻雀": "bird",
+    "仓鼠": "hamster", "龟": "turtle", "乌龟": "turtle", "刺猬": "hedgehog",
+    # 年龄 / 生理阶段
+    "幼": "young", "老年": "senior", "怀孕": "pregnant", "哺乳": "nursing",
+    # 食物与有毒物质
+    "葡萄": "葡萄", "葡萄干": "葡萄干", "巧克力": "巧克力", "可可": "巧克力",
+    "洋葱": "洋葱", "葱": "葱", "大蒜": "大蒜", "蒜": "大蒜", "韭菜": "韭菜",
+    "木糖醇": "木糖醇", "牛油果": "牛油果", "鳄梨": "牛油果", "百合": "百合",
+    "咖啡": "咖啡", "茶": "茶", "酒": "酒精", "酒精": "酒精",
+    "牛奶": "牛奶", "奶": "奶", "鸡蛋": "鸡蛋", "生肉": "生肉", "骨头": "骨头", "鱼刺": "鱼刺",
+    "盐": "盐", "糖": "糖", "坚果": "坚果", "夏威夷果": "夏威夷果", "杏仁": "杏仁", "核桃": "核桃",
+    "芒果": "芒果", "苹果": "苹果", "香蕉": "香蕉", "西瓜": "西瓜", "草莓": "草莓", "樱桃": "樱桃",
+    "桃": "桃", "李子": "李子", "柑橘": "柑橘", "橘子": "柑橘", "柠檬": "柠檬", "菠萝": "菠萝",
+    "猫粮": "猫粮", "狗粮": "狗粮", "鱼": "鱼", "虾": "虾",
+    "老鼠药": "老鼠药", "鼠药": "老鼠药", "杀虫剂": "杀虫剂", "农药": "农药",
+    "消毒液": "消毒液", "漂白剂": "漂白剂", "防冻液": "防冻液",
+    "布洛芬": "布洛芬", "对乙酰氨基酚": "对乙酰氨基酚", "扑热息痛": "对乙酰氨基酚",
+    "阿司匹林": "阿司匹林", "感冒药": "感冒药", "驱虫药": "驱虫药",
+    # 症状 / 伤情
+    "呕吐": "呕吐", "吐": "呕吐", "腹泻": "腹泻", "拉稀": "腹泻", "便血": "便血", "尿血": "尿血",
+    "抽搐": "抽搐", "发烧": "发烧", "发热": "发烧", "咳嗽": "咳嗽", "打喷嚏": "打喷嚏",
+    "骨折": "骨折", "出血": "出血", "流血": "出血", "中毒": "中毒", "中暑": "中暑",
+    "脱水": "脱水", "瘫痪": "瘫痪", "昏迷": "昏迷", "呼吸困难": "呼吸困难",
+}
+# 按长度降序组成交替模式，同一位置优先匹配最长词（"葡萄干" 不会被拆成 "葡萄"）
+_KEY_TERM_PATTERN = re.compile(
+    "|".join(re.escape(t) for t in sorted(_KEY_TERMS, key=len, reverse=True)) + r"|[a-z]+|\d+(?:\.\d+)?"
+)
+
+
+def query_key(query: str) -> str:
+    return normalize_whitespace(query).lower()
+
+
+def key_terms(query: str) -> frozenset:
+    """
+    query 中的关键词集合（规范名），近似命中要求两侧完全一致
+    词表外的英文单词（药名等）与数字（剂量、月龄）按原样参与比较
+    """
+    return frozenset(_KEY_TERMS.get(t, t) for t in _KEY_TERM_PATTERN.findall(query_key(query)))
+
+
+class WebCacheEntry:
+    def __init__(self, key: str, query: str, vector: np.ndarray, max_results: int, facts: List[dict]):
+        self.key = key
+        self.query = query
+        self.terms = key_terms(query)
+        self.vector = vector
+        self.max_results = max_results
+        self.facts = facts
+        self.stored_at = time.monotonic()
+        self.refreshing = False
+
+
+class WebFactsCache:
+    """线程安全；容量满时按 LRU 淘汰"""
+
+    def __init__(
+            self,
+            maxsize: int,
+            ttl_sec: float,
+            stale_ttl_sec: float,
+            similarity: float,
+            lsh_tables: int = 8,
+            lsh_bits: int = 6,
+    ):
+        self.maxsize = maxsize
+        self.ttl_sec = ttl_sec
+        self.stale_ttl_sec = stale_ttl_sec
+        self.similarity = similarity
+        self.lsh_tables = lsh_tables
+        self.lsh_bits = lsh_bits
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, WebCacheEntry]" = OrderedDict()
+        self._buckets: List[Dict[int, Set[str]]] = [defaultdict(set) for _ in range(lsh_tables)]
+        self._planes: Optional[np.ndarray] = None  # (tables * bits, dim)，首次使用时按向量维度生成
+        self._stats = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "term_mismatches": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+        }
+
+    # ---------- LSH ----------
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def _signatures(self, vector: np.ndarray) -> List[int]:
+        if self._planes is None or self._planes.shape[1] != vector.shape[0]:
+            rng = np.random.default_rng(0)
+            self._planes = rng.standard_normal((self.lsh_tables * self.lsh_bits, vector.shape[0])).astype(np.float32)
+            for table in self._buckets:
+                table.clear()
+        bits = (self._planes @ vector > 0).reshape(self.lsh_tables, self.lsh_bits)
+        weights = 1 << np.arange(self.lsh_bits)
+        return [int(x) for x in bits @ weights]
+
+    def _unlink(self, entry: WebCacheEntry):
+        for table, sig in zip(self._buckets, self._signatures(entry.vector)):
+            members = table.get(sig)
+            if members is not None:
+                members.discard(entry.key)
+                if not members:
+                    del table[sig]
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._unlink(entry)
+
+    # ---------- 读写 ----------
+
+    def _state(self, entry: WebCacheEntry) -> Optional[str]:
+        age = time.monotonic() - entry.stored_at
+        if age <= self.ttl_sec:
+            return FRESH
+        if age <= self.ttl_sec + self.stale_ttl_sec:
+            return STALE
+        return None
+
+    def _nearest(self, vector: np.ndarray, max_results: int, terms: frozenset) -> Optional[WebCacheEntry]:
+        candidates = set()
+        for table, sig in zip(self._buckets, self._signatures(vector)):
+            candidates |= table.get(sig, set())
+        entries = [self._entries[k] for k in candidates if self._entries[k].max_results >= max_results]
+        if not entries:
+            return None
+        scores = np.stack([e.vector for e in entries]) @ vector
+        # 相似度达标但关键词不同（如物种互换）的候选一律不复用
+        above = [i for i in np.argsort(-scores) if scores[i] >= self.similarity]
+        matched = [i for i in above if entries[i].terms == terms]
+        if len(matched) < len(above):
+            self._stats["term_mismatches"] += 1
+        return entries[matched[0]] if matched else None
+
+    def lookup(self, query: str, vector, max_results: int) -> Tuple[Optional[WebCacheEntry], Optional[str]]:
+        """
+        返回 (条目, 状态 fresh / stale)；未命中返回 (None, None)
+        stale 命中时条目被标记为 refreshing，调用方负责后台刷新（每个条目同一时间只刷新一次）
+        """
+        vector = self._normalize(vector)
+        key = query_key(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            kind = "exact_hits"
+            if entry is None or entry.max_results < max_results:
+                entry = self._nearest(vector, max_results, key_terms(query))
+                kind = "semantic_hits"
+
+            state = self._state(entry) if entry is not None else None
+            if state is None:
+                if entry is not None:
+                    self._remove(entry.key)
+                self._stats["misses"] += 1
+                return None, None
+
+            self._entries.move_to_end(entry.key)
+            self._stats[kind] += 1
+            if state == STALE:
+                self._stats["stale_hits"] += 1
+                if entry.refreshing:
+                    return entry, FRESH  # 已有刷新在进行，按新鲜命中处理
+                entry.refreshing = True
+            return entry, state
+
+    def put(self, query: str, vector, max_results: int, facts: List[dict]):
+        vector = self._normalize(vector)
+        key = query_key(query)
+        with self._lock:
+            self._remove(key)
+            entry = WebCacheEntry(key, query, vector, max_results, facts)
+            self._entries[key] = entry
+            for table, sig in zip(self._buckets, self._signatures(vector)):
+                table[sig].add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def finish_refresh(self, entry: WebCacheEntry, ok: bool):
+        with self._lock:
+            entry.refreshing = False
+            self._stats["refreshes" if ok else "refresh_errors"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._stats)
+            size = len(self._entries)
+        hits = counts["exact_hits"] + counts["semantic_hits"]
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl_sec": self.ttl_sec,
+            "stale_ttl_sec": self.stale_ttl_sec,
+            "similarity": self.similarity,
+            **counts,
+            "hit_ratio": round(hits / max(1, hits + counts["misses"]), 4),
+        }
+
+
+_web_facts_cache: Optional[WebFactsCache] = None
+
+
+def get_web_facts_cache() -> WebFactsCache:
+    """获取全局唯一的 Web 搜索结果缓存（单例）"""
+    global _web_facts_cache
+
+    if _web_facts_cache is None:
+        _web_facts_cache = WebFactsCache(
+            maxsize=settings.WEB_CACHE_SIZE,
+            ttl_sec=settings.WEB_CACHE_TTL_SEC,
+            stale_ttl_sec=settings.WEB_CACHE_STALE_TTL_SEC,
+            similarity=settings.WEB_CACHE_SIMILARITY,
+            lsh_tables=settings.WEB_CACHE_LSH_TABLES,
+            lsh_bits=settings.WEB_CACHE_LSH_BITS,
+        )
+    return _web_facts_cache
+
+
+def web_cache_stats() -> Optional[Dict[str, Any]]:
+    return _web_facts_cache.stats() if _web_facts_cache is not None else None
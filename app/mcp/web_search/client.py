@@ -1,29 +1,51 @@
-import requests
 from typing import List, Dict
 
+from app.utils.http_client import get_http_client
+
 
 class WebSearchClient:
+    TIMEOUT_SEC = 10
+    UPSTREAM = "tavily"
+
     def __init__(self, api_key: str):
         self.api_key = api_key
         self.endpoint = "https://api.tavily.com/search"
 
+    def _payload(self, query: str, domains: List[str], max_results: int) -> Dict:
+        return {
+            "query": query,
+            "max_results": max_results,
+            "include_domains": domains,
+        }  # 载荷， 请求中真正携带的数据内容
+
     def search(
             self,
             query: str,
             domains: List[str],
             max_results: int = 5,
     ) -> List[Dict]:
-        payload = {
-            "query": query,
-            "max_results": max_results,
-            "include_domains": domains,
-        }  # 载荷， 请求中真正携带的数据内容
+        resp = get_http_client().request_sync(
+            self.UPSTREAM,
+            "POST",
+            self.endpoint,
+            timeout_sec=self.TIMEOUT_SEC,
+            json=self._payload(query, domains, max_results),
+            headers={"Authorization": f"Bearer {self.api_key}"},
+        )  # 重试后仍失败时抛出异常
+        return resp.json().get("results", [])
 
-        resp = requests.post(
+    async def asearch(
+            self,
+            query: str,
+            domains: List[str],
+            max_results: int = 5,
+    ) -> List[Dict]:
+        resp = await get_http_client().request(
+            self.UPSTREAM,
+            "POST",
             self.endpoint,
-            json=payload,
+            timeout_sec=self.TIMEOUT_SEC,
+            json=self._payload(query, domains, max_results),
             headers={"Authorization": f"Bearer {self.api_key}"},
-            timeout=10,
         )
-        resp.raise_for_status()  # 如果请求失败立刻抛出异常
         return resp.json().get("results", [])
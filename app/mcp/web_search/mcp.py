@@ -1,8 +1,15 @@
+import asyncio
+
+from loguru import logger
+
 from app.config import settings
+from app.knowledge_base.embedding_manager import get_embedding
 from app.mcp.base import BaseMCP
+from app.mcp.web_search.cache import STALE, get_web_facts_cache
 from app.mcp.web_search.client import WebSearchClient
 from app.mcp.web_search.normalizer import normalize_results
 from app.mcp.web_search.schemas import WebSearchResult
+from app.utils.concurrency import run_blocking
 
 
 class WebSearchMCP(BaseMCP):
@@ -31,6 +38,7 @@ class WebSearchMCP(BaseMCP):
             "weibo.com",
             "mp.weixin.qq.com"
         ]
+        self._revalidate_tasks = set()
 
     def invoke(
             self,
@@ -52,6 +60,70 @@ class WebSearchMCP(BaseMCP):
 
         return result.model_dump()
 
+    async def ainvoke(
+            self,
+            query: str,
+            max_results: int = 5,
+    ) -> dict:
+        """
+        经 Web 结果缓存调用：精确或近似命中时直接返回缓存的 facts，
+        命中已过期（stale）条目时先返回旧结果，再在后台重新搜索并更新缓存
+        """
+        if not settings.WEB_CACHE_ENABLED:
+            return await self._asearch(query, max_results)
+
+        cache = get_web_facts_cache()
+        vector = await run_blocking(get_embedding().embed_query, query)
+        entry, state = cache.lookup(query, vector, max_results)
+        if entry is not None:
+            if state == STALE:
+                self._schedule_revalidate(entry)
+            logger.info(f"WebSearch 缓存命中（{state}）: {query} → {entry.query}")
+            return WebSearchResult(query=query, facts=entry.facts[:max_results]).model_dump()
+
+        result = await self._asearch(query, max_results)
+        if result["facts"]:
+            cache.put(query, vector, max_results, result["facts"])
+        return result
+
+    def _schedule_revalidate(self, entry):
+        async def _revalidate():
+            cache = get_web_facts_cache()
+            try:
+                result = await self._asearch(entry.query, entry.max_results)
+                if result["facts"]:
+                    cache.put(entry.query, entry.vector, entry.max_results, result["facts"])
+                cache.finish_refresh(entry, ok=True)
+            except Exception as e:
+                logger.warning(f"WebSearch 缓存后台刷新失败: {e}")
+                cache.finish_refresh(entry, ok=False)
+
+        task = asyncio.create_task(_revalidate())
+        # 保持引用，避免任务在完成前被回收
+        self._revalidate_tasks.add(task)
+        task.add_done_callback(self._revalidate_tasks.discard)
+
+    async def _asearch(
+            self,
+            query: str,
+            max_results: int,
+    ) -> dict:
+        raw = await self.client.asearch(
+            query=query,
+            domains=self.allowed_domains,
+            max_results=max_results,
+        )
+
+        # 结果打分需要做 embedding，放到推理线程池执行
+        facts = await run_blocking(normalize_results, raw, query)
+
+        result = WebSearchResult(
+            query=query,
+            facts=facts,
+        )
+
+        return result.model_dump()
+
 
 def main():
     """测试 WebSearchMCP 功能"""
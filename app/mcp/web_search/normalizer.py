@@ -1,5 +1,6 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import numpy as np
+from langchain_core.embeddings import Embeddings
 from app.mcp.web_search.schemas import WebFact
 from app.knowledge_base.embedding_manager import get_embedding
 from urllib.parse import urlparse
@@ -55,9 +56,19 @@ def rule_based_score(url: str, content: str) -> float:
     return round(min(score, 1.0), 3)
 
 
+def content_quality_batch(lengths: np.ndarray) -> np.ndarray:
+    """content_quality 的向量化版本"""
+    return np.select(
+        [lengths < 50, lengths < 150, lengths < 400],
+        [0.2, 0.5, 0.8],
+        default=1.0,
+    )
+
+
 def normalize_results(
         raw_results: List[Dict],
         query: str,
+        embedder: Optional[Embeddings] = None,
 ) -> List[WebFact]:
     """
     Web 搜索结果标准化 + 可信度评估
@@ -65,44 +76,51 @@ def normalize_results(
     confidence =
         0.6 * embedding 相似度 +
         0.4 * 规则可信度（来源 + 结构）
-    """
-
-    embedder = get_embedding()
-    query_embedding = embedder.embed_query(query)
 
-    facts: List[WebFact] = []
+    所有结果一次 embed_documents 批量编码，相似度与规则分均为 NumPy 向量运算
+    """
 
+    valid = []
     for r in raw_results:
         content = r.get("content") or r.get("snippet")
         url = r.get("url")
+        if content and url:
+            valid.append((content, url))
 
-        if not content or not url:
-            continue
+    if not valid:
+        return []
 
-        # ===== 1️⃣ embedding 相似度 =====
-        doc_embedding = embedder.embed_documents([content])[0]
-        semantic_score = cosine_similarity(query_embedding, doc_embedding)
+    contents = [c for c, _ in valid]
+    urls = [u for _, u in valid]
 
-        # 映射到 0~1（经验区间）
-        semantic_score = max(0.0, min((semantic_score - 0.2) / 0.6, 1.0))
+    embedder = embedder or get_embedding()
+    query_vec = np.asarray(embedder.embed_query(query), dtype=np.float32)
+    doc_matrix = np.asarray(embedder.embed_documents(contents), dtype=np.float32)
 
-        # ===== 2️⃣ 规则可信度 =====
-        rule_score = rule_based_score(url, content)
+    # ===== 1️⃣ embedding 相似度（一次矩阵-向量乘） =====
+    norms = np.linalg.norm(doc_matrix, axis=1) * np.linalg.norm(query_vec)
+    semantic = (doc_matrix @ query_vec) / np.where(norms == 0, 1.0, norms)
 
-        # ===== 3️⃣ 混合 =====
-        confidence = round(
-            0.6 * semantic_score + 0.4 * rule_score,
-            3
-        )
+    # 映射到 0~1（经验区间）
+    semantic = np.clip((semantic - 0.2) / 0.6, 0.0, 1.0)
+
+    # ===== 2️⃣ 规则可信度 =====
+    source_scores = np.array([source_prior(u) for u in urls])
+    quality_scores = content_quality_batch(np.array([len(c) for c in contents]))
+    rule_scores = np.round(np.minimum(0.6 * source_scores + 0.4 * quality_scores, 1.0), 3)
+
+    # ===== 3️⃣ 混合 =====
+    confidences = np.round(0.6 * semantic + 0.4 * rule_scores, 3)
 
-        facts.append(
-            WebFact(
-                content=content.strip(),
-                source=urlparse(url).netloc,
-                url=url,
-                confidence=confidence,
-            )
+    facts: List[WebFact] = [
+        WebFact(
+            content=content.strip(),
+            source=urlparse(url).netloc,
+            url=url,
+            confidence=float(confidence),
         )
+        for content, url, confidence in zip(contents, urls, confidences)
+    ]
 
     facts.sort(key=lambda x: x.confidence, reverse=True)
     return facts
@@ -0,0 +1,148 @@
+"""
+完整回答缓存：高频的科普 / 非紧急问题（如 "猫能吃葡萄吗"）直接复用上一次的 Agent 结果，跳过整张图
+
+- key：归一化 query + 是否联网 + 知识库版本（同步状态文件中的 synced_at，知识库重新同步后自动失效）
+- 只写入 gate 判定为 normal 的结果（emergency / hybrid 都意味着运行时识别到了风险）
+- 以下请求自动绕过：带图片、开启地图、有历史对话（回答依赖上下文）、
+  query 命中危急关键词（同样的文字可能对应正在发生的急症，必须每次重新评估）
+"""
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.utils.cache import LRUCache
+from app.utils.common import normalize_whitespace
+
+# 缓存的 Agent 结果字段（各接口据此构造响应 / 落库元信息）
+_RESULT_FIELDS = (
+    "response",
+    "kb_docs",
+    "web_facts",
+    "merged_docs",
+    "used_web_search",
+    "used_map",
+    "decision_trace",
+)
+_TRAILING_PUNCT = re.compile(r"[\s?？!！。.,，~～]+$")
+# 危急关键词：对应 gate 的硬红旗（大出血 / 开放性骨折 / 呼吸困难 / 抽搐昏迷）及误食、外伤等急症描述
+_RED_FLAG_KEYWORDS = (
+    "出血", "流血", "血流不止", "骨折", "骨头露", "呼吸困难", "喘不上", "张嘴呼吸", "抽搐", "昏迷",
+    "不省人事", "休克", "瘫", "中毒", "误食", "吃了", "吞了", "车祸", "被车", "撞", "咬伤", "烫伤",
+    "中暑", "快不行", "奄奄一息", "救命", "紧急", "急救",
+)
+
+_response_cache: Optional[LRUCache] = None
+_bypass_lock = threading.Lock()
+_bypass_stats: Dict[str, int] = {}
+_kb_version: Tuple[Optional[float], str] = (None, "none")
+
+
+def get_response_cache() -> LRUCache:
+    """获取全局唯一的回答缓存（单例）"""
+    global _response_cache
+
+    if _response_cache is None:
+        _response_cache = LRUCache(
+            maxsize=settings.RESPONSE_CACHE_SIZE,
+            ttl_sec=settings.RESPONSE_CACHE_TTL_SEC,
+        )
+    return _response_cache
+
+
+def normalize_query(query: str) -> str:
+    """合并空白、转小写并去掉结尾标点（"猫能吃葡萄吗？" 与 "猫能吃葡萄吗" 命中同一条）"""
+    return _TRAILING_PUNCT.sub("", normalize_whitespace(query).lower())
+
+
+def kb_version() -> str:
+    """知识库版本：同步状态文件中当前集合的 synced_at，按文件 mtime 缓存读取结果"""
+    global _kb_version
+
+    path = settings.QDRANT_SYNC_STATE_FILE
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return "none"
+    if mtime != _kb_version[0]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f).get(settings.QDRANT_COLLECTION_NAME, {})
+            _kb_version = (mtime, state.get("synced_at") or "none")
+        except (OSError, ValueError):
+            return _kb_version[1]
+    return _kb_version[1]
+
+
+def has_red_flag(query: str) -> bool:
+    q = normalize_query(query)
+    return any(k in q for k in _RED_FLAG_KEYWORDS)
+
+
+def bypass_reason(req) -> Optional[str]:
+    """请求不适合走缓存的原因；可以走缓存时返回 None"""
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return "disabled"
+    if req.image_ids:
+        return "images"
+    if req.enable_map:
+        return "map"
+    if req.chat_history:
+        return "history"
+    if has_red_flag(req.query):
+        return "red_flag"
+    return None
+
+
+def _count_bypass(reason: str):
+    with _bypass_lock:
+        _bypass_stats[reason] = _bypass_stats.get(reason, 0) + 1
+
+
+def _key(req) -> Tuple[str, bool]:
+    return normalize_query(req.query), bool(req.enable_web_search)
+
+
+def lookup(req) -> Optional[Dict[str, Any]]:
+    """命中时返回缓存的 Agent 结果（字段同 agent_app.ainvoke 的返回），否则返回 None"""
+    reason = bypass_reason(req)
+    if reason is not None:
+        _count_bypass(reason)
+        return None
+    return get_response_cache().get(kb_version(), _key(req))
+
+
+def store(req, result: Dict[str, Any]) -> bool:
+    """
+    写入缓存，返回是否写入
+    非 normal 模式、兜底回答或结果依赖地图时不缓存
+    """
+    if bypass_reason(req) is not None:
+        return False
+    mode = (result.get("gate") or {}).get("mode")
+    if mode != "normal":
+        _count_bypass(f"mode_{mode}")
+        return False
+    if not result.get("response") or result.get("map_result"):
+        _count_bypass("not_cacheable")
+        return False
+
+    cached = {k: result.get(k) for k in _RESULT_FIELDS}
+    cached["decision_trace"] = [t for t in result.get("decision_trace") or [] if t.get("node") != "node_latency"]
+    get_response_cache().put(kb_version(), _key(req), cached)
+    return True
+
+
+def replay_chunks(answer: str) -> List[str]:
+    """命中时按固定长度切分回答，作为 SSE delta 事件回放"""
+    size = max(1, settings.RESPONSE_CACHE_REPLAY_CHUNK)
+    return [answer[i: i + size] for i in range(0, len(answer), size)]
+
+
+def response_cache_stats() -> Dict[str, Any]:
+    with _bypass_lock:
+        bypass = dict(_bypass_stats)
+    stats = _response_cache.stats() if _response_cache is not None else None
+    return {"kb_version": kb_version(), "cache": stats, "bypass": bypass}
@@ -0,0 +1,124 @@
+"""
+启动预热：在 worker 接收请求前加载所有模型并各跑一次推理（分配缓冲区 / 触发首轮初始化），
+记录每个组件的加载与预热耗时；预热完成前 /health/ready 返回 503
+预热走线上查询路径（embed_query / rerank 经 MicroBatcher），但不读写查询向量缓存与 rerank 分数缓存
+"""
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from langchain_core.documents import Document
+from loguru import logger
+
+_WARMUP_TEXT = "流浪猫后腿受伤出血，应该如何简单包扎并送医？"
+
+_state: Dict[str, Any] = {
+    "status": "pending",  # pending / running / ready / failed / skipped
+    "started_at": None,
+    "finished_at": None,
+    "components": {},
+}
+
+
+def _load_vector_store():
+    from app.knowledge_base.vector_store import get_vector_store
+    return get_vector_store()
+
+
+def _warm_vector_store(store):
+    store.embedding_manager.embeddings.embed_documents([_WARMUP_TEXT])
+
+
+def _load_embedding():
+    from app.knowledge_base.embedding_manager import get_embedding
+    return get_embedding()
+
+
+def _warm_embedding(embedding):
+    # 走线上查询路径 embed_query（含 MicroBatcher 合批线程），但跳过 CachedEmbeddings，避免预热文本占用查询缓存
+    from app.knowledge_base.embedding_manager import CachedEmbeddings
+    inner = embedding.inner if isinstance(embedding, CachedEmbeddings) else embedding
+    inner.embed_query(_WARMUP_TEXT)
+
+
+def _load_sparse():
+    from app.knowledge_base.embedding_manager import get_sparse_embedding
+    return get_sparse_embedding()
+
+
+def _warm_sparse(sparse):
+    from app.knowledge_base.embedding_manager import CachedSparseEmbeddings
+    inner = sparse.inner if isinstance(sparse, CachedSparseEmbeddings) else sparse
+    inner.embed_query(_WARMUP_TEXT)
+
+
+def _load_reranker():
+    from app.knowledge_base.reranker import get_reranker
+    return get_reranker()
+
+
+def _warm_reranker(reranker):
+    # 经 MicroBatcher 推理，不读写共享的 rerank 分数缓存
+    reranker.score(_WARMUP_TEXT, [Document(page_content=_WARMUP_TEXT)], use_cache=False)
+
+
+def _load_llm():
+    from app.llm import get_llm
+    return get_llm()
+
+
+# (组件名, 加载函数, 预热函数)
+COMPONENTS: List[Tuple[str, Callable[[], Any], Callable[[Any], None]]] = [
+    ("vector_store", _load_vector_store, _warm_vector_store),
+    ("embedding", _load_embedding, _warm_embedding),
+    ("sparse_embedding", _load_sparse, _warm_sparse),
+    ("reranker", _load_reranker, _warm_reranker),
+    ("llm", _load_llm, lambda _: None),
+]
+
+
+def run_warmup() -> Dict[str, Any]:
+    """
+    依次加载并预热各组件（阻塞，在推理线程池中执行）
+    单个组件失败不影响其余组件，但整体状态为 failed，readiness 保持 503
+    """
+    _state.update(status="running", started_at=datetime.now().isoformat(), components={})
+    total_start = time.perf_counter()
+
+    for name, load, warm in COMPONENTS:
+        result: Dict[str, Any] = {"ok": False, "load_ms": None, "warm_ms": None, "error": None}
+        try:
+            start = time.perf_counter()
+            obj = load()
+            result["load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+            start = time.perf_counter()
+            warm(obj)
+            result["warm_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            result["ok"] = True
+            logger.info(f"🔥 预热 {name}: 加载 {result['load_ms']}ms，首次推理 {result['warm_ms']}ms")
+        except Exception as e:
+            result["error"] = str(e)
+            logger.error(f"❌ 预热 {name} 失败: {e}")
+        _state["components"][name] = result
+
+    ok = all(c["ok"] for c in _state["components"].values())
+    _state.update(
+        status="ready" if ok else "failed",
+        finished_at=datetime.now().isoformat(),
+        total_ms=round((time.perf_counter() - total_start) * 1000, 1),
+    )
+    logger.info(f"预热完成: status={_state['status']}，总耗时 {_state['total_ms']}ms")
+    return warmup_report()
+
+
+def skip_warmup():
+    _state.update(status="skipped", finished_at=datetime.now().isoformat())
+
+
+def is_ready() -> bool:
+    return _state["status"] in ("ready", "skipped")
+
+
+def warmup_report() -> Dict[str, Any]:
+    return {**_state, "components": dict(_state["components"])}
@@ -0,0 +1,201 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+_BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+_batchers: Dict[str, "MicroBatcher"] = {}
+_batchers_lock = threading.Lock()
+
+
+class MicroBatcher:
+    """
+    进程内推理微批处理
+    多个请求线程并发 submit 的输入在一个后台线程里合并成一次 batch_fn 调用：
+    取到第一条后最多再等 max_wait_ms，或累计大小达到 max_batch_size 立即执行；
+    加入后会超出 max_batch_size 的输入留到下一批，单条超出上限的输入按 split / merge 拆成多条提交
+    模型前向始终只在这一个线程里串行执行，避免多线程同时推理导致 torch 线程超额订阅
+    """
+
+    def __init__(
+            self,
+            name: str,
+            batch_fn: Callable[[List[Any]], List[Any]],
+            max_batch_size: int = 32,
+            max_wait_ms: float = 5,
+            size_of: Optional[Callable[[Any], int]] = None,
+            split: Optional[Callable[[Any, int], List[Any]]] = None,
+            merge: Optional[Callable[[List[Any]], Any]] = None,
+    ):
+        """
+        Args:
+            name: 名称，用于日志与指标
+            batch_fn: 批处理函数，输入列表与输出列表一一对应
+            max_batch_size: 单批最大大小（按 size_of 累计）
+            max_wait_ms: 凑批最长等待时间
+            size_of: 单条输入的大小，默认每条计 1（rerank 按 pair 数计）
+            split: 将超出 max_batch_size 的单条输入拆成若干不超过上限的部分，不传则整条单独成批
+            merge: 合并各部分的结果，与 split 配套使用
+        """
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_sec = max_wait_ms / 1000
+        self.size_of = size_of or (lambda _: 1)
+        self.split = split
+        self.merge = merge
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue: "queue.Queue" = None
+        self._thread: Optional[threading.Thread] = None
+        self._carry = None  # 上一轮凑批时放不下、留给下一批的输入（只在后台线程中读写）
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "batches": 0,
+            "items": 0,
+            "size_total": 0,
+            "max_queue_depth": 0,
+            "wait_ms_total": 0.0,
+            "run_ms_total": 0.0,
+            "errors": 0,
+            "batch_size_hist": {str(b): 0 for b in _BATCH_SIZE_BUCKETS} | {"inf": 0},
+        }
+
+    def _ensure_worker(self):
+        # fork 后子进程不会继承后台线程，按 pid 重新创建
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._queue = queue.Queue()
+            self._carry = None
+            self._thread = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+            self._pid = os.getpid()
+            self._reset_stats()
+            self._thread.start()
+
+    def submit(self, item: Any) -> Any:
+        """提交单条输入并阻塞等待结果（在请求线程 / 推理线程池中调用）"""
+        self._ensure_worker()
+        if self.split is not None and self.size_of(item) > self.max_batch_size:
+            parts = self.split(item, self.max_batch_size)
+        else:
+            parts = [item]
+
+        futures: List[Future] = []
+        for part in parts:
+            future: Future = Future()
+            self._queue.put((part, future, time.monotonic()))
+            futures.append(future)
+        depth = self._queue.qsize()
+        with self._lock:
+            if depth > self._stats["max_queue_depth"]:
+                self._stats["max_queue_depth"] = depth
+
+        if len(futures) == 1:
+            return futures[0].result()
+        return self.merge([f.result() for f in futures])
+
+    def _collect(self) -> list:
+        first, self._carry = self._carry or self._queue.get(), None
+        batch = [first]
+        size = self.size_of(first[0])
+        deadline = time.monotonic() + self.max_wait_sec
+
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            entry_size = self.size_of(entry[0])
+            if size + entry_size > self.max_batch_size:
+                self._carry = entry  # 放不下，作为下一批的第一条
+                break
+            batch.append(entry)
+            size += entry_size
+        return batch
+
+    def _record(self, batch: list, started: float, finished: float, ok: bool):
+        size = sum(self.size_of(item) for item, _, _ in batch)
+        bucket = next((str(b) for b in _BATCH_SIZE_BUCKETS if size <= b), "inf")
+        with self._lock:
+            stats = self._stats
+            stats["batches"] += 1
+            stats["items"] += len(batch)
+            stats["size_total"] += size
+            stats["wait_ms_total"] += sum((started - enqueued) * 1000 for _, _, enqueued in batch)
+            stats["run_ms_total"] += (finished - started) * 1000
+            stats["errors"] += 0 if ok else 1
+            stats["batch_size_hist"][bucket] += 1
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            ok = True
+            try:
+                results = self.batch_fn([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name} 批处理输出数量 {len(results)} 与输入 {len(batch)} 不一致")
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                ok = False
+                logger.error(f"{self.name} 批处理失败: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            self._record(batch, started, time.monotonic(), ok)
+
+    def stats(self) -> dict:
+        """指标：当前队列深度、批次数、平均批大小、平均排队 / 执行耗时、批大小分布"""
+        with self._lock:
+            s = {**self._stats, "batch_size_hist": dict(self._stats["batch_size_hist"])}
+        batches = max(1, s["batches"])
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": s["max_queue_depth"],
+            "batches": s["batches"],
+            "items": s["items"],
+            "avg_batch_size": round(s["size_total"] / batches, 2),
+            "avg_items_per_batch": round(s["items"] / batches, 2),
+            "avg_wait_ms": round(s["wait_ms_total"] / max(1, s["items"]), 2),
+            "avg_run_ms": round(s["run_ms_total"] / batches, 2),
+            "errors": s["errors"],
+            "batch_size_hist": s["batch_size_hist"],
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_sec * 1000,
+        }
+
+
+def register_batcher(batcher: MicroBatcher) -> MicroBatcher:
+    """登记到全局表，供 /health/inference 汇总指标"""
+    with _batchers_lock:
+        _batchers[batcher.name] = batcher
+    return batcher
+
+
+def batcher_stats() -> Dict[str, dict]:
+    with _batchers_lock:
+        return {name: b.stats() for name, b in _batchers.items()}
+
+
+def _reset_locks_after_fork():
+    # fork 时锁可能正被其他线程持有，子进程中重新创建；后台线程由 _ensure_worker 按 pid 重建
+    global _batchers_lock
+    _batchers_lock = threading.Lock()
+    for batcher in _batchers.values():
+        batcher._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_locks_after_fork)
@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_instances: "weakref.WeakSet[LRUCache]" = weakref.WeakSet()
+
+
+class LRUCache:
+    """
+    线程安全的 LRU + TTL 内存缓存
+    key 由 (namespace, key) 组成，命中统计按 namespace 分别记录
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl_sec: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl_sec = ttl_sec
+        self._data: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        _instances.add(self)
+
+    def _count(self, namespace: str, field: str, n: int = 1):
+        self._stats.setdefault(namespace, {"hits": 0, "misses": 0})[field] += n
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_sec is not None and time.monotonic() - stored_at > self.ttl_sec
+
+    def get(self, namespace: str, key: Hashable) -> Any:
+        full_key = (namespace, key)
+        with self._lock:
+            item = self._data.get(full_key)
+            if item is not None and not self._expired(item[0]):
+                self._data.move_to_end(full_key)
+                self._count(namespace, "hits")
+                return item[1]
+            if item is not None:
+                del self._data[full_key]  # 已过期
+            self._count(namespace, "misses")
+            return None
+
+    def put(self, namespace: str, key: Hashable, value: Any):
+        full_key = (namespace, key)
+        with self._lock:
+            self._data[full_key] = (time.monotonic(), value)
+            self._data.move_to_end(full_key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, namespace: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        value = self.get(namespace, key)
+        if value is None:
+            value = compute()
+            self.put(namespace, key, value)
+        return value
+
+    def invalidate(self, namespace: Optional[str] = None) -> int:
+        """清空指定 namespace（不传则全部清空），返回删除条数"""
+        with self._lock:
+            if namespace is None:
+                n = len(self._data)
+                self._data.clear()
+                return n
+            keys = [k for k in self._data if k[0] == namespace]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self) -> dict:
+        """命中统计：{size, maxsize, ttl_sec, namespaces: {ns: {hits, misses, hit_rate}}}"""
+        with self._lock:
+            namespaces = {
+                ns: {
+                    **counts,
+                    "hit_rate": round(counts["hits"] / max(1, counts["hits"] + counts["misses"]), 4),
+                }
+                for ns, counts in self._stats.items()
+            }
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_sec": self.ttl_sec,
+                "namespaces": namespaces,
+            }
+
+
+def _reset_locks_after_fork():
+    # fork 时锁可能正被其他线程持有，子进程中重新创建，缓存内容保留
+    for cache in list(_instances):
+        cache._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_locks_after_fork)
@@ -12,6 +12,11 @@ def clean_text(v: Any) -> str:
     return v.strip()
 
 
+def normalize_whitespace(v: Any) -> str:
+    """清洗文本并合并连续空白，用于构造缓存 key"""
+    return " ".join(clean_text(v).split())
+
+
 def extract_first_json_object(text: str) -> Optional[str]:
     """从文本中提取第一个完整的 JSON 对象"""
     if not text:
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+from loguru import logger
+
+from app.config import settings
+
+T = TypeVar("T")
+
+_inference_executor: ThreadPoolExecutor | None = None
+_agent_semaphore: asyncio.Semaphore | None = None
+_in_flight: int = 0
+
+
+def _reset_after_fork():
+    # 线程池的工作线程与绑定在父进程事件循环上的信号量都不能跨 fork 使用，子进程中惰性重建
+    global _inference_executor, _agent_semaphore, _in_flight
+    _inference_executor = None
+    _agent_semaphore = None
+    _in_flight = 0
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class AgentBusyError(RuntimeError):
+    """等待 Agent 执行槽位超时"""
+
+
+def get_inference_executor() -> ThreadPoolExecutor:
+    """
+    获取模型推理专用线程池（单例）
+    embedding / rerank 等 CPU 密集调用统一走这里，避免占满事件循环默认线程池
+    """
+    global _inference_executor
+
+    if _inference_executor is None:
+        _inference_executor = ThreadPoolExecutor(
+            max_workers=settings.INFERENCE_MAX_WORKERS,
+            thread_name_prefix="inference",
+        )
+    return _inference_executor
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在推理线程池中执行同步阻塞函数"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_inference_executor(), partial(func, *args, **kwargs))
+
+
+def _get_agent_semaphore() -> asyncio.Semaphore:
+    global _agent_semaphore
+
+    if _agent_semaphore is None:
+        _agent_semaphore = asyncio.Semaphore(settings.AGENT_MAX_CONCURRENCY)
+    return _agent_semaphore
+
+
+@asynccontextmanager
+async def agent_slot():
+    """
+    Agent 并发限流：单 worker 同时执行的救助会话数不超过 AGENT_MAX_CONCURRENCY，
+    超出的请求排队等待，等待超过 AGENT_QUEUE_TIMEOUT_SEC 抛出 AgentBusyError
+    """
+    global _in_flight
+
+    semaphore = _get_agent_semaphore()
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=settings.AGENT_QUEUE_TIMEOUT_SEC)
+    except asyncio.TimeoutError:
+        logger.warning(f"Agent 并发已满 (in_flight={_in_flight})，排队超时")
+        raise AgentBusyError("服务繁忙，请稍后重试")
+
+    _in_flight += 1
+    try:
+        yield
+    finally:
+        _in_flight -= 1
+        semaphore.release()
+
+
+def agent_in_flight() -> int:
+    """当前正在执行的 Agent 会话数"""
+    return _in_flight
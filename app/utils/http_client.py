@@ -0,0 +1,297 @@
+"""
+外部 HTTP 调用（高德 / Tavily / Vision 等）共享的客户端层
+
+- 进程内共享一个连接池（keep-alive，安装 h2 时启用 HTTP/2）
+- 按目标 host 限制并发，避免单个上游被突发请求打满
+- 连接错误 / 超时 / 429 / 5xx 按指数退避 + 全抖动重试
+- 按上游名称记录请求延迟直方图、重试与失败次数（/health/upstreams）
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from loguru import logger
+
+from app.config import settings
+
+_LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def _http2_available() -> bool:
+    if not settings.HTTP_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("未安装 h2（httpx[http2]），外部 HTTP 调用回退到 HTTP/1.1")
+        return False
+
+
+class UpstreamStats:
+    """单个上游的调用指标（线程安全，同步 / 异步调用共用）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latency_ms_total = 0.0
+        self.status: Dict[str, int] = {}
+        self.latency_hist = {str(b): 0 for b in _LATENCY_BUCKETS_MS} | {"inf": 0}
+
+    def record_attempt(self, latency_ms: float, status: Optional[int]):
+        bucket = next((str(b) for b in _LATENCY_BUCKETS_MS if latency_ms <= b), "inf")
+        key = f"{status // 100}xx" if status else "network_error"
+        with self._lock:
+            self.attempts += 1
+            self.latency_ms_total += latency_ms
+            self.latency_hist[bucket] += 1
+            self.status[key] = self.status.get(key, 0) + 1
+
+    def add(self, field: str, n: int = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + n)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "avg_latency_ms": self.latency_ms_total / self.attempts if self.attempts else 0.0,
+                "status": dict(self.status),
+                "latency_hist_ms": dict(self.latency_hist),
+            }
+
+
+class HttpClient:
+    """
+    共享 HTTP 客户端：异步调用走 httpx.AsyncClient，同步调用（脚本 / 测试入口）走 httpx.Client，
+    两者共用并发上限、重试策略与指标
+    """
+
+    def __init__(self):
+        self._limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SEC,
+        )
+        self._http2 = _http2_available()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, UpstreamStats] = {}
+
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_host_limits: Dict[str, asyncio.Semaphore] = {}
+
+        self._sync_client: Optional[httpx.Client] = None
+        self._sync_host_limits: Dict[str, threading.BoundedSemaphore] = {}
+
+    # ---------- 连接池 / 并发上限 ----------
+
+    def _timeout(self, timeout_sec: float) -> httpx.Timeout:
+        return httpx.Timeout(timeout_sec, connect=min(timeout_sec, settings.HTTP_CONNECT_TIMEOUT_SEC))
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        # AsyncClient 与信号量绑定在创建时的事件循环上，事件循环变化（如脚本多次 asyncio.run）时重建
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(limits=self._limits, http2=self._http2)
+            self._async_loop = loop
+            self._async_host_limits = {}
+        return self._async_client
+
+    def _get_sync_client(self) -> httpx.Client:
+        if self._sync_client is None:
+            with self._lock:
+                if self._sync_client is None:
+                    self._sync_client = httpx.Client(limits=self._limits, http2=self._http2)
+        return self._sync_client
+
+    def _async_host_limit(self, host: str) -> asyncio.Semaphore:
+        if host not in self._async_host_limits:
+            self._async_host_limits[host] = asyncio.Semaphore(settings.HTTP_PER_HOST_CONCURRENCY)
+        return self._async_host_limits[host]
+
+    def _sync_host_limit(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._sync_host_limits:
+                self._sync_host_limits[host] = threading.BoundedSemaphore(settings.HTTP_PER_HOST_CONCURRENCY)
+            return self._sync_host_limits[host]
+
+    def _upstream_stats(self, upstream: str) -> UpstreamStats:
+        with self._lock:
+            if upstream not in self._stats:
+                self._stats[upstream] = UpstreamStats()
+            return self._stats[upstream]
+
+    # ---------- 重试策略 ----------
+
+    @staticmethod
+    def _should_retry(error: Optional[Exception], resp: Optional[httpx.Response], retry_on_timeout: bool) -> bool:
+        if error is not None:
+            if isinstance(error, httpx.ReadTimeout | httpx.WriteTimeout):
+                return retry_on_timeout
+            return isinstance(error, httpx.TransportError)
+        return resp.status_code in _RETRY_STATUS
+
+    @staticmethod
+    def _backoff_sec(attempt: int, resp: Optional[httpx.Response]) -> float:
+        """全抖动指数退避；429 / 503 带数值 Retry-After 时优先使用（同样受上限约束）"""
+        cap = settings.HTTP_RETRY_BACKOFF_MAX_MS / 1000
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), cap)
+        return random.uniform(0, min(cap, settings.HTTP_RETRY_BACKOFF_MS / 1000 * 2 ** attempt))
+
+    # ---------- 请求入口 ----------
+
+    async def request(
+            self,
+            upstream: str,
+            method: str,
+            url: str,
+            timeout_sec: float = 10,
+            max_retries: Optional[int] = None,
+            retry_on_timeout: bool = True,
+            **kwargs,
+    ) -> httpx.Response:
+        """
+        发送异步请求，失败按策略重试，最终响应非 2xx 时抛出 httpx.HTTPStatusError
+
+        Args:
+            upstream: 上游名称，用于指标分组（如 amap / tavily / vision）
+            timeout_sec: 单次尝试的读超时
+            max_retries: 最大重试次数，默认 HTTP_MAX_RETRIES
+            retry_on_timeout: 读 / 写超时是否重试（耗时长的调用如 Vision 应关闭）
+        """
+        client = self._get_async_client()
+        host_limit = self._async_host_limit(urlsplit(url).netloc)
+        stats = self._upstream_stats(upstream)
+        max_retries = settings.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        stats.add("calls")
+
+        attempt = 0
+        while True:
+            resp, error = None, None
+            async with host_limit:
+                stats.add("in_flight")
+                start = time.perf_counter()
+                try:
+                    resp = await client.request(method, url, timeout=self._timeout(timeout_sec), **kwargs)
+                except httpx.HTTPError as e:
+                    error = e
+                finally:
+                    stats.add("in_flight", -1)
+                    stats.record_attempt((time.perf_counter() - start) * 1000, resp.status_code if resp else None)
+
+            if attempt < max_retries and self._should_retry(error, resp, retry_on_timeout):
+                attempt += 1
+                stats.add("retries")
+                delay = self._backoff_sec(attempt, resp)
+                logger.debug(f"{upstream} 请求失败（{error or resp.status_code}），{delay:.2f}s 后第 {attempt} 次重试")
+                await asyncio.sleep(delay)
+                continue
+            return self._finish(stats, error, resp)
+
+    def request_sync(
+            self,
+            upstream: str,
+            method: str,
+            url: str,
+            timeout_sec: float = 10,
+            max_retries: Optional[int] = None,
+            retry_on_timeout: bool = True,
+            **kwargs,
+    ) -> httpx.Response:
+        """同步版本，参数与返回同 request"""
+        client = self._get_sync_client()
+        host_limit = self._sync_host_limit(urlsplit(url).netloc)
+        stats = self._upstream_stats(upstream)
+        max_retries = settings.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        stats.add("calls")
+
+        attempt = 0
+        while True:
+            resp, error = None, None
+            with host_limit:
+                stats.add("in_flight")
+                start = time.perf_counter()
+                try:
+                    resp = client.request(method, url, timeout=self._timeout(timeout_sec), **kwargs)
+                except httpx.HTTPError as e:
+                    error = e
+                finally:
+                    stats.add("in_flight", -1)
+                    stats.record_attempt((time.perf_counter() - start) * 1000, resp.status_code if resp else None)
+
+            if attempt < max_retries and self._should_retry(error, resp, retry_on_timeout):
+                attempt += 1
+                stats.add("retries")
+                time.sleep(self._backoff_sec(attempt, resp))
+                continue
+            return self._finish(stats, error, resp)
+
+    @staticmethod
+    def _finish(stats: UpstreamStats, error: Optional[Exception], resp: Optional[httpx.Response]) -> httpx.Response:
+        if error is not None:
+            stats.add("errors")
+            raise error
+        if resp.is_error:
+            stats.add("errors")
+        resp.raise_for_status()
+        return resp
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            upstreams = dict(self._stats)
+        return {name: s.snapshot() for name, s in upstreams.items()}
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+
+_http_client: Optional[HttpClient] = None
+
+
+def get_http_client() -> HttpClient:
+    """获取进程内共享的 HTTP 客户端（单例）"""
+    global _http_client
+
+    if _http_client is None:
+        _http_client = HttpClient()
+    return _http_client
+
+
+def upstream_stats() -> Dict[str, Dict[str, Any]]:
+    return get_http_client().stats() if _http_client is not None else {}
+
+
+async def close_http_client():
+    if _http_client is not None:
+        await _http_client.aclose()
+
+
+def _reset_after_fork():
+    # 父进程的连接与锁不能跨 fork 复用，子进程中惰性重建
+    global _http_client
+    _http_client = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,30 @@
+"""
+多 worker 部署配置：master 进程先加载全部本地模型，再 fork 出 uvicorn worker，
+各 worker 通过写时复制共享同一份模型权重（uvicorn --workers 使用 spawn，每个 worker 各加载一份）
+
+用法：
+    gunicorn app.main:app -c gunicorn.conf.py
+    GUNICORN_WORKERS=4 gunicorn app.main:app -c gunicorn.conf.py
+
+每个 worker 的模型内存可在 /health/inference 的 models 字段查看：
+inherited=true 表示该模型由 master 加载后经 fork 共享
+"""
+import gc
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# 在 master 中导入应用，配合 on_starting 中的预加载，使模型在 fork 前就位
+preload_app = True
+
+
+def on_starting(server):
+    from app.knowledge_base.model_registry import preload_models
+
+    report = preload_models()
+    server.log.info(f"master 预加载模型完成: {report}")
+    # 冻结已有对象，避免子进程 GC 扫描时改写对象头导致共享页被复制
+    gc.freeze()
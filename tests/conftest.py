@@ -0,0 +1,5 @@
+import os
+
+# app.config 在导入时校验必填配置，测试只需占位值
+for _name in ("LLM_API_KEY", "LLM_MODEL", "LLM_BASE_URL", "AMAP_API_KEY", "TAVILY_API_KEY"):
+    os.environ.setdefault(_name, "test")
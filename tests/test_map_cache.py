@@ -0,0 +1,37 @@
+import sqlite3
+
+from app.config import settings
+from app.mcp.map import cache as map_cache
+from app.mcp.map.cache import MapCache
+from app.mcp.map.normalizer import haversine_m, merge_pois
+
+ORIGIN = "121.4737,31.2304"
+
+
+def test_disk_cache_failure_degrades_to_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MAP_CACHE_DISK_PATH", str(tmp_path / "map_cache.db"))
+
+    def locked(self):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(map_cache.DiskCache, "purge_expired", locked)
+    cache = MapCache()
+
+    assert cache.disk is None
+    cache.put(map_cache.GEOCODE, "上海市", ORIGIN)
+    assert cache.get(map_cache.GEOCODE, "上海市") == ORIGIN
+    assert cache.stats()["disk"] is None
+
+
+def test_merge_pois_drops_results_outside_radius():
+    # 以网格中心搜索得到的 POI：相对用户实际位置，一个在 1km 内，一个约 1.5km
+    pois = [
+        {"id": "near", "name": "近处医院", "location": "121.4800,31.2304", "distance": "300"},
+        {"id": "far", "name": "远处医院", "location": "121.4895,31.2304", "distance": "900"},
+    ]
+    distances = haversine_m(ORIGIN, [p["location"] for p in pois])
+    assert distances[0] < 1000 < distances[1]
+
+    resources = merge_pois({"hospital": pois}, ORIGIN, max_results=5, radius_m=1000)
+    assert [r["name"] for r in resources] == ["近处医院"]
+    assert len(merge_pois({"hospital": pois}, ORIGIN, max_results=5)) == 2
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.mcp.map import mcp as map_mcp
+from app.mcp.map.mcp import MapMCP
+from app.mcp.map.normalizer import haversine_m
+from app.mcp.map.resource_store import FIXTURE_PATH, ResourceIndex, ResourceStore
+
+# 上海人民广场（样例数据中上海的资源集中在其周边）
+ORIGIN = "121.4737,31.2304"
+ORIGIN_LON, ORIGIN_LAT = 121.4737, 31.2304
+
+
+@pytest.fixture(scope="module")
+def resources():
+    with open(FIXTURE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)["resources"]
+
+
+@pytest.fixture
+def store():
+    s = ResourceStore(FIXTURE_PATH)
+    assert s.load()
+    return s
+
+
+def brute_force(resources, radius_m, category=None):
+    """全量计算距离作为对照：半径内、按距离升序的资源 id"""
+    rows = [r for r in resources if category is None or r["category"] == category]
+    distances = haversine_m(ORIGIN, [r["location"] for r in rows])
+    order = np.argsort(distances, kind="stable")
+    return [rows[i]["id"] for i in order if distances[i] <= radius_m]
+
+
+@pytest.mark.parametrize("radius_m", [500, 2000, 5000, 20000])
+@pytest.mark.parametrize("category", [None, "hospital", "shelter"])
+def test_nearest_matches_brute_force(resources, radius_m, category):
+    index = ResourceIndex(resources, cell_deg=0.05)
+    results = index.nearest(ORIGIN_LON, ORIGIN_LAT, radius_m, category=category, limit=100)
+
+    assert [r["id"] for r, _ in results] == brute_force(resources, radius_m, category)
+    distances = [d for _, d in results]
+    assert distances == sorted(distances)
+    assert all(d <= radius_m for d in distances)
+    if category is not None:
+        assert all(r["category"] == category for r, _ in results)
+
+
+def test_nearest_limit_and_far_away_origin(resources):
+    index = ResourceIndex(resources, cell_deg=0.05)
+    assert len(index.nearest(ORIGIN_LON, ORIGIN_LAT, 20000, limit=3)) == 3
+    # 东海海面上，半径内没有任何资源
+    assert index.nearest(123.5, 30.5, 5000) == []
+
+
+def test_min_hits_rule(store, resources, monkeypatch):
+    expected = brute_force(resources, 5000, "hospital")
+    assert expected, "样例数据在查询半径内应有医院"
+
+    monkeypatch.setattr(settings, "MAP_RESOURCE_MIN_HITS", len(expected))
+    pois, hit = store.lookup(ORIGIN, "hospital", 5000, limit=100)
+    assert hit and [p["id"] for p in pois] == expected
+
+    monkeypatch.setattr(settings, "MAP_RESOURCE_MIN_HITS", len(expected) + 1)
+    pois, hit = store.lookup(ORIGIN, "hospital", 5000, limit=100)
+    assert not hit and len(pois) == len(expected)
+
+    stats = store.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+class FailingAmapClient:
+    def search_rescue_resources(self, **kwargs):
+        raise ConnectionError("amap unavailable")
+
+    async def asearch_rescue_resources(self, **kwargs):
+        raise ConnectionError("amap unavailable")
+
+
+@pytest.fixture
+def offline_mcp(store, monkeypatch):
+    """本地库未命中（MIN_HITS 调高）且高德不可用的 MapMCP"""
+    monkeypatch.setattr(settings, "MAP_RESOURCE_STORE_ENABLED", True)
+    monkeypatch.setattr(settings, "MAP_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "MAP_RESOURCE_MIN_HITS", 1000)
+    monkeypatch.setattr(map_mcp, "get_resource_store", lambda: store)
+    mcp = MapMCP()
+    mcp.client = FailingAmapClient()
+    return mcp
+
+
+def test_mcp_falls_back_to_local_results(offline_mcp, store):
+    address = f"{ORIGIN_LAT},{ORIGIN_LON}"  # MapMCP 接受 "lat,lon"
+    result = offline_mcp.invoke(address, resource_type="hospital", radius_km=5)
+    async_result = asyncio.run(offline_mcp.ainvoke(address, resource_type="hospital", radius_km=5))
+
+    assert result["resources"]
+    assert result == async_result
+    assert all(r["category"] == "hospital" for r in result["resources"])
+    assert store.stats()["fallbacks"] == 2
+
+
+def test_mcp_raises_when_no_local_results(offline_mcp):
+    with pytest.raises(ConnectionError):
+        offline_mcp.invoke("30.5,123.5", resource_type="hospital", radius_km=5)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from app.mcp.web_search.cache import FRESH, WebFactsCache, key_terms
+
+# 同一个向量：模拟 embedding 认为两个问题几乎相同的最坏情况
+VECTOR = np.ones(16, dtype=np.float32)
+FACTS = [{"content": "葡萄对猫有毒", "url": "https://example.com/cat-grape"}]
+
+
+@pytest.fixture
+def cache():
+    c = WebFactsCache(maxsize=16, ttl_sec=60, stale_ttl_sec=60, similarity=0.9)
+    c.put("猫能吃葡萄吗", VECTOR, 5, FACTS)
+    return c
+
+
+@pytest.mark.parametrize("query", [
+    "狗能吃葡萄吗",      # 物种互换
+    "兔子能吃葡萄吗",
+    "猫能吃巧克力吗",    # 物质互换
+    "猫能吃葡萄干吗",
+    "幼猫能吃葡萄吗",    # 年龄差异
+])
+def test_semantic_hit_requires_same_key_terms(cache, query):
+    entry, state = cache.lookup(query, VECTOR, 5)
+    assert entry is None and state is None
+    assert cache.stats()["term_mismatches"] >= 1
+
+
+def test_paraphrase_with_same_key_terms_hits(cache):
+    entry, state = cache.lookup("猫咪可以吃葡萄吗", VECTOR, 5)
+    assert state == FRESH
+    assert entry.facts == FACTS
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_key_terms_normalizes_synonyms():
+    assert key_terms("狗狗吃了鼠药") == key_terms("犬误食老鼠药")
+    assert key_terms("狗吃了1片布洛芬") != key_terms("狗吃了5片布洛芬")